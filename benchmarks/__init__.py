@@ -0,0 +1,10 @@
+"""
+Benchmarks for binarycsv and spmanalyzer.
+
+Run them from the repo directory with:
+python -m benchmarks.run [--rows N] [--output results.json]
+
+The input is a synthetic SPM export (See benchmarks.generate), so
+results from different versions are comparable when the same generator
+options are used.
+"""
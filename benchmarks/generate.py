@@ -0,0 +1,140 @@
+"""
+Generate synthetic CSV files like those exported from Serial Port
+Monitor (SPM), for benchmarks and tests.
+
+The output only depends on the options (including seed), so the same
+options always generate the same bytes.
+
+Usage:
+python -m benchmarks.generate <path> [rows]
+"""
+from __future__ import print_function
+import random
+import sys
+
+from datetime import datetime, timedelta
+
+SPM_HEADER = (b'#;Time;Function;Direction;Status;Data;Data (chars);'
+              b'Data length;Req. length;Port;Comments;')
+SPM_TIME_FMT = "%d/%m/%Y %H:%M:%S"
+START_TIME = datetime(2023, 9, 22, 10, 50, 54)
+
+DEFAULT_ROWS = 100000
+# (size, weight) pairs: mostly short UART replies, some longer packets.
+DEFAULT_PAYLOAD_SIZES = ((1, 40), (4, 25), (16, 20), (64, 10), (512, 5))
+
+# Printable ASCII (including the delimiter) except the quote character:
+_PLAIN_BYTES = [c for c in range(0x20, 0x7f) if c != ord('"')]
+_NON_UTF8_BYTES = list(range(0x80, 0x100))  # such as 0x9d
+_NEEDS_QUOTES = (b';', b'"', b'\r', b'\n')
+
+
+def _chars_field(payload):
+    """Format the "Data (chars)" field (the raw payload) like SPM."""
+    if not any(c in payload for c in _NEEDS_QUOTES):
+        return payload
+    return b'"' + payload.replace(b'"', b'""') + b'"'
+
+
+def generate_spm_log(stream, rows=DEFAULT_ROWS, seed=0,
+                     payload_sizes=DEFAULT_PAYLOAD_SIZES, control_share=0.5,
+                     quote_share=0.05, non_utf8_share=0.2, newline=b"\r\n"):
+    """Write a synthetic SPM export.
+
+    Args:
+        stream: A file or other stream in binary mode.
+        rows (int): The number of rows after the header row.
+        seed (int): The random seed.
+        payload_sizes (Iterable[tuple]): (size, weight) pairs for the
+            number of bytes in each captured payload.
+        control_share (float): The share of rows (0 to 1) that are UART
+            control rows (requests and completions without data), which
+            spmanalyzer ignores.
+        quote_share (float): The share of payloads containing a quote
+            character (so the field is quoted, with the quote doubled).
+        non_utf8_share (float): The share of payloads containing a byte
+            that isn't valid UTF-8 (0x80 to 0xFF).
+        newline (bytes): The row terminator (b"\\r\\n" or b"\\n").
+
+    Returns:
+        dict: Counts of what was written: "rows", "useful" (data rows),
+            "read_bytes" and "write_bytes" (payload totals), and "size"
+            (bytes written including the header).
+    """
+    rng = random.Random(seed)
+    sizes = [size for size, _ in payload_sizes]
+    weights = [weight for _, weight in payload_sizes]
+    counts = {'rows': rows, 'useful': 0, 'read_bytes': 0,
+              'write_bytes': 0, 'size': 0}
+    seconds = 0
+    time_field = START_TIME.strftime(SPM_TIME_FMT).encode('ascii')
+    lines = [SPM_HEADER]
+    for number in range(1, rows + 1):
+        if rng.random() < 0.1:
+            seconds += 1
+            time_field = (START_TIME + timedelta(seconds=seconds)).strftime(
+                SPM_TIME_FMT).encode('ascii')
+        is_read = rng.random() < 0.5
+        function = b'IRP_MJ_READ' if is_read else b'IRP_MJ_WRITE'
+        if rng.random() < control_share:
+            # The request (READ, DOWN) or completion (WRITE, UP) without
+            # data:
+            direction = b'DOWN' if is_read else b'UP'
+            fields = [str(number).encode('ascii'), time_field, function,
+                      direction, b'', b'', b'', b'', b'1', b'COM3', b'', b'']
+        else:
+            size = rng.choices(sizes, weights)[0]
+            payload = rng.choices(_PLAIN_BYTES, k=size)
+            if rng.random() < quote_share:
+                payload[rng.randrange(size)] = ord('"')
+            if rng.random() < non_utf8_share:
+                payload[rng.randrange(size)] = rng.choice(_NON_UTF8_BYTES)
+            payload = bytes(payload)
+            direction = b'UP' if is_read else b'DOWN'
+            fields = [
+                str(number).encode('ascii'), time_field, function, direction,
+                b'STATUS_SUCCESS',
+                payload.hex(' ').encode('ascii'),
+                _chars_field(payload),
+                str(size).encode('ascii'), str(size).encode('ascii'),
+                b'COM3', b'', b'',
+            ]
+            counts['useful'] += 1
+            counts['read_bytes' if is_read else 'write_bytes'] += size
+        lines.append(b';'.join(fields))
+    lines.append(b'')  # for the final newline
+    data = newline.join(lines)
+    stream.write(data)
+    counts['size'] = len(data)
+    return counts
+
+
+def write_spm_log(path, **kwargs):
+    """Write a synthetic SPM export to a file.
+
+    Args:
+        path (str): The file to create (or overwrite).
+        kwargs: Options for generate_spm_log.
+
+    Returns:
+        dict: The counts from generate_spm_log.
+    """
+    with open(path, 'wb') as stream:
+        return generate_spm_log(stream, **kwargs)
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print(__doc__, file=sys.stderr)
+        return 1
+    rows = DEFAULT_ROWS
+    if len(sys.argv) > 2:
+        rows = int(sys.argv[2])
+    counts = write_spm_log(sys.argv[1], rows=rows)
+    print("Wrote {} ({} bytes, {} data rows)"
+          "".format(sys.argv[1], counts['size'], counts['useful']))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""
+Run the benchmarks on a synthetic SPM export and save the results.
+
+Usage:
+python -m benchmarks.run [options]
+
+Options:
+--rows N          The number of rows to generate (default 100000).
+--repeat N        Run each timed benchmark N times and keep the best
+                  (default 3).
+--lf              Generate LF newlines instead of CRLF.
+--output PATH     Save the results as JSON.
+--compare PATH    Compare the results to JSON saved by an earlier run
+                  (such as from another version).
+"""
+from __future__ import print_function
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from datetime import datetime
+
+import binarycsv
+
+from benchmarks.generate import (
+    DEFAULT_ROWS,
+    write_spm_log,
+)
+
+MB = 1024 * 1024
+
+
+def _best_time(function, repeat):
+    """Run function repeat times.
+
+    Returns:
+        tuple: (seconds, result) for the fastest run.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best[0]:
+            best = (seconds, result)
+    return best
+
+
+def _read_all(path):
+    rows = 0
+    with open(path, 'rb') as stream:
+        for _ in binarycsv.reader(stream):
+            rows += 1
+    return rows
+
+
+def bench_reader(path, repeat):
+    """Measure binarycsv.reader throughput."""
+    seconds, rows = _best_time(lambda: _read_all(path), repeat)
+    size = os.path.getsize(path)
+    return {
+        'seconds': seconds,
+        'rows': rows,
+        'mb_per_s': size / MB / seconds,
+        'rows_per_s': rows / seconds,
+    }
+
+
+def bench_reader_memory(path):
+    """Measure the peak memory allocated while reading every row."""
+    tracemalloc.start()
+    try:
+        _read_all(path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'peak_bytes': peak}
+
+
+def bench_analyze_spm_log(path, repeat):
+    """Measure spmanalyzer.analyze_spm_log (its output is discarded)."""
+    import spmanalyzer
+
+    def analyze():
+        with open(os.devnull, 'w') as null:
+            with contextlib.redirect_stdout(null):
+                spmanalyzer.analyze_spm_log(path)
+
+    seconds, _ = _best_time(analyze, repeat)
+    return {'seconds': seconds}
+
+
+class HeadlessAnalyzer:
+    """Run MainApplication.next_useful_meta without creating widgets.
+
+    Only the attributes and methods that next_useful_meta uses are
+    provided, and captures are counted instead of listed.
+    """
+    def __init__(self, path):
+        import spmanalyzer
+        self.next_useful_meta_function = \
+            spmanalyzer.MainApplication.next_useful_meta
+        self.source = path
+        self.stream = open(path, 'rb')
+        self._reader = binarycsv.reader(self.stream)
+        self.number = 0
+        self.header_row = None
+        self.record_type = None
+        self.payloads = binarycsv.PayloadTotals()
+        self.captures = 0
+
+    def next_useful_meta(self):
+        return self.next_useful_meta_function(self)
+
+    def set_status(self, message):
+        pass
+
+    def enable_next_buttons(self, enable):
+        pass
+
+    def add_read(self, text, meta=None):
+        self.payloads.add_read(meta['Data'],
+                               data_length=meta['Data length'])
+        self.captures += 1
+
+    def add_write(self, text, meta=None):
+        self.payloads.add_write(meta['Data'],
+                                data_length=meta['Data length'])
+        self.captures += 1
+
+    def close_file(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+
+def _next_useful_meta_all(path):
+    analyzer = HeadlessAnalyzer(path)
+    try:
+        while analyzer.stream is not None:
+            try:
+                analyzer.next_useful_meta()
+            except StopIteration:
+                break
+    finally:
+        analyzer.close_file()
+    return analyzer.captures
+
+
+def bench_next_useful_meta(path, repeat):
+    """Measure the GUI's next_useful_meta loop over the whole file."""
+    seconds, captures = _best_time(lambda: _next_useful_meta_all(path),
+                                   repeat)
+    return {
+        'seconds': seconds,
+        'captures': captures,
+        'captures_per_s': captures / seconds,
+    }
+
+
+def _git_commit():
+    repo_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    try:
+        output = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=repo_dir, stderr=subprocess.DEVNULL,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('utf-8').strip()
+
+
+def run_benchmarks(rows=DEFAULT_ROWS, repeat=3, newline=b"\r\n", seed=0):
+    """Generate an SPM export and run every benchmark on it.
+
+    Args:
+        rows (int): The number of rows to generate.
+        repeat (int): How many times to run each timed benchmark (the
+            fastest run is kept).
+        newline (bytes): The newline of the generated file.
+        seed (int): The seed for benchmarks.generate.
+
+    Returns:
+        dict: The results (JSON-compatible). Each benchmark in
+            "benchmarks" is a dict of measurements, or has an "error"
+            if it couldn't run (such as if tkinter is missing).
+    """
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, "spm.csv")
+        counts = write_spm_log(path, rows=rows, seed=seed, newline=newline)
+        benchmarks = {}
+        for name, function in (
+                ('reader', lambda: bench_reader(path, repeat)),
+                ('reader_memory', lambda: bench_reader_memory(path)),
+                ('analyze_spm_log',
+                 lambda: bench_analyze_spm_log(path, repeat)),
+                ('next_useful_meta',
+                 lambda: bench_next_useful_meta(path, repeat))):
+            try:
+                benchmarks[name] = function()
+            except ImportError as ex:
+                benchmarks[name] = {'error': str(ex)}
+    finally:
+        shutil.rmtree(tmp)
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'options': {
+            'rows': rows,
+            'repeat': repeat,
+            'newline': newline.decode('ascii'),
+            'seed': seed,
+        },
+        'input': counts,
+        'benchmarks': benchmarks,
+    }
+
+
+def compare(old, new):
+    """Compare the results of two runs.
+
+    Args:
+        old (dict): Results from an earlier run_benchmarks.
+        new (dict): Results from a later one.
+
+    Returns:
+        list[str]: A line per measurement in both, with the ratio of
+            new to old (for seconds and peak_bytes, lower is better).
+    """
+    lines = []
+    if old.get('options') != new.get('options'):
+        lines.append("Warning: The options differ ({} vs {})"
+                     "".format(old.get('options'), new.get('options')))
+    for name, results in new['benchmarks'].items():
+        old_results = old['benchmarks'].get(name, {})
+        for key in ('seconds', 'peak_bytes'):
+            if key in results and old_results.get(key):
+                lines.append("{} {}: {:.4g} -> {:.4g} ({:.2f}x)".format(
+                    name, key, old_results[key], results[key],
+                    results[key] / old_results[key],
+                ))
+    return lines
+
+
+def usage():
+    print(__doc__, file=sys.stderr)
+
+
+def main():
+    options = {}
+    output = None
+    compare_path = None
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--lf":
+            options['newline'] = b"\n"
+        elif arg in ("--rows", "--repeat", "--output", "--compare"):
+            if not args:
+                usage()
+                print("Error: {} requires a value.".format(arg),
+                      file=sys.stderr)
+                return 1
+            value = args.pop(0)
+            if arg == "--output":
+                output = value
+            elif arg == "--compare":
+                compare_path = value
+            else:
+                options[arg[2:]] = int(value)
+        else:
+            usage()
+            print("Error: Unknown argument: {}".format(arg), file=sys.stderr)
+            return 1
+    results = run_benchmarks(**options)
+    text = json.dumps(results, indent=2)
+    if output:
+        with io.open(output, 'w', encoding='utf-8') as stream:
+            stream.write(text + "\n")
+        print("Saved {}".format(output), file=sys.stderr)
+    else:
+        print(text)
+    if compare_path:
+        with io.open(compare_path, 'r', encoding='utf-8') as stream:
+            old = json.load(stream)
+        for line in compare(old, results):
+            print(line, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,17 +5,788 @@ during the codecs.charmap_decode call where 0x9d is any character not in
 the encoding codec.
 """
 from __future__ import print_function
+import mmap
+import os
+import re
 import sys
+import time
 
 
 def echo0(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 
+CR = b"\r"
+LF = b"\n"
+NEWLINES = (CR, LF)
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024  # bytes per stream.read call in reader
+DEFAULT_POLL_INTERVAL = 1.0  # seconds between reads at EOF if following
+DEFAULT_STATS_EVERY = 10000  # rows between calls to a stats_callback
+
+_NEWLINE_RE = re.compile(b"[\r\n]")
+
+NON_EMPTY = object()  # allow any value except b"" (See RowFilter)
+
+_clock = getattr(time, 'perf_counter', time.time)  # Python 2 has no
+#   perf_counter
+
+
+def _skip_newline(buf, pos, prev_newline, skipping):
+    """Skip newline bytes left over from the end of the previous row.
+
+    Args:
+        buf (bytes): Buffered data.
+        pos (int): Index in buf where the next row would start.
+        prev_newline (bytes): The last newline byte seen (or None).
+        skipping (bool): Whether a newline was already skipped since the
+            previous row (then any further newline bytes are skipped).
+
+    Returns:
+        tuple: The new (pos, prev_newline, skipping).
+    """
+    n = len(buf)
+    while pos < n and prev_newline is not None:
+        ch = buf[pos:pos+1]
+        if ch not in NEWLINES:
+            break
+        if ch == prev_newline and not skipping:
+            break  # a blank line
+        # Skip it, the newline resumed from the previous call
+        #   (must be two-part Windows "\r\n" CR+LF newline, and
+        #   any blank lines directly after it are skipped).
+        skipping = True
+        prev_newline = ch
+        pos += 1
+    return pos, prev_newline, skipping
+
+
+def _find_row_end(buf, pos, final, quotechar=b'"'):
+    """Find the end of a row without splitting it into fields.
+
+    Args:
+        buf (bytes): Buffered data from the stream.
+        pos (int): An index in buf which is not inside of quotes.
+        final (bool): True if buf ends at the end of the stream.
+
+    Returns:
+        tuple: (end, terminator) as in the return of _parse_row, or None
+            if final is False and buf doesn't contain the end of the row.
+    """
+    parity = 0  # odd if inside of quotes
+    last = pos
+    for match in _NEWLINE_RE.finditer(buf, pos):
+        x = match.start()
+        parity = (parity + buf.count(quotechar, last, x)) % 2
+        last = x
+        if parity == 0:
+            return x + 1, buf[x:x+1]
+    if not final:
+        return None
+    return len(buf), None
+
+
+def _filtered(fields, row_filter, limit=None):
+    if limit is not None:
+        del fields[limit:]
+    if row_filter is None or row_filter.accepts(fields):
+        return fields
+    return None
+
+
+def _parse_row(buf, pos, final, delimiter=b";", quotechar=b'"',
+               row_filter=None, limit=None):
+    """Split one row out of a buffer of CSV bytes.
+
+    This is the tokenizer used by reader. It scans using bytes.find and
+    str.split (running in C) rather than examining one byte at a time.
+
+    Args:
+        buf (bytes): Buffered data from the stream.
+        pos (int): Index in buf where the row starts.
+        final (bool): True if buf ends at the end of the stream, so an
+            unterminated row or quote ends there.
+        delimiter (bytes): Field separator (one byte).
+        quotechar (bytes): Quote character (one byte). Two quotes in a
+            row inside of a quoted field are a literal quote.
+        row_filter (RowFilter): If set, the row is checked as soon as
+            the fields it needs are parsed, and if rejected, the rest of
+            the row is skipped without splitting it.
+        limit (int): If set, only split this many fields from the start
+            of the row (must be at least row_filter.fields), and skip
+            the rest of the row.
+
+    Returns:
+        tuple: (fields, end, terminator) where end is the index after
+            the row (including the newline) and terminator is the
+            newline byte that ended the row (None if ended by EOF).
+            fields is None if row_filter rejected the row.
+            None is returned instead if final is False and buf doesn't
+            contain the whole row yet.
+    """
+    n = len(buf)
+    match = _NEWLINE_RE.search(buf, pos)
+    e = match.start() if match else -1
+    q = buf.find(quotechar, pos, n if e < 0 else e)
+    if q < 0:
+        # Fast path: no quotes, so the line can be split directly.
+        if e < 0:
+            if not final:
+                return None
+            line, end, terminator = buf[pos:], n, None
+        else:
+            line, end, terminator = buf[pos:e], e + 1, buf[e:e+1]
+        if limit is not None:
+            fields = line.split(delimiter, limit)
+            return _filtered(fields, row_filter, limit), end, terminator
+        if row_filter is None:
+            return line.split(delimiter), end, terminator
+        fields = line.split(delimiter, row_filter.fields)
+        if not row_filter.accepts(fields):
+            return None, end, terminator
+        if len(fields) > row_filter.fields:
+            fields.extend(fields.pop().split(delimiter))
+        return fields, end, terminator
+    fields = []
+    parts = []  # pieces of the current field (split by quotes)
+    i = pos
+    while True:
+        if q >= 0:
+            stop = q
+        elif e >= 0:
+            stop = e
+        else:
+            stop = n
+        pieces = buf[i:stop].split(delimiter)
+        if len(pieces) > 1:
+            parts.append(pieces[0])
+            fields.append(b"".join(parts))
+            fields.extend(pieces[1:-1])
+            parts = [pieces[-1]]
+            if row_filter is not None and len(fields) >= row_filter.fields:
+                if not row_filter.accepts(fields):
+                    skipped = _find_row_end(buf, stop, final,
+                                            quotechar=quotechar)
+                    if skipped is None:
+                        return None
+                    return (None,) + skipped
+                row_filter = None  # accepted
+            if limit is not None and len(fields) >= limit and q >= 0:
+                skipped = _find_row_end(buf, stop, final,
+                                        quotechar=quotechar)
+                if skipped is None:
+                    return None
+                return (_filtered(fields, row_filter, limit),) + skipped
+        else:
+            parts.append(pieces[0])
+        if q < 0:
+            # The row ended (at a newline or the end of the buffer).
+            if e < 0:
+                if not final:
+                    return None
+                fields.append(b"".join(parts))
+                return _filtered(fields, row_filter, limit), n, None
+            fields.append(b"".join(parts))
+            return _filtered(fields, row_filter, limit), e + 1, buf[e:e+1]
+        i = q + 1
+        while True:  # inside of quotes
+            k = buf.find(quotechar, i)
+            if k < 0:
+                if not final:
+                    return None
+                parts.append(buf[i:])
+                fields.append(b"".join(parts))
+                return _filtered(fields, row_filter, limit), n, None
+            parts.append(buf[i:k])
+            if k + 1 >= n and not final:
+                return None  # can't tell yet if it is a "" escape
+            if buf[k+1:k+2] == quotechar:
+                # Two quotes is a literal quote in CSV (add as 1 quote)
+                parts.append(quotechar)
+                i = k + 2
+                continue
+            i = k + 1
+            break
+        if e < i:
+            # The quoted part contained the newline (or e is -1).
+            match = _NEWLINE_RE.search(buf, i)
+            e = match.start() if match else -1
+        q = buf.find(quotechar, i, n if e < 0 else e)
+
+
+class RowFilter:
+    """Accept or reject rows by the raw bytes of some of their fields.
+
+    The spec is a dict of column (name or index) to the allowed values
+    (a collection of bytes, or NON_EMPTY to allow any value except b""),
+    and a row is accepted if every column has an allowed value. The spec
+    may also be a list of such dicts, to accept a row if any of them
+    accepts it.
+
+    For example, accept only reads going up and writes going down:
+        RowFilter([
+            {"Function": [b"IRP_MJ_READ"], "Direction": [b"UP"]},
+            {"Function": [b"IRP_MJ_WRITE"], "Direction": [b"DOWN"]},
+        ], header=header_row)
+
+    Attributes:
+        fields (int): How many fields from the start of a row are
+            needed to check it.
+    """
+    def __init__(self, spec, header=None):
+        """Compile the spec.
+
+        Args:
+            spec (Union[dict,list[dict]]): See the class docstring.
+            header (list[str]): Column names, required if the spec uses
+                names instead of indices.
+        """
+        if hasattr(spec, 'items'):
+            spec = [spec]
+        self.alternatives = []
+        self.fields = 0
+        for conditions in spec:
+            compiled = []
+            for column, allowed in conditions.items():
+                if isinstance(column, int):
+                    index = column
+                elif header is None:
+                    raise ValueError(
+                        "Column {} is a name, so a header is required."
+                        "".format(repr(column)))
+                else:
+                    index = list(header).index(column)
+                if allowed is not NON_EMPTY:
+                    allowed = frozenset(
+                        value.encode('utf-8') if not isinstance(value, bytes)
+                        else value
+                        for value in allowed
+                    )
+                compiled.append((index, allowed))
+                self.fields = max(self.fields, index + 1)
+            self.alternatives.append(compiled)
+
+    def accepts(self, fields):
+        """Check the fields of a row (which may be incomplete).
+
+        Returns:
+            bool: Whether the row is accepted (a row with too few fields
+                is rejected).
+        """
+        count = len(fields)
+        for compiled in self.alternatives:
+            for index, allowed in compiled:
+                if index >= count:
+                    break
+                if allowed is NON_EMPTY:
+                    if not fields[index]:
+                        break
+                elif fields[index] not in allowed:
+                    break
+            else:
+                return True
+        return False
+
+
+def _join_views(parts):
+    """Combine the pieces of a field, copying only if necessary.
+
+    Returns:
+        memoryview or bytes: The only non-empty piece (no copy) if there
+            is only one, otherwise the pieces joined into new bytes.
+    """
+    found = None
+    for part in parts:
+        if len(part) > 0:
+            if found is not None:
+                return b"".join(parts)
+            found = part
+    if found is None:
+        return parts[0]
+    return found
+
+
+def _parse_row_views(buf, view, pos, delimiter=b";", quotechar=b'"'):
+    """Split one row out of a complete buffer, as slices of a view.
+
+    This works like _parse_row with final=True, but each field is a
+    memoryview slice of view instead of a copy, unless the field had to
+    be rebuilt (such as a quoted field with a "" escape in it).
+
+    Args:
+        buf (mmap.mmap): Data to search (must have a find method).
+        view (memoryview): A view of the same data as buf.
+        pos (int): Index where the row starts.
+
+    Returns:
+        tuple: (fields, end, terminator) (See _parse_row).
+    """
+    n = len(buf)
+    match = _NEWLINE_RE.search(buf, pos)
+    e = match.start() if match else -1
+    fields = []
+    parts = []  # pieces of the current field (split by quotes)
+    i = pos
+    while True:
+        stop = n if e < 0 else e
+        q = buf.find(quotechar, i, stop)
+        if q >= 0:
+            stop = q
+        while True:
+            d = buf.find(delimiter, i, stop)
+            if d < 0:
+                break
+            if parts:
+                parts.append(view[i:d])
+                fields.append(_join_views(parts))
+                parts = []
+            else:
+                fields.append(view[i:d])
+            i = d + 1
+        parts.append(view[i:stop])
+        if q < 0:
+            # The row ended (at a newline or the end of the buffer).
+            fields.append(_join_views(parts))
+            if e < 0:
+                return fields, n, None
+            return fields, e + 1, buf[e:e+1]
+        i = q + 1
+        while True:  # inside of quotes
+            k = buf.find(quotechar, i)
+            if k < 0:
+                parts.append(view[i:])
+                fields.append(_join_views(parts))
+                return fields, n, None
+            parts.append(view[i:k])
+            if buf[k+1:k+2] == quotechar:
+                # Two quotes is a literal quote in CSV (add as 1 quote)
+                parts.append(quotechar)
+                i = k + 2
+                continue
+            i = k + 1
+            break
+        if e < i:
+            # The quoted part contained the newline (or e is -1).
+            match = _NEWLINE_RE.search(buf, i)
+            e = match.start() if match else -1
+
+
+class ReaderStats:
+    """Counters collected by a reader with stats enabled.
+
+    Attributes:
+        bytes_read (int): Bytes returned by stream.read.
+        reads (int): Calls to stream.read.
+        read_seconds (float): Time spent blocked in stream.read.
+        parse_seconds (float): Time spent splitting rows into fields.
+        bytes_consumed (int): Bytes through the end of the last row
+            (See reader.cur).
+        rows (int): Rows returned by the reader.
+        rows_filtered (int): Rows rejected by the reader's row_filter.
+        longest_field (int): Length of the longest field returned.
+        longest_field_line (int): The line number of that field's row.
+        quotes (int): Quote characters in the rows (including rows that
+            were filtered out).
+        escapes (int): "" escapes (literal quotes) in the fields
+            returned.
+    """
+    __slots__ = ('bytes_read', 'reads', 'read_seconds', 'parse_seconds',
+                 'bytes_consumed', 'rows', 'rows_filtered', 'longest_field',
+                 'longest_field_line', 'quotes', 'escapes')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+        self.read_seconds = 0.0
+        self.parse_seconds = 0.0
+
+    def copy(self):
+        stats = ReaderStats()
+        for name in self.__slots__:
+            setattr(stats, name, getattr(self, name))
+        return stats
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return "ReaderStats({})".format(", ".join(
+            "{}={}".format(name, repr(getattr(self, name)))
+            for name in self.__slots__
+        ))
+
+
 class reader:
     """Read CSV files containing binary data with no encoding.
+
+    Data is read from the stream in blocks of block_size bytes and
+    split into fields by _parse_row. Rows are lists of bytes. A row may
+    span any number of blocks.
+
+    A newline may be CR, LF or both (a newline byte directly after a
+    different newline byte is skipped), the same as bytewise_reader.
     """
     # formerly BinaryCSVReader
+    def __init__(self, stream, delimiter=b";", quotechar=b'"',
+                 block_size=DEFAULT_BLOCK_SIZE, filters=None, columns=None,
+                 follow=False, poll_interval=DEFAULT_POLL_INTERVAL,
+                 idle_timeout=None, stats=False, stats_callback=None,
+                 stats_every=DEFAULT_STATS_EVERY, decompress=True):
+        """Prepare to read rows from a stream.
+
+        Args:
+            stream: A file or other stream in binary mode.
+            block_size (int): Bytes to read from the stream at a time.
+            filters (Union[dict,list]): See set_filters.
+            columns (list): See set_columns (names are found in the
+                first row, which is treated as the header, so it is
+                returned even if filters would reject it).
+            follow (bool): Keep reading the stream as it grows (like
+                "tail -f"). At EOF, an incomplete last row is kept
+                buffered, and the stream is read again every
+                poll_interval seconds until more data is appended.
+            poll_interval (float): Seconds between reads at EOF while
+                following.
+            idle_timeout (float): If following, stop (as if at EOF)
+                after this many seconds without new data. If None,
+                follow forever (until follow is set to False).
+            stats (bool): Collect counters and timings (See the stats
+                property). This makes reading slightly slower.
+            stats_callback (Callable): If set, call it with a snapshot
+                of the stats (a ReaderStats) after every stats_every
+                rows (stats are collected even if stats is False).
+            stats_every (int): Rows between calls to stats_callback.
+            decompress (bool): If the stream is gzip, bzip2 or xz
+                compressed (detected by its magic bytes), decompress it
+                as it is read. Then cur, seek_offset and stats count
+                uncompressed bytes. The stream must be able to peek or
+                seek for this to be detected.
+        """
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1 but is {}"
+                             "".format(block_size))
+        self.compression = None  # the format if decompressing
+        if decompress and not follow:
+            stream, self.compression = decompress_stream(stream)
+        self.stream = stream
+        self.line_number = 0  # stay on the line number last processed
+        #  for error tracing (increment during __next__ on newline).
+        self.cur = 0  # bytes consumed, through the end of the last row
+        self.delimiter = delimiter
+        self.quotechar = quotechar
+        self.block_size = block_size
+        self.prev_newline = None
+        self.allow_literal_newlines = False  # Not fully implemented
+        self._buf = b""
+        self._pos = 0  # index in _buf of the next unconsumed byte
+        self._offset = 0  # stream position of _buf[0]
+        self._eof = False
+        self._skipping = False  # skipping newlines after a newline
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.index = None  # a binarycsv.index.RowIndex for seek_row
+        self.header = None  # column names (str) if set by read_batches
+        self.row_filter = None
+        self.rows_filtered = 0  # rows rejected by row_filter
+        self.columns = None  # indices of columns to keep (None for all)
+        self._columns_pending = None  # names to find in the header row
+        self._limit = None  # fields needed from the start of each row
+        self._stats = None
+        if stats or stats_callback is not None:
+            self._stats = ReaderStats()
+        self.stats_callback = stats_callback
+        self.stats_every = stats_every
+        if filters is not None:
+            self.set_filters(filters)
+        if columns is not None:
+            if all(isinstance(column, int) for column in columns):
+                self.set_columns(columns)
+            else:
+                self._columns_pending = columns
+
+    def __iter__(self):
+        return self
+
+    @property
+    def stats(self):
+        """A snapshot of the counters (a ReaderStats), or None if stats
+        were not enabled.
+        """
+        if self._stats is None:
+            return None
+        stats = self._stats.copy()
+        stats.bytes_consumed = self.cur
+        stats.rows_filtered = self.rows_filtered
+        return stats
+
+    def _fill(self):
+        """Read another block, keeping the unconsumed part of _buf.
+
+        Returns:
+            bool: False if the stream is at EOF.
+        """
+        # Read at least as much as is buffered, so a huge row doesn't
+        #   get re-scanned once per block (the buffer doubles instead).
+        if self._stats is None:
+            return self._append(self.stream.read(self._read_size()))
+        start = _clock()
+        data = self.stream.read(self._read_size())
+        self._stats.read_seconds += _clock() - start
+        return self._append(data)
+
+    def _read_size(self):
+        return max(self.block_size, len(self._buf) - self._pos)
+
+    def _append(self, data):
+        """Add data read from the stream to the buffer (See _fill).
+
+        Args:
+            data (bytes): The data, or b"" at EOF.
+        """
+        if sys.version_info.major >= 3:
+            if not isinstance(data, bytes):
+                raise ValueError(
+                    "The stream should be in binary mode 'rb'"
+                    " but is not (probably was 'r')."
+                )
+        if self._stats is not None:
+            self._stats.reads += 1
+            self._stats.bytes_read += len(data)
+        if len(data) < 1 and self.follow:
+            return False  # Keep any incomplete row until it is finished.
+        rest = self._buf[self._pos:]
+        self._offset += self._pos
+        self._pos = 0
+        if len(data) < 1:
+            self._eof = True
+            self._buf = rest
+            return False
+        self._buf = rest + data if rest else data
+        return True
+
+    def _next_buffered(self):
+        """Get the next row if the buffer contains all of it.
+
+        Returns:
+            list: The row, or None if more data must be read first.
+
+        Raises:
+            StopIteration: If the buffer is at EOF.
+        """
+        while True:
+            buf = self._buf
+            pos = self._pos
+            n = len(buf)
+            pos, self.prev_newline, self._skipping = _skip_newline(
+                buf, pos, self.prev_newline, self._skipping)
+            self._pos = pos
+            if pos >= n:
+                if self._eof:
+                    self.cur = self._offset + self._pos
+                    raise StopIteration()
+                return None
+            stats = self._stats
+            if stats is not None:
+                start = _clock()
+            row_filter = self.row_filter
+            if self._columns_pending is not None:
+                row_filter = None  # The header row has the names.
+            result = _parse_row(buf, pos, self._eof,
+                                delimiter=self.delimiter,
+                                quotechar=self.quotechar,
+                                row_filter=row_filter,
+                                limit=self._limit)
+            if stats is not None:
+                stats.parse_seconds += _clock() - start
+            if result is None:
+                return None
+            fields, self._pos, self.prev_newline = result
+            if stats is not None:
+                stats.quotes += buf.count(self.quotechar, pos, self._pos)
+            self._skipping = False
+            self.line_number += 1
+            # ^ the *last* line number, for error tracing such as
+            #   syntax errors; starts at 1 though is at 0 *before* the
+            #   line is completed.
+            self.cur = self._offset + self._pos
+            if fields is None:
+                self.rows_filtered += 1
+                continue
+            if self._columns_pending is not None:
+                # This is the header row, so find the columns by name.
+                self.set_columns(
+                    self._columns_pending,
+                    header=[name.decode('utf-8') for name in fields],
+                )
+            if self.columns is not None:
+                try:
+                    fields = [fields[i] for i in self.columns]
+                except IndexError:
+                    raise ValueError(
+                        "Line {}: there are only {} columns but columns {}"
+                        " were selected.".format(self.line_number,
+                                                 len(fields), self.columns))
+            if stats is not None:
+                self._count_row(fields)
+            return fields
+
+    def _count_row(self, fields):
+        """Update the stats for a row that is about to be returned."""
+        stats = self._stats
+        stats.rows += 1
+        for field in fields:
+            if len(field) > stats.longest_field:
+                stats.longest_field = len(field)
+                stats.longest_field_line = self.line_number
+            stats.escapes += field.count(self.quotechar)
+        if (self.stats_callback is not None
+                and stats.rows % self.stats_every == 0):
+            self.stats_callback(self.stats)
+
+    def __next__(self):
+        idle_since = None
+        while True:
+            fields = self._next_buffered()
+            if fields is not None:
+                return fields
+            if self._fill() or not self.follow:
+                idle_since = None
+                continue
+            # Following and at EOF, so wait for the stream to grow.
+            now = time.time()
+            if idle_since is None:
+                idle_since = now
+            elif (self.idle_timeout is not None
+                    and now - idle_since >= self.idle_timeout):
+                self.follow = False  # The next read at EOF is final.
+                continue
+            time.sleep(self.poll_interval)
+
+    next = __next__  # Python 2
+
+    def set_filters(self, filters, header=None):
+        """Skip rows that don't match a filter spec from now on.
+
+        Rejected rows are skipped as soon as the fields in the spec are
+        checked, without splitting the rest of the row, but they are
+        still counted by line_number (and by rows_filtered).
+
+        Args:
+            filters (Union[dict,list,RowFilter]): The spec (See
+                RowFilter), or None to stop filtering.
+            header (list[str]): Column names, if the spec uses them.
+                For example, set filters after reading the header row.
+        """
+        if filters is not None and not isinstance(filters, RowFilter):
+            filters = RowFilter(filters, header=header)
+        self.row_filter = filters
+        self._update_limit()
+
+    def set_columns(self, columns, header=None):
+        """Only keep some columns of each row from now on, in this order.
+
+        Fields after the last selected column are skipped without
+        splitting them (though quotes are still followed to find the
+        end of the row).
+
+        Args:
+            columns (list): Column indices, or names (if header is set),
+                or None to keep all of them.
+            header (list[str]): Column names.
+        """
+        self._columns_pending = None
+        if columns is None:
+            self.columns = None
+        else:
+            indices = []
+            for column in columns:
+                if not isinstance(column, int):
+                    if header is None:
+                        raise ValueError(
+                            "Column {} is a name, so a header is required."
+                            "".format(repr(column)))
+                    column = list(header).index(column)
+                indices.append(column)
+            self.columns = indices
+        self._update_limit()
+
+    def _update_limit(self):
+        if self.columns is None:
+            self._limit = None
+            return
+        self._limit = max(self.columns) + 1
+        if self.row_filter is not None:
+            self._limit = max(self._limit, self.row_filter.fields)
+
+    def read_batches(self, batch_rows=65536, columns=None,
+                     time_format="%d/%m/%Y %H:%M:%S"):
+        """Read the rest of the file as column batches of NumPy arrays.
+
+        See binarycsv.batches.read_batches (requires numpy).
+        """
+        return read_batches(self, batch_rows=batch_rows, columns=columns,
+                            time_format=time_format)
+
+    def seek_offset(self, pos, prev_newline=None, line_number=None):
+        """Continue reading at a byte offset in the stream.
+
+        The stream must be seekable, and pos must be the start of a row
+        (such as reader.cur after a row, or an offset from a RowIndex),
+        since quoting can't be determined from an arbitrary offset.
+
+        Args:
+            pos (int): Byte offset of the start of a row.
+            prev_newline (bytes): The newline that ended the row before
+                pos, so the second half of a CR+LF can be skipped.
+            line_number (int): The number of rows before pos, if known
+                (becomes line_number, otherwise it is left unchanged).
+        """
+        self.stream.seek(pos)
+        self._buf = b""
+        self._pos = 0
+        self._offset = pos
+        self._eof = False
+        self._skipping = False
+        self.prev_newline = prev_newline
+        self.cur = pos
+        if line_number is not None:
+            self.line_number = line_number
+
+    def seek_row(self, number, index=None):
+        """Continue reading at a row, so next() returns that row.
+
+        Args:
+            number (int): The 0-based row number (the header is 0).
+            index (binarycsv.index.RowIndex): The index of the stream,
+                to jump to the nearest checkpoint at or before the row.
+                If None, self.index is used. If neither is set, reading
+                restarts at offset 0.
+
+        Raises:
+            IndexError: If the stream has fewer rows than number.
+        """
+        if index is None:
+            index = self.index
+        if index is not None:
+            row, pos, prev_newline = index.checkpoint(number)
+        else:
+            row, pos, prev_newline = 0, 0, None
+        self.seek_offset(pos, prev_newline=prev_newline, line_number=row)
+        while self.line_number < number:
+            try:
+                self.__next__()
+            except StopIteration:
+                raise IndexError("There are only {} rows (can't seek to {})"
+                                 "".format(self.line_number, number))
+
+
+class bytewise_reader:
+    """Read CSV files containing binary data one byte at a time.
+
+    This is the original engine of reader. It is much slower, but is
+    kept as a reference implementation which reader must match.
+    """
     def __init__(self, stream, delimiter=b";", quotechar=b'"'):
         self.stream = stream
         self.line_number = 0  # stay on the line number last processed
@@ -34,7 +805,8 @@ class reader:
         in_quote = None
         in_newline = None
         field = b""
-        prev_char = None
+        closed_quote = False
+        consumed = False  # whether any byte of this row was read
         while True:
             ch = self.stream.read(1)
             self.cur += 1
@@ -45,31 +817,40 @@ class reader:
                         " but is not (probably was 'r')."
                     )
             if len(ch) < 1:
-                if len(field) > 0:
+                if consumed:
+                    # The last line has no newline.
                     fields.append(field)
+                    self.line_number += 1
+                    self.prev_newline = None
+                    return fields
                 # echo0("Done reading %s at pos %s (line %s)"
                 #       % ("binary CSV file", self.cur, self.line_number+1))
                 raise StopIteration()
+            just_closed = closed_quote
+            closed_quote = False
+            consumed = True
             if in_quote is not None:
                 if ch == self.quotechar:
                     in_quote = None
                     in_newline = None
-                    if prev_char == self.quotechar:
-                        # Two quotes is a literal quote in CSV (add as 1 quote)
-                        field += ch
+                    closed_quote = True
                 else:
                     field += ch
                 if self.allow_literal_newlines:
                     in_newline = None  # Don't treat it as a line delimiter
             else:
                 if ch == self.quotechar:
+                    if just_closed:
+                        # Two quotes is a literal quote in CSV (add as 1 quote)
+                        field += ch
                     in_quote = ch
                     in_newline = None
-                elif ch in (b"\r", b"\n"):
+                elif ch in NEWLINES:
                     if in_newline is None:
                         if ((self.prev_newline is not None)
                                 and (self.prev_newline != ch)):
                             in_newline = ch
+                            consumed = False
                             # Skip it, the newline resumed from the
                             #   previous call (must be two-part Windows
                             #   "\r\n" CR+LF newline.
@@ -84,6 +865,8 @@ class reader:
                             field = b""
                             self.prev_newline = ch
                             break  # return the fields only on newline/EOF
+                    else:
+                        consumed = False  # still skipping newlines
                     in_newline = ch
                 elif ch == self.delimiter:
                     fields.append(field)
@@ -92,11 +875,94 @@ class reader:
                 else:
                     field += ch
                     in_newline = None
-            prev_char = ch
             self.prev_newline = in_newline
 
         return fields
 
+    next = __next__  # Python 2
+
+
+class mmap_reader:
+    """Read a CSV file by memory-mapping it (zero-copy).
+
+    Fields are memoryview slices of the mapped file instead of new
+    bytes, except fields which had to be rebuilt (a quoted field
+    containing a "" escape, or a field with text both inside and
+    outside of quotes), which are bytes. Use bytes(field) to keep a
+    field after the reader is closed.
+
+    Rows are otherwise the same as those from reader.
+    """
+    def __init__(self, path, delimiter=b";", quotechar=b'"'):
+        self.path = path
+        self.line_number = 0  # stay on the line number last processed
+        #  for error tracing (increment during __next__ on newline).
+        self.cur = 0  # bytes consumed, through the end of the last row
+        self.delimiter = delimiter
+        self.quotechar = quotechar
+        self.prev_newline = None
+        self._skipping = False  # skipping newlines after a newline
+        self._map = None
+        self._view = None
+        compression = file_compression(path)
+        if compression is not None:
+            raise ValueError('"{}" is {} compressed, so it can\'t be mapped'
+                             ' (use reader instead).'
+                             ''.format(path, compression))
+        self.stream = open(path, mode='rb')
+        if os.fstat(self.stream.fileno()).st_size > 0:
+            # (An empty file can't be mapped, but has no rows anyway.)
+            self._map = mmap.mmap(self.stream.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+
+    def __iter__(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Unmap and close the file.
+
+        Raises:
+            BufferError: If fields from this reader (memoryview slices)
+                still exist, since the map can't be closed until all of
+                them are released.
+        """
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def __next__(self):
+        if self._map is None:
+            raise StopIteration()
+        buf = self._map
+        pos, self.prev_newline, self._skipping = _skip_newline(
+            buf, self.cur, self.prev_newline, self._skipping)
+        if pos >= len(buf):
+            self.cur = pos
+            raise StopIteration()
+        fields, self.cur, self.prev_newline = _parse_row_views(
+            buf, self._view, pos,
+            delimiter=self.delimiter,
+            quotechar=self.quotechar,
+        )
+        self._skipping = False
+        self.line_number += 1
+        return fields
+
+    next = __next__  # Python 2
+
 
 def ascii_string(value):
     """Prevent UnicodeDecodeError when using for Tkinter widget text.
@@ -149,3 +1015,83 @@ def pformat(value, prefer_quote='"'):
     else:
         result = str(value)
     return result
+
+
+# Submodules which depend on the reader (import them last):
+from binarycsv.index import (  # noqa: E402
+    RowIndex,
+    build_index,
+    get_index,
+    load_index,
+)
+from binarycsv.timestamps import (  # noqa: E402
+    SPM_TIME_FORMAT,
+    TimeConverter,
+    parse_spm_time,
+)
+from binarycsv.compression import (  # noqa: E402
+    decompress_stream,
+    detect_compression,
+    file_compression,
+)
+from binarycsv.batches import (  # noqa: E402
+    ColumnBatch,
+    PayloadColumn,
+    read_batches,
+)
+from binarycsv.payloads import (  # noqa: E402
+    PayloadTotals,
+    decode_hex,
+    decode_hex_column,
+    hex_length,
+)
+from binarycsv.records import (  # noqa: E402
+    DictReader,
+    Record,
+    make_record_type,
+)
+from binarycsv.reassembly import (  # noqa: E402
+    ByteStream,
+    Reassembler,
+)
+from binarycsv.captures import (  # noqa: E402
+    CaptureStore,
+)
+from binarycsv.signatures import (  # noqa: E402
+    AhoCorasick,
+    SignatureHit,
+    SignatureScanner,
+)
+from binarycsv.frames import (  # noqa: E402
+    Frame,
+    FrameDecoder,
+    FrameSpec,
+    crc16_ccitt,
+    crc32,
+    sum8,
+    xor8,
+)
+from binarycsv.traffic import (  # noqa: E402
+    QuantileSketch,
+    TrafficStats,
+)
+from binarycsv.writers import (  # noqa: E402
+    batch_rows,
+    writer,
+)
+from binarycsv.cache import (  # noqa: E402
+    CacheWriter,
+    ColumnCache,
+    build_cache,
+    cache_path,
+    cached_rows,
+    get_cache,
+    load_cache,
+)
+if sys.version_info.major >= 3:
+    from binarycsv.parallel import (  # noqa: E402
+        parallel_read,
+    )
+    from binarycsv.asyncreader import (  # noqa: E402
+        AsyncReader,
+    )
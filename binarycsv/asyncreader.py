@@ -0,0 +1,67 @@
+"""
+Read binary CSV data from an asyncio stream (such as a socket or pipe).
+"""
+import time
+
+from binarycsv import (
+    DEFAULT_STATS_EVERY,
+    reader,
+)
+
+DEFAULT_ASYNC_BLOCK_SIZE = 64 * 1024
+
+
+class AsyncReader(reader):
+    """Read rows from an asyncio.StreamReader using "async for".
+
+    Rows are parsed the same way as by reader (and filters and columns
+    work the same way), but data is read with "await stream.read(n)",
+    which returns as soon as any data is available, and each row is
+    yielded as soon as it is complete.
+
+    Data is only read when the next row is requested and isn't already
+    buffered, so at most one incomplete row plus one block is buffered
+    here. When the consumer falls behind, the StreamReader's own buffer
+    fills up to its limit and asyncio pauses reading from the transport,
+    which applies backpressure to the sender.
+    """
+    def __init__(self, stream, delimiter=b";", quotechar=b'"',
+                 block_size=DEFAULT_ASYNC_BLOCK_SIZE, filters=None,
+                 columns=None, stats=False, stats_callback=None,
+                 stats_every=DEFAULT_STATS_EVERY):
+        reader.__init__(self, stream, delimiter=delimiter,
+                        quotechar=quotechar, block_size=block_size,
+                        filters=filters, columns=columns, stats=stats,
+                        stats_callback=stats_callback,
+                        stats_every=stats_every)
+
+    def __iter__(self):
+        raise TypeError("Use \"async for\" with an AsyncReader.")
+
+    def __next__(self):
+        raise TypeError("Use \"async for\" with an AsyncReader.")
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            try:
+                fields = self._next_buffered()
+            except StopIteration:
+                raise StopAsyncIteration()
+            if fields is not None:
+                return fields
+            if self._stats is None:
+                self._append(await self.stream.read(self._read_size()))
+                continue
+            start = time.perf_counter()
+            data = await self.stream.read(self._read_size())
+            self._stats.read_seconds += time.perf_counter() - start
+            self._append(data)
+
+    def seek_offset(self, pos, prev_newline=None, line_number=None):
+        raise TypeError("An asyncio stream can't seek.")
+
+    def seek_row(self, number, index=None):
+        raise TypeError("An asyncio stream can't seek.")
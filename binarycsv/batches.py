@@ -0,0 +1,236 @@
+"""
+Read a CSV file as column-oriented batches of NumPy arrays.
+
+This requires numpy (it is optional for the rest of binarycsv).
+
+Each column is converted according to its kind:
+- "int": an int64 array (missing values, such as an empty "Data
+  length", are MISSING_INT).
+- "time": a datetime64[s] array (missing values are NaT).
+- "category": an int16 array of codes, where
+  ColumnBatch.categories[name][code] is the original bytes value. Codes
+  are the same for every batch from the same reader.
+- "bytes": a PayloadColumn (all values in one bytes buffer with an
+  offsets array).
+"""
+from __future__ import print_function
+from collections import OrderedDict
+from operator import itemgetter
+
+from binarycsv.timestamps import (
+    SPM_TIME_FORMAT,
+    TimeConverter,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_BATCH_ROWS = 65536
+DEFAULT_TIME_FORMAT = SPM_TIME_FORMAT
+MISSING_INT = -1
+
+KINDS = ("int", "time", "category", "bytes")
+
+
+class PayloadColumn:
+    """Variable-length bytes values stored contiguously.
+
+    Attributes:
+        data (bytes): All of the values concatenated (or a memoryview,
+            such as of a cache file).
+        offsets (numpy.ndarray): len(self)+1 int64 offsets, so value i
+            is data[offsets[i]:offsets[i+1]].
+    """
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.data[self.offsets[i]:self.offsets[i+1]])
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+
+class ColumnBatch:
+    """Several rows of a CSV file stored by column.
+
+    Attributes:
+        columns (OrderedDict): Column name to array (or PayloadColumn).
+        categories (dict): Column name to the list of values for each
+            code, for "category" columns.
+        line_number (int): The reader.line_number of the first row.
+    """
+    def __init__(self, columns, categories, line_number):
+        self.columns = columns
+        self.categories = categories
+        self.line_number = line_number
+
+    def __len__(self):
+        for values in self.columns.values():
+            return len(values)
+        return 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def keys(self):
+        return self.columns.keys()
+
+    def decode(self, name):
+        """Get the bytes value of each code in a "category" column."""
+        categories = self.categories[name]
+        return [categories[code] for code in self.columns[name]]
+
+
+def _to_int(values, missing=MISSING_INT):
+    return np.array([int(v) if v else missing for v in values],
+                    dtype=np.int64)
+
+
+def _to_codes(values, lookup, categories):
+    codes = np.empty(len(values), dtype=np.int16)
+    for i, value in enumerate(values):
+        code = lookup.get(value)
+        if code is None:
+            code = len(categories)
+            if code > np.iinfo(np.int16).max:
+                raise ValueError("There are too many different values for"
+                                 " a category column.")
+            lookup[value] = code
+            categories.append(value)
+        codes[i] = code
+    return codes
+
+
+def _to_payload(values):
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(v) for v in values], out=offsets[1:])
+    return PayloadColumn(b"".join(values), offsets)
+
+
+def resolve_columns(header, columns=None):
+    """Get the names, indices and kinds of the columns to read.
+
+    Args:
+        header (list[str]): The column names of the file.
+        columns (Union[list,dict]): See read_batches.
+
+    Returns:
+        tuple: (names, indices, kinds), each a list with an item per
+            column.
+
+    Raises:
+        ValueError: If a kind isn't in KINDS or a name isn't in header.
+    """
+    if columns is None:
+        columns = header
+    if not hasattr(columns, 'items'):
+        columns = [(column, "bytes") for column in columns]
+    else:
+        columns = list(columns.items())
+    names = []
+    indices = []
+    kinds = []
+    for column, kind in columns:
+        if kind not in KINDS:
+            raise ValueError("The kind of {} is {} but should be one of {}"
+                             "".format(repr(column), repr(kind), KINDS))
+        if isinstance(column, int):
+            index = column
+        else:
+            index = header.index(column)
+        names.append(header[index])
+        indices.append(index)
+        kinds.append(kind)
+    return names, indices, kinds
+
+
+def read_batches(_reader, batch_rows=DEFAULT_BATCH_ROWS, columns=None,
+                 time_format=DEFAULT_TIME_FORMAT):
+    """Read the rest of a CSV file as ColumnBatch objects.
+
+    The first row is the header. If no rows were read from the reader
+    yet, it is read here, otherwise set _reader.header (a list of str)
+    before calling this. If the reader only keeps some columns (See
+    reader.set_columns), _reader.header may be the names of every
+    column (then the names of the kept columns are taken from it) or
+    only of the kept columns.
+
+    Args:
+        _reader (binarycsv.reader): The reader of the file.
+        batch_rows (int): The maximum number of rows per batch.
+        columns (Union[list,dict]): Column names (or indices) to keep,
+            or a dict of them to the kind of each (See KINDS). A list
+            keeps the columns as "bytes". If None, keep every column as
+            "bytes".
+        time_format (str): The strptime format for "time" columns.
+
+    Yields:
+        ColumnBatch: Up to batch_rows rows.
+    """
+    if np is None:
+        raise ImportError("read_batches requires numpy.")
+    header = getattr(_reader, 'header', None)
+    if header is None:
+        header = [name.decode('utf-8') for name in next(_reader)]
+        _reader.header = header
+    kept = getattr(_reader, 'columns', None)
+    if kept is not None and len(header) != len(kept):
+        # The rows only have the kept columns, so name only those.
+        if max(kept) >= len(header):
+            raise ValueError(
+                "The reader keeps columns {} but the header only has {}"
+                " names: {}".format(kept, len(header), header))
+        header = [header[i] for i in kept]
+    names, indices, kinds = resolve_columns(header, columns)
+    getter = itemgetter(*indices)
+    time_converter = TimeConverter(time_format=time_format)
+    lookups = {name: {} for name in names}
+    categories = {name: [] for name, kind in zip(names, kinds)
+                  if kind == "category"}
+    while True:
+        line_number = None
+        rows = []
+        for row in _reader:
+            if line_number is None:
+                # (Not the line after the last batch, since filtered
+                #   rows may be skipped before this one.)
+                line_number = _reader.line_number
+            if len(row) != len(header):
+                raise ValueError(
+                    'Line {}: {} length is {} but there are {} columns'
+                    ' in header row: {}'
+                    .format(_reader.line_number, row, len(row),
+                            len(header), header))
+            rows.append(getter(row))
+            if len(rows) >= batch_rows:
+                break
+        if not rows:
+            return
+        if len(indices) == 1:
+            by_column = [rows]
+        else:
+            by_column = list(zip(*rows))
+        arrays = []
+        for name, kind, values in zip(names, kinds, by_column):
+            if kind == "int":
+                arrays.append((name, _to_int(values)))
+            elif kind == "time":
+                arrays.append((name,
+                               time_converter.datetime64_array(values)))
+            elif kind == "category":
+                arrays.append((name, _to_codes(values, lookups[name],
+                                               categories[name])))
+            else:
+                arrays.append((name, _to_payload(values)))
+        yield ColumnBatch(
+            OrderedDict(arrays),
+            {name: list(values) for name, values in categories.items()},
+            line_number,
+        )
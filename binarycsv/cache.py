@@ -0,0 +1,488 @@
+"""
+Columnar cache files for reopening a parsed CSV file instantly.
+
+A cache is a sidecar file next to the CSV file holding the columns of
+every row as they come from read_batches: fixed-width arrays for "int",
+"time" and "category" columns, and one blob with an offsets array for
+each "bytes" column. Opening it maps the file into memory and wraps the
+arrays without parsing anything, so only the pages that are used are
+ever read.
+
+Layout (little-endian):
+- MAGIC (8 bytes)
+- the length of the metadata (8 bytes)
+- the metadata as JSON (column names, kinds and where each array is,
+  the CSV header, and the size, modification time and a digest of the
+  CSV file), padded to a multiple of 8 bytes
+- the arrays, each starting at a multiple of 8 bytes
+
+The cache is only used while the CSV file is unchanged (See load_cache).
+This requires numpy.
+"""
+from __future__ import print_function
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from collections import OrderedDict
+
+from binarycsv import (
+    reader,
+    echo0,
+)
+from binarycsv.batches import (
+    DEFAULT_BATCH_ROWS,
+    DEFAULT_TIME_FORMAT,
+    MISSING_INT,
+    ColumnBatch,
+    PayloadColumn,
+    np,
+    read_batches,
+    resolve_columns,
+)
+
+CACHE_EXT = ".cache.bin"
+CACHE_VERSION = 1
+MAGIC = b"BCSVCAC1"
+DIGEST_SPAN = 65536  # bytes hashed at each end of the CSV file
+
+_LENGTH = struct.Struct("<Q")
+_DTYPES = {
+    "int": "<i8",
+    "time": "<i8",  # seconds since the epoch (datetime64[s])
+    "category": "<i2",
+    "bytes": "<i8",  # the offsets (the values are in a separate blob)
+}
+
+
+def cache_path(path):
+    """Get the path of the sidecar cache file for a CSV file."""
+    return path + CACHE_EXT
+
+
+def source_key(path):
+    """Identify the current contents of a file cheaply.
+
+    Returns:
+        dict: The size, modification time, and a SHA-1 of the size and
+            the first and last DIGEST_SPAN bytes (so a file replaced by
+            one of the same size and time is usually still noticed).
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha1(str(stat.st_size).encode('ascii'))
+    with open(path, 'rb') as stream:
+        digest.update(stream.read(DIGEST_SPAN))
+        if stat.st_size > DIGEST_SPAN:
+            stream.seek(max(DIGEST_SPAN, stat.st_size - DIGEST_SPAN))
+            digest.update(stream.read(DIGEST_SPAN))
+    return {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'digest': digest.hexdigest(),
+    }
+
+
+class ColumnCache:
+    """The columns of a CSV file loaded from a cache file.
+
+    The arrays are views of the mapped file, so they are read-only and
+    are only valid until close is called.
+
+    Attributes:
+        path (str): The cache file.
+        header (list[str]): Every column name of the CSV file.
+        batch (ColumnBatch): The cached columns of every row (except
+            the header row), where "bytes" columns are PayloadColumn
+            objects whose data is a memoryview.
+        kinds (OrderedDict): The kind of each cached column.
+        time_format (str): The format of "time" columns in the CSV.
+    """
+    def __init__(self, path, meta, data):
+        self.path = path
+        self.header = meta['header']
+        self.time_format = meta['time_format']
+        self.kinds = OrderedDict(
+            (column['name'], column['kind']) for column in meta['columns'])
+        self._map = data
+        self._time_cache = {}
+        base = meta['data_offset']
+        view = memoryview(data)
+        columns = OrderedDict()
+        categories = {}
+        for column in meta['columns']:
+            name = column['name']
+            kind = column['kind']
+            values = np.frombuffer(data, dtype=_DTYPES[kind],
+                                   count=column['count'],
+                                   offset=base + column['offset'])
+            if kind == "time":
+                values = values.view('datetime64[s]')
+            elif kind == "category":
+                categories[name] = [value.encode('latin-1')
+                                    for value in column['categories']]
+            elif kind == "bytes":
+                start = base + column['blob_offset']
+                values = PayloadColumn(
+                    view[start:start + column['blob_length']], values)
+            columns[name] = values
+        self.batch = ColumnBatch(columns, categories, 2)
+
+    def __len__(self):
+        return len(self.batch)
+
+    def row(self, i):
+        """Get the cached fields of a row (See cached_rows)."""
+        return self.rows([i])[0]
+
+    def rows(self, indices):
+        """Get the cached fields of several rows (See cached_rows)."""
+        return cached_rows(self.batch, indices, self.kinds,
+                           self.time_format, self._time_cache)
+
+    def close(self):
+        """Unmap the file (arrays from this cache must not be used
+        after this).
+        """
+        if self._map is not None:
+            self.batch = None
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # An array is still in use, so let it be unmapped
+                #   when it is garbage collected.
+            self._map = None
+
+
+def cached_rows(batch, indices, kinds, time_format=DEFAULT_TIME_FORMAT,
+                time_cache=None):
+    """Get some rows of a ColumnBatch as lists of bytes (as they were
+    in the CSV file, except for the formatting of numbers).
+
+    Args:
+        batch (ColumnBatch): The columns.
+        indices (list[int]): The index of each row to get.
+        kinds (OrderedDict): The kind of each column to include.
+        time_format (str): The strftime format for "time" columns.
+        time_cache (dict): If set, formatted times are kept here to
+            reuse for later rows (times are often repeated).
+
+    Returns:
+        list[list[bytes]]: The rows.
+    """
+    if time_cache is None:
+        time_cache = {}
+    columns = []
+    for name, kind in kinds.items():
+        values = batch[name]
+        if kind == "bytes":
+            columns.append([values[i] for i in indices])
+            continue
+        values = values[indices]
+        if kind == "category":
+            categories = batch.categories[name]
+            columns.append([categories[code] for code in values.tolist()])
+        elif kind == "int":
+            columns.append([b"" if value == MISSING_INT
+                            else str(value).encode('ascii')
+                            for value in values.tolist()])
+        else:
+            fields = []
+            for value in values.astype('datetime64[s]').view('int64'
+                                                             ).tolist():
+                field = time_cache.get(value)
+                if field is None:
+                    value64 = np.datetime64(value, 's')
+                    if np.isnat(value64):
+                        field = b""
+                    else:
+                        field = value64.astype(object).strftime(
+                            time_format).encode('ascii')
+                    time_cache[value] = field
+                fields.append(field)
+            columns.append(fields)
+    return [list(row) for row in zip(*columns)]
+
+
+def _pad(length):
+    return (-length) % 8
+
+
+class CacheWriter:
+    """Save the columns of a CSV file as its cache while it is parsed.
+
+    Each batch is appended to a temporary file per array as it is
+    added, so memory doesn't grow with the file, then finish puts the
+    arrays together in the cache file.
+    """
+    def __init__(self, path, header, columns=None,
+                 time_format=DEFAULT_TIME_FORMAT, delimiter=b";",
+                 quotechar=b'"'):
+        """Prepare to cache a CSV file.
+
+        Call this before reading any rows after the header row, so a
+        change to the file during the read is noticed.
+
+        Args:
+            path (str): The CSV file.
+            header (list[str]): Every column name of the CSV file.
+            columns (Union[list,dict]): The columns to cache and the
+                kind of each (See read_batches). The batches that are
+                added must have these columns. If None, every column is
+                cached as "bytes".
+            time_format (str): The strptime format of "time" columns.
+        """
+        if np is None:
+            raise ImportError("CacheWriter requires numpy.")
+        self.path = path
+        self.header = header
+        self.time_format = time_format
+        self.delimiter = delimiter
+        self.quotechar = quotechar
+        self.key = source_key(path)
+        self.names, _, self.kinds = resolve_columns(header, columns)
+        self.categories = {}
+        self._counts = {name: 0 for name in self.names}
+        self._blob_sizes = {}
+        self._values = {}  # name to a temporary file of the array
+        self._blobs = {}  # name to a temporary file of a "bytes" blob
+        try:
+            for name, kind in zip(self.names, self.kinds):
+                self._values[name] = tempfile.TemporaryFile()
+                if kind == "bytes":
+                    self._blobs[name] = tempfile.TemporaryFile()
+                    self._blob_sizes[name] = 0
+                    self._values[name].write(
+                        np.zeros(1, dtype=_DTYPES[kind]).tobytes())
+                    self._counts[name] = 1
+        except EnvironmentError:
+            self.discard()
+            raise
+
+    def add(self, batch):
+        """Append the next rows (a ColumnBatch from read_batches)."""
+        for name, kind in zip(self.names, self.kinds):
+            values = batch[name]
+            if kind == "bytes":
+                self._blobs[name].write(values.data)
+                offsets = values.offsets[1:] + self._blob_sizes[name]
+                self._blob_sizes[name] += len(values.data)
+                values = offsets
+            elif kind == "time":
+                values = values.astype('datetime64[s]').view('int64')
+            values = values.astype(_DTYPES[kind])
+            self._values[name].write(values.tobytes())
+            self._counts[name] += len(values)
+        self.categories = batch.categories
+
+    def finish(self):
+        """Write the cache file (replacing any old one).
+
+        Returns:
+            str: The path of the cache file, or None if the CSV file
+                changed while it was read (then nothing is saved).
+        """
+        try:
+            if source_key(self.path) != self.key:
+                return None
+            return self._write()
+        finally:
+            self.discard()
+
+    def _write(self):
+        columns = []
+        offset = 0
+        for name, kind in zip(self.names, self.kinds):
+            column = {'name': name, 'kind': kind}
+            if kind == "bytes":
+                size = self._blob_sizes[name]
+                column['blob_offset'] = offset
+                column['blob_length'] = size
+                offset += size + _pad(size)
+            elif kind == "category":
+                column['categories'] = [
+                    value.decode('latin-1')
+                    for value in self.categories.get(name, [])]
+            column['offset'] = offset
+            column['count'] = self._counts[name]
+            nbytes = self._counts[name] * np.dtype(_DTYPES[kind]).itemsize
+            offset += nbytes + _pad(nbytes)
+            columns.append(column)
+        meta = {
+            'version': CACHE_VERSION,
+            'source': self.key,
+            'delimiter': self.delimiter.decode('latin-1'),
+            'quotechar': self.quotechar.decode('latin-1'),
+            'time_format': self.time_format,
+            'header': self.header,
+            'columns': columns,
+        }
+        # data_offset is part of the metadata, so repeat until the length
+        #   of the metadata (and so data_offset) stops changing.
+        start = len(MAGIC) + _LENGTH.size
+        meta['data_offset'] = 0
+        while True:
+            text = json.dumps(meta).encode('utf-8')
+            data_offset = start + len(text) + _pad(start + len(text))
+            if meta['data_offset'] == data_offset:
+                break
+            meta['data_offset'] = data_offset
+        destination = cache_path(self.path)
+        tmp = destination + ".tmp"
+        with open(tmp, 'wb') as stream:
+            stream.write(MAGIC)
+            stream.write(_LENGTH.pack(len(text)))
+            stream.write(text)
+            stream.write(b"\0" * _pad(start + len(text)))
+            for name in self.names:
+                parts = [self._values[name]]
+                if name in self._blobs:
+                    parts.insert(0, self._blobs[name])
+                for part in parts:
+                    part.seek(0)
+                    shutil.copyfileobj(part, stream)
+                    stream.write(b"\0" * _pad(part.tell()))
+        getattr(os, 'replace', os.rename)(tmp, destination)
+        return destination
+
+    def discard(self):
+        """Delete the temporary files (without saving a cache)."""
+        for spools in (self._values, self._blobs):
+            for spool in spools.values():
+                spool.close()
+            spools.clear()
+
+
+def build_cache(path, columns=None, time_format=DEFAULT_TIME_FORMAT,
+                delimiter=b";", quotechar=b'"',
+                batch_rows=DEFAULT_BATCH_ROWS):
+    """Parse a whole CSV file and save its columns as the cache file.
+
+    To cache a file while using its rows for something else, use a
+    CacheWriter instead of parsing it twice.
+
+    Args:
+        path (str): The CSV file.
+        columns (Union[list,dict]): The columns to cache and the kind
+            of each (See read_batches). If None, every column is cached
+            as "bytes".
+        time_format (str): The strptime format for "time" columns.
+
+    Returns:
+        str: The path of the cache file, or None if the CSV file changed
+            while it was read (then nothing is saved).
+
+    Raises:
+        ValueError: If the file is empty or a row has the wrong number
+            of columns.
+    """
+    if np is None:
+        raise ImportError("build_cache requires numpy.")
+    with open(path, mode='rb') as stream:
+        _reader = reader(stream, delimiter=delimiter, quotechar=quotechar)
+        row = next(_reader, None)
+        if row is None:
+            raise ValueError('"{}" is empty.'.format(path))
+        header = [name.decode('utf-8') for name in row]
+        _reader.header = header
+        writer = CacheWriter(path, header, columns=columns,
+                             time_format=time_format, delimiter=delimiter,
+                             quotechar=quotechar)
+        try:
+            for batch in read_batches(
+                    _reader, batch_rows=batch_rows,
+                    columns=OrderedDict(zip(writer.names, writer.kinds)),
+                    time_format=time_format):
+                writer.add(batch)
+        except BaseException:
+            writer.discard()
+            raise
+    return writer.finish()
+
+
+def _read_meta(stream):
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError("It isn't a binarycsv cache file.")
+    length = stream.read(_LENGTH.size)
+    if len(length) != _LENGTH.size:
+        raise ValueError("It is truncated.")
+    meta = json.loads(stream.read(_LENGTH.unpack(length)[0])
+                      .decode('utf-8'))
+    if meta.get('version') != CACHE_VERSION:
+        raise ValueError("It is version {} (expected {})."
+                         "".format(meta.get('version'), CACHE_VERSION))
+    return meta
+
+
+def load_cache(path, columns=None, time_format=None, delimiter=b";",
+               quotechar=b'"'):
+    """Open the cache of a CSV file if it is up to date.
+
+    Args:
+        path (str): The CSV file (not the cache file).
+        columns (Union[list,dict]): If not None, only accept a cache of
+            these columns with these kinds (See read_batches).
+        time_format (str): If not None, only accept a cache that parsed
+            "time" columns with this format.
+
+    Returns:
+        ColumnCache: The columns, or None if the cache is missing or
+            stale (or numpy isn't installed).
+    """
+    sidecar = cache_path(path)
+    if np is None or not os.path.isfile(sidecar):
+        return None
+    with open(sidecar, 'rb') as stream:
+        try:
+            meta = _read_meta(stream)
+        except (ValueError, KeyError) as ex:
+            echo0('"{}": ignoring bad cache ({})'.format(sidecar, ex))
+            return None
+        if meta.get('source') != source_key(path):
+            return None
+        if ((meta['delimiter'], meta['quotechar'])
+                != (delimiter.decode('latin-1'),
+                    quotechar.decode('latin-1'))):
+            return None
+        if time_format is not None and meta['time_format'] != time_format:
+            return None
+        if columns is not None:
+            try:
+                names, _, kinds = resolve_columns(meta['header'], columns)
+            except ValueError:
+                return None
+            stored = [(column['name'], column['kind'])
+                      for column in meta['columns']]
+            if stored != list(zip(names, kinds)):
+                return None
+        size = os.fstat(stream.fileno()).st_size
+        if size == 0:
+            return None
+        data = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return ColumnCache(sidecar, meta, data)
+    except (ValueError, KeyError) as ex:
+        data.close()
+        echo0('"{}": ignoring bad cache ({})'.format(sidecar, ex))
+        return None
+
+
+def get_cache(path, columns=None, time_format=DEFAULT_TIME_FORMAT,
+              delimiter=b";", quotechar=b'"'):
+    """Open the cache of a CSV file, building it first if it is missing
+    or stale.
+
+    Returns:
+        ColumnCache: The columns of the file (See load_cache).
+    """
+    for _ in range(2):
+        cache = load_cache(path, columns=columns, time_format=time_format,
+                           delimiter=delimiter, quotechar=quotechar)
+        if cache is not None:
+            return cache
+        if build_cache(path, columns=columns, time_format=time_format,
+                       delimiter=delimiter, quotechar=quotechar) is None:
+            break
+    raise ValueError('"{}" changed while it was cached.'.format(path))
@@ -0,0 +1,170 @@
+"""
+Compact append-only storage for rows, referenced by integer id.
+
+Each column is stored in arrays instead of one object per field: bytes
+in one buffer with an array of end offsets, or (for columns with few
+distinct values, such as "Function" or "Direction" in SPM exports) an
+array of small integer codes. A row is only rebuilt as a Record when it
+is requested, so holding hundreds of thousands of captures costs little
+more than the size of their fields.
+"""
+from __future__ import print_function
+from array import array
+from bisect import bisect_left
+
+from binarycsv.records import (
+    make_record_type,
+)
+
+try:
+    array('q')
+    _OFFSET_TYPE = 'q'
+except ValueError:  # Python 2
+    _OFFSET_TYPE = 'l'
+
+
+class _BytesColumn:
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array(_OFFSET_TYPE)
+
+    def append(self, value):
+        self.data += value
+        self.ends.append(len(self.data))
+
+    def __getitem__(self, i):
+        start = self.ends[i-1] if i > 0 else 0
+        return bytes(self.data[start:self.ends[i]])
+
+
+class _CategoryColumn:
+    def __init__(self):
+        self.codes = array('H')
+        self.values = []
+        self.lookup = {}
+
+    def append(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            if code > 0xFFFF and self.codes.typecode == 'H':
+                self.codes = array('L', self.codes)
+            self.lookup[value] = code
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+
+class CaptureStore:
+    """Rows stored by column, where a row's id is its position.
+
+    Attributes:
+        fieldnames (tuple[str]): The column names.
+        record_type (type): The Record subclass returned by
+            __getitem__ (See binarycsv.make_record_type).
+    """
+    def __init__(self, fieldnames, raw_fields=(), categories=(),
+                 encoding='utf-8', errors='strict', number_field='#'):
+        """Create an empty store.
+
+        Args:
+            fieldnames (list[str]): The column names (the header row).
+            raw_fields (Iterable[str]): Columns to keep as bytes in the
+                records returned (See make_record_type).
+            categories (Iterable[str]): Columns with few distinct values,
+                to store as codes.
+            encoding (str): The encoding of the other columns, used to
+                encode fields of a Record that were decoded to str.
+            number_field (str): The column to look rows up by using
+                find (if it is in fieldnames).
+        """
+        self.record_type = make_record_type(fieldnames,
+                                            raw_fields=raw_fields,
+                                            encoding=encoding,
+                                            errors=errors)
+        self.fieldnames = self.record_type.fieldnames
+        self.encoding = encoding
+        self.errors = errors
+        categories = set(categories)
+        self._columns = [_CategoryColumn() if name in categories
+                         else _BytesColumn() for name in self.fieldnames]
+        self._count = 0
+        self._number_index = None
+        if number_field in self.fieldnames:
+            self._number_index = self.fieldnames.index(number_field)
+        self._numbers = array(_OFFSET_TYPE)
+        self._numbers_sorted = True
+
+    def __len__(self):
+        return self._count
+
+    def _to_bytes(self, value):
+        if isinstance(value, bytes):
+            return value
+        if hasattr(value, 'encode'):
+            return value.encode(self.encoding, self.errors)
+        return str(value).encode('ascii')
+
+    def append(self, row):
+        """Add a row.
+
+        Args:
+            row (list): The fields (bytes, or str, such as fields of a
+                Record that were already decoded).
+
+        Returns:
+            int: The id of the row.
+
+        Raises:
+            ValueError: If the number of fields isn't the number of
+                columns.
+        """
+        if len(row) != len(self._columns):
+            raise ValueError("{} has {} fields but there are {} columns."
+                             "".format(row, len(row), len(self._columns)))
+        # (Iterating a Record gets each field without decoding it.)
+        fields = [self._to_bytes(value) for value in row]
+        for column, value in zip(self._columns, fields):
+            column.append(value)
+        if self._number_index is not None:
+            number = fields[self._number_index]
+            number = int(number) if number else -1
+            if self._numbers and number < self._numbers[-1]:
+                self._numbers_sorted = False
+            self._numbers.append(number)
+        self._count += 1
+        return self._count - 1
+
+    def row(self, i):
+        """Get the fields of a row as a list of bytes."""
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("There is no row {} (there are {})."
+                             "".format(i, self._count))
+        return [column[i] for column in self._columns]
+
+    def __getitem__(self, i):
+        """Get a row as a Record (decoded when fields are accessed)."""
+        return self.record_type(self.row(i))
+
+    def field(self, i, name):
+        """Get one field of a row as bytes."""
+        return self._columns[self.fieldnames.index(name)][i]
+
+    def find(self, number):
+        """Get the id of the row with a capture number (such as "#").
+
+        Raises:
+            KeyError: If there is no such row.
+        """
+        numbers = self._numbers
+        if self._numbers_sorted:
+            i = bisect_left(numbers, number)
+            if i < len(numbers) and numbers[i] == number:
+                return i
+        elif number in numbers:
+            return numbers.index(number)
+        raise KeyError(number)
@@ -0,0 +1,107 @@
+"""
+Read gzip, bzip2 and xz compressed files as if they were uncompressed.
+
+The format is detected from the magic bytes at the start of the data
+(not the file extension), and the data is decompressed as it is read,
+so an archived export can be parsed without writing it to a temporary
+file first.
+"""
+from __future__ import print_function
+import bz2
+import gzip
+import re
+
+try:
+    import lzma
+except ImportError:  # Python 2
+    lzma = None
+
+MAGIC_SIZE = 10  # bytes needed to detect every format
+
+_BZ2_RE = re.compile(
+    b"BZh[1-9](\x31\x41\x59\x26\x53\x59|\x17\x72\x45\x38\x50\x90)")
+
+
+def detect_compression(data):
+    """Get the compression format of data from its first bytes.
+
+    Args:
+        data (bytes): At least the first MAGIC_SIZE bytes (if there are
+            that many).
+
+    Returns:
+        str: "gzip", "bz2" or "xz", or None if it isn't compressed
+            (or the format isn't one of those).
+    """
+    if data[:2] == b"\x1f\x8b":
+        return "gzip"
+    if data[:6] == b"\xfd7zXZ\x00":
+        return "xz"
+    if _BZ2_RE.match(data[:MAGIC_SIZE]):
+        return "bz2"
+    return None
+
+
+def _peek(stream, size):
+    """Get the next bytes of a stream without consuming them.
+
+    Returns:
+        bytes: Up to size bytes, or None if the stream can neither peek
+            nor seek (such as a pipe opened without buffering).
+    """
+    if hasattr(stream, 'peek'):
+        return stream.peek(size)[:size]
+    seekable = getattr(stream, 'seekable', None)
+    if seekable is not None and seekable():
+        pos = stream.tell()
+        data = stream.read(size)
+        stream.seek(pos)
+        return data
+    return None
+
+
+def decompressing_stream(stream, compression):
+    """Wrap a binary stream in a decompressor.
+
+    Args:
+        stream: The compressed stream (it is not closed when the
+            decompressor is closed).
+        compression (str): "gzip", "bz2" or "xz" (See
+            detect_compression).
+
+    Returns:
+        A stream of the uncompressed data (with read, seek and tell).
+    """
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if compression == "bz2":
+        return bz2.BZ2File(stream, mode='rb')
+    if compression == "xz":
+        if lzma is None:
+            raise ValueError("Reading xz requires the lzma module"
+                             " (Python 3).")
+        return lzma.LZMAFile(stream, mode='rb')
+    raise ValueError("Unknown compression: {}".format(repr(compression)))
+
+
+def decompress_stream(stream):
+    """Detect whether a stream is compressed and wrap it if so.
+
+    Returns:
+        tuple: (stream, compression) where stream is the given one or a
+            decompressor of it, and compression is None or the format.
+    """
+    data = _peek(stream, MAGIC_SIZE)
+    if not data or not isinstance(data, bytes):
+        return stream, None  # (A text stream is reported by reader.)
+    compression = detect_compression(data)
+    if compression is None:
+        return stream, None
+    return decompressing_stream(stream, compression), compression
+
+
+def file_compression(path):
+    """Get the compression format of a file (See detect_compression)."""
+    with open(path, mode='rb') as stream:
+        return detect_compression(stream.read(MAGIC_SIZE))
+
@@ -0,0 +1,250 @@
+"""
+Decode a framed binary protocol from the payloads of serial captures.
+
+A FrameSpec describes the frames (sync bytes, a struct format for the
+header fields including the payload length, and an optional checksum
+after the payload), and is compiled once. A FrameDecoder runs it over
+the payloads of each port and direction as they arrive: bytes are kept
+only until the frame they belong to is complete, so a frame split
+across many captures is decoded as soon as its last byte arrives, and
+nothing is scanned twice. Each frame lists the captures it came from.
+"""
+from __future__ import print_function
+import binascii
+import struct
+import zlib
+from collections import (
+    OrderedDict,
+    deque,
+    namedtuple,
+)
+
+DEFAULT_MAX_LENGTH = 65536  # longest payload before a sync is "false"
+
+
+def sum8(data):
+    """Get the sum of the bytes, modulo 256."""
+    return sum(bytearray(data)) & 0xFF
+
+
+def xor8(data):
+    """Get the XOR of the bytes."""
+    value = 0
+    for byte in bytearray(data):
+        value ^= byte
+    return value
+
+
+def crc16_ccitt(data):
+    """Get the CRC-16/CCITT-FALSE of the bytes (initial value 0xFFFF)."""
+    return binascii.crc_hqx(bytes(data), 0xFFFF)
+
+
+def crc32(data):
+    """Get the CRC-32 of the bytes (the same as zlib.crc32)."""
+    return zlib.crc32(bytes(data)) & 0xFFFFFFFF
+
+
+Frame = namedtuple('Frame', [
+    'name',  # the name of the FrameSpec
+    'port',
+    'direction',
+    'offset',  # the offset of the sync bytes in the stream
+    'fields',  # an OrderedDict of the header fields
+    'payload',  # the bytes after the header (before any checksum)
+    'captures',  # every capture number the frame spans
+])
+
+
+class FrameSpec:
+    """The layout of a frame (compiled for FrameDecoder).
+
+    A frame is: sync, the header (header_format), the payload (as many
+    bytes as the length field plus length_adjust), then the checksum
+    (checksum_format), if any.
+    """
+    def __init__(self, sync, header_format, fields, length_field="length",
+                 length_adjust=0, checksum=None, checksum_format=None,
+                 checksum_start=None, max_length=DEFAULT_MAX_LENGTH,
+                 name=None):
+        """Compile a spec.
+
+        Args:
+            sync (bytes): The bytes that start every frame.
+            header_format (str): The struct format of the header after
+                sync, such as "<BH" (include the byte order).
+            fields (list[str]): The name of each value in the header.
+            length_field (str): The field that is the payload length.
+            length_adjust (int): Added to the length field to get the
+                number of payload bytes (such as -2 if the length also
+                counts a 2-byte checksum).
+            checksum (Callable): If set, a function of the checked
+                bytes that returns the expected checksum value (such as
+                sum8, xor8, crc16_ccitt or crc32).
+            checksum_format (str): The struct format of the checksum
+                after the payload, such as "<H".
+            checksum_start (int): Where the checked bytes start in the
+                frame (they end with the payload). By default, right
+                after sync.
+            max_length (int): The most payload bytes. A sync with a
+                larger length is skipped as a false match.
+            name (str): A name for the frames (default "frame").
+
+        Raises:
+            ValueError: If the spec is inconsistent.
+        """
+        if not sync:
+            raise ValueError("sync can't be empty.")
+        self.sync = bytes(sync)
+        self.header = struct.Struct(header_format)
+        self.fields = list(fields)
+        values = self.header.unpack(b"\0" * self.header.size)
+        if len(values) != len(self.fields):
+            raise ValueError("header_format {} has {} values but there are"
+                             " {} fields.".format(repr(header_format),
+                                                  len(values),
+                                                  len(self.fields)))
+        if length_field not in self.fields:
+            raise ValueError("The length field {} isn't one of the fields"
+                             " {}.".format(repr(length_field), self.fields))
+        self.length_index = self.fields.index(length_field)
+        self.length_adjust = length_adjust
+        self.header_size = len(self.sync) + self.header.size
+        self.checksum = checksum
+        self.check = None
+        if checksum is not None:
+            if not checksum_format:
+                raise ValueError("checksum requires checksum_format.")
+            self.check = struct.Struct(checksum_format)
+        self.check_size = self.check.size if self.check else 0
+        if checksum_start is None:
+            checksum_start = len(self.sync)
+        self.checksum_start = checksum_start
+        self.max_length = max_length
+        self.name = name or "frame"
+
+
+class _FrameStream:
+    __slots__ = ('buf', 'base', 'recent')
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.base = 0  # the stream offset of buf[0]
+        self.recent = deque()  # (start, capture) of the payloads in buf
+
+
+class FrameDecoder:
+    """Decode the frames of one FrameSpec in the payloads of each port
+    and direction as they are fed.
+
+    Attributes:
+        spec (FrameSpec): The layout of the frames.
+        frames (int): The frames decoded so far.
+        bad_checksums (int): Frames skipped since the checksum was wrong.
+        skipped (int): Bytes that weren't part of a frame.
+    """
+    def __init__(self, spec):
+        self.spec = spec
+        self._streams = {}  # (port, direction) to _FrameStream
+        self.frames = 0
+        self.bad_checksums = 0
+        self.skipped = 0
+
+    def feed(self, port, direction, payload, capture):
+        """Add the next payload of a port and direction.
+
+        Args:
+            port (str): The port (such as the "Port" field).
+            direction (str): "read" or "write" (or any other key).
+            payload (bytes): The decoded payload.
+            capture (int): The capture number (such as the "#" field).
+
+        Returns:
+            list[Frame]: The frames completed by this payload.
+        """
+        if not payload:
+            return []
+        key = (port, direction)
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = _FrameStream()
+            self._streams[key] = stream
+        stream.recent.append((stream.base + len(stream.buf), capture))
+        stream.buf += payload
+        frames = []
+        pos = self._decode(stream, port, direction, frames)
+        del stream.buf[:pos]
+        stream.base += pos
+        recent = stream.recent
+        while len(recent) > 1 and recent[1][0] <= stream.base:
+            recent.popleft()
+        if not stream.buf:
+            recent.clear()
+        return frames
+
+    def _decode(self, stream, port, direction, frames):
+        """Decode the complete frames in stream.buf.
+
+        Returns:
+            int: How many bytes at the start of the buffer are done.
+        """
+        spec = self.spec
+        sync = spec.sync
+        buf = stream.buf
+        size = len(buf)
+        pos = 0
+        while True:
+            i = buf.find(sync, pos)
+            if i < 0:
+                # Keep what could be the start of a sync.
+                done = max(pos, size - len(sync) + 1)
+                self.skipped += done - pos
+                return done
+            self.skipped += i - pos
+            pos = i
+            if size - i < spec.header_size:
+                return pos
+            values = spec.header.unpack_from(buf, i + len(sync))
+            length = values[spec.length_index] + spec.length_adjust
+            if not 0 <= length <= spec.max_length:
+                pos = i + 1  # a false sync
+                self.skipped += 1
+                continue
+            end = i + spec.header_size + length
+            if size < end + spec.check_size:
+                return pos  # Wait for the rest of the frame.
+            if spec.checksum is not None:
+                expected = spec.check.unpack_from(buf, end)[0]
+                if spec.checksum(buf[i + spec.checksum_start:end]) \
+                        != expected:
+                    self.bad_checksums += 1
+                    pos = i + 1
+                    self.skipped += 1
+                    continue
+            frames.append(Frame(
+                spec.name, port, direction, stream.base + i,
+                OrderedDict(zip(spec.fields, values)),
+                bytes(buf[i + spec.header_size:end]),
+                self._captures(stream, stream.base + i,
+                               stream.base + end + spec.check_size),
+            ))
+            self.frames += 1
+            pos = end + spec.check_size
+
+    def _captures(self, stream, start, end):
+        """Get the capture numbers of the stream bytes from start to
+        end.
+        """
+        captures = []
+        recent = stream.recent
+        for j, (offset, capture) in enumerate(recent):
+            if offset >= end:
+                break
+            if j + 1 < len(recent) and recent[j+1][0] <= start:
+                continue
+            captures.append(capture)
+        return captures
+
+    def reset(self):
+        """Forget partial frames (such as after a gap in the capture)."""
+        self._streams = {}
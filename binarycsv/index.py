@@ -0,0 +1,187 @@
+"""
+Row-offset index for random access into a CSV file.
+
+The index records the byte offset of every Nth row (and the newline
+that ended the row before it, which reader needs in order to skip the
+rest of a CR+LF), so reader.seek_row can jump near any row instead of
+tokenizing everything before it. It is saved in a sidecar file next to
+the CSV file and is only used while the size and modification time of
+the CSV file are unchanged.
+"""
+from __future__ import print_function
+import json
+import os
+
+from binarycsv import (
+    reader,
+    echo0,
+)
+
+INDEX_EXT = ".index.json"
+DEFAULT_EVERY = 1000  # rows per checkpoint
+
+_NEWLINE_NAMES = {None: None, b"\r": "CR", b"\n": "LF"}
+_NEWLINE_BYTES = {v: k for k, v in _NEWLINE_NAMES.items()}
+
+
+def index_path(path):
+    """Get the path of the sidecar index file for a CSV file."""
+    return path + INDEX_EXT
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime
+
+
+class RowIndex:
+    """Byte offsets of every Nth row in a CSV file.
+
+    Attributes:
+        every (int): Rows per checkpoint (checkpoint i is row i*every).
+        offsets (list[int]): Byte offset where each checkpoint row
+            starts.
+        newlines (list[bytes]): The newline before each checkpoint row
+            (None if the row is at offset 0).
+        rows (int): The total number of rows.
+        size (int): The size of the indexed file.
+        mtime (float): The modification time of the indexed file.
+    """
+    def __init__(self, every=DEFAULT_EVERY, delimiter=b";", quotechar=b'"'):
+        self.every = every
+        self.delimiter = delimiter
+        self.quotechar = quotechar
+        self.offsets = []
+        self.newlines = []
+        self.rows = 0
+        self.size = None
+        self.mtime = None
+
+    def checkpoint(self, number):
+        """Get the nearest checkpoint at or before a row.
+
+        Returns:
+            tuple: (row, offset, prev_newline) as accepted by
+                reader.seek_offset (row becomes line_number).
+        """
+        if number < 0:
+            raise IndexError("Row {} is negative.".format(number))
+        i = min(number // self.every, len(self.offsets) - 1)
+        return i * self.every, self.offsets[i], self.newlines[i]
+
+    def is_current(self, path):
+        """Check whether the file is unchanged since it was indexed."""
+        return (self.size, self.mtime) == _file_key(path)
+
+    def to_dict(self):
+        return {
+            'every': self.every,
+            'delimiter': self.delimiter.decode('latin-1'),
+            'quotechar': self.quotechar.decode('latin-1'),
+            'offsets': self.offsets,
+            'newlines': [_NEWLINE_NAMES[nl] for nl in self.newlines],
+            'rows': self.rows,
+            'size': self.size,
+            'mtime': self.mtime,
+        }
+
+    @classmethod
+    def from_dict(cls, meta):
+        index = cls(
+            every=meta['every'],
+            delimiter=meta['delimiter'].encode('latin-1'),
+            quotechar=meta['quotechar'].encode('latin-1'),
+        )
+        index.offsets = meta['offsets']
+        index.newlines = [_NEWLINE_BYTES[name] for name in meta['newlines']]
+        index.rows = meta['rows']
+        index.size = meta['size']
+        index.mtime = meta['mtime']
+        return index
+
+    def save(self, path):
+        """Save the index to path (the sidecar file, not the CSV)."""
+        with open(path, 'w') as stream:
+            json.dump(self.to_dict(), stream)
+
+
+def build_index(path, every=DEFAULT_EVERY, delimiter=b";", quotechar=b'"'):
+    """Read a whole CSV file and record the offset of every Nth row.
+
+    Returns:
+        RowIndex: The new index (not saved, see get_index).
+    """
+    index = RowIndex(every=every, delimiter=delimiter, quotechar=quotechar)
+    index.size, index.mtime = _file_key(path)
+    with open(path, mode='rb') as stream:
+        _reader = reader(stream, delimiter=delimiter, quotechar=quotechar)
+        while True:
+            if _reader.line_number % every == 0:
+                index.offsets.append(_reader.cur)
+                index.newlines.append(_reader.prev_newline)
+            try:
+                _reader.__next__()
+            except StopIteration:
+                break
+        index.rows = _reader.line_number
+    if index.rows % every == 0 and index.rows > 0:
+        # The last checkpoint is EOF rather than a row, so drop it.
+        index.offsets.pop()
+        index.newlines.pop()
+    return index
+
+
+def load_index(path, every=None, delimiter=b";", quotechar=b'"'):
+    """Load the sidecar index of a CSV file if it is up to date.
+
+    Args:
+        path (str): The CSV file (not the index file).
+        every (int): If not None, only accept an index with this many
+            rows per checkpoint.
+
+    Returns:
+        RowIndex: The index, or None if it is missing or stale.
+    """
+    sidecar = index_path(path)
+    if not os.path.isfile(sidecar):
+        return None
+    try:
+        with open(sidecar, 'r') as stream:
+            index = RowIndex.from_dict(json.load(stream))
+    except (ValueError, KeyError) as ex:
+        echo0('"{}": ignoring bad index ({})'.format(sidecar, ex))
+        return None
+    if not index.is_current(path):
+        return None
+    if (index.delimiter, index.quotechar) != (delimiter, quotechar):
+        return None
+    if every is not None and index.every != every:
+        return None
+    return index
+
+
+def get_index(path, every=None, delimiter=b";", quotechar=b'"', save=True):
+    """Load the sidecar index of a CSV file, or build (and save) it.
+
+    Args:
+        path (str): The CSV file.
+        every (int): Rows per checkpoint (see load_index). If None, any
+            existing index is accepted and a new one uses DEFAULT_EVERY.
+        save (bool): Save a new index as the sidecar file.
+
+    Returns:
+        RowIndex: An up-to-date index of the file.
+    """
+    index = load_index(path, every=every, delimiter=delimiter,
+                       quotechar=quotechar)
+    if index is not None:
+        return index
+    index = build_index(
+        path,
+        every=DEFAULT_EVERY if every is None else every,
+        delimiter=delimiter,
+        quotechar=quotechar,
+    )
+    if save:
+        index.save(index_path(path))
+    return index
@@ -0,0 +1,219 @@
+"""
+Parse one large CSV file using several processes.
+
+The file is split into chunks of about chunk_size bytes. Since a
+newline inside of quotes doesn't end a row, the chunks are first
+counted in parallel (quote count only), then each split point is moved
+forward to the first newline where the number of quotes before it is
+even (outside of quotes) and which actually ends a row. The chunks are
+then parsed by reader in a ProcessPoolExecutor, and the rows are
+yielded in the original order.
+"""
+from __future__ import print_function
+import io
+import os
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from binarycsv import (
+    DEFAULT_BLOCK_SIZE,
+    NEWLINES,
+    _NEWLINE_RE,
+    file_compression,
+    reader,
+)
+
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+_SCAN_SIZE = 64 * 1024  # bytes per read while finding a row start
+
+
+def _count_quotes(path, start, end, quotechar):
+    """Count quotechar in a byte range of a file (runs in a worker)."""
+    count = 0
+    with open(path, mode='rb') as stream:
+        stream.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            data = stream.read(min(DEFAULT_BLOCK_SIZE, remaining))
+            if not data:
+                break
+            count += data.count(quotechar)
+            remaining -= len(data)
+    return count
+
+
+def _read_chunk(path, start, end, prev_newline, delimiter, quotechar):
+    """Parse the rows in a byte range of a file (runs in a worker).
+
+    Args:
+        start (int): The start of a row.
+        end (int): The end of a row (after its newline) or of the file.
+        prev_newline (bytes): The newline that ended the row before
+            start (See reader.seek_offset).
+
+    Returns:
+        list: The rows (each a list of bytes).
+    """
+    with open(path, mode='rb') as stream:
+        stream.seek(start)
+        data = stream.read(end - start)
+    _reader = reader(io.BytesIO(data), delimiter=delimiter,
+                     quotechar=quotechar)
+    _reader.prev_newline = prev_newline
+    return list(_reader)
+
+
+def _find_row_start(stream, pos, parity, end, quotechar=b'"'):
+    """Find the first row that starts after pos.
+
+    Args:
+        stream: The file, open in binary mode.
+        pos (int): Where to start looking (must be > 0).
+        parity (int): The number of quotes before pos, modulo 2 (1 means
+            pos is inside of quotes).
+        end (int): Where to stop looking.
+
+    Returns:
+        tuple: (start, prev_newline) where start is just after a newline
+            that ends a row, or None if there is none before end.
+    """
+    stream.seek(pos - 1)
+    prev = stream.read(1)
+    while pos < end:
+        data = stream.read(min(_SCAN_SIZE, end - pos))
+        if not data:
+            break
+        last = 0
+        for match in _NEWLINE_RE.finditer(data):
+            x = match.start()
+            parity = (parity + data.count(quotechar, last, x)) % 2
+            last = x
+            before = data[x-1:x] if x > 0 else prev
+            if parity == 0 and before not in NEWLINES:
+                # Outside of quotes, and not the 2nd byte of a newline,
+                #   so it is a newline that ends a row.
+                return pos + x + 1, data[x:x+1]
+        parity = (parity + data.count(quotechar, last)) % 2
+        prev = data[-1:]
+        pos += len(data)
+    return None
+
+
+def split_rows(path, starts, quote_counts, quotechar=b'"'):
+    """Move each split point to the start of a row.
+
+    Args:
+        path (str): The CSV file.
+        starts (list[int]): The split points (the first must be 0).
+        quote_counts (list[int]): The number of quotes in each range
+            (starts[i] up to starts[i+1] or EOF).
+
+    Returns:
+        list[tuple]: (start, prev_newline) for each chunk. There may be
+            fewer chunks than starts (if a row spans a whole range).
+    """
+    size = os.path.getsize(path)
+    bounds = [(0, None)]
+    parity = 0
+    with open(path, mode='rb') as stream:
+        for i in range(1, len(starts)):
+            parity = (parity + quote_counts[i-1]) % 2
+            if bounds[-1][0] >= starts[i]:
+                continue  # The previous row start was past this range.
+            end = starts[i+1] if i + 1 < len(starts) else size
+            found = _find_row_start(stream, starts[i], parity, end,
+                                    quotechar=quotechar)
+            if found is not None:
+                bounds.append(found)
+    return bounds
+
+
+def parallel_read(path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                  delimiter=b";", quotechar=b'"', batches=False):
+    """Read a CSV file using a pool of processes.
+
+    Args:
+        path (str): The CSV file.
+        workers (int): The number of processes (None for one per CPU).
+        chunk_size (int): Approximate bytes parsed by each task.
+        batches (bool): Yield (line_number, rows) for each chunk, where
+            line_number is that of the first row, instead of each row.
+
+    Yields:
+        tuple: (line_number, row) for each row in order, where
+            line_number is the same as reader.line_number after reading
+            the row (1 for the first row).
+    """
+    if file_compression(path) is not None:
+        # A compressed file can't be split by offset, so decompress and
+        #   parse it in this process.
+        for item in _read_compressed(path, chunk_size, delimiter,
+                                     quotechar, batches):
+            yield item
+        return
+    size = os.path.getsize(path)
+    starts = list(range(0, size, chunk_size)) or [0]
+    if len(starts) < 2:
+        # Not worth starting processes.
+        rows = _read_chunk(path, 0, size, None, delimiter, quotechar)
+        for item in _number_rows(rows, 0, batches):
+            yield item
+        return
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        quote_counts = list(executor.map(
+            _count_quotes,
+            [path] * len(starts), starts, starts[1:] + [size],
+            [quotechar] * len(starts),
+        ))
+        bounds = split_rows(path, starts, quote_counts, quotechar=quotechar)
+        ends = [start for start, _ in bounds[1:]] + [size]
+        max_pending = 2 * (workers or os.cpu_count() or 1)
+        line_number = 0
+        for (start, prev_newline), end in zip(bounds, ends):
+            pending.append(executor.submit(
+                _read_chunk, path, start, end, prev_newline,
+                delimiter, quotechar,
+            ))
+            while pending and (len(pending) >= max_pending or end == size):
+                rows = pending.popleft().result()
+                for item in _number_rows(rows, line_number, batches):
+                    yield item
+                line_number += len(rows)
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _read_compressed(path, chunk_size, delimiter, quotechar, batches):
+    """Read a compressed file the same way as parallel_read (batches
+    are about chunk_size bytes of uncompressed data).
+    """
+    with open(path, mode='rb') as stream:
+        _reader = reader(stream, delimiter=delimiter, quotechar=quotechar)
+        rows = []
+        line_number = 0
+        consumed = 0
+        for row in _reader:
+            rows.append(row)
+            if _reader.cur - consumed >= chunk_size:
+                for item in _number_rows(rows, line_number, batches):
+                    yield item
+                line_number = _reader.line_number
+                consumed = _reader.cur
+                rows = []
+        for item in _number_rows(rows, line_number, batches):
+            yield item
+
+
+def _number_rows(rows, line_number, batches):
+    if batches:
+        if rows:
+            yield line_number + 1, rows
+        return
+    for row in rows:
+        line_number += 1
+        yield line_number, row
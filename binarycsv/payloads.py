@@ -0,0 +1,204 @@
+"""
+Decode the hex "Data" column of SPM exports and total the bytes.
+
+SPM writes each captured payload as space-separated hex pairs ("55 9d")
+in the "Data" column, and its length in "Data length". This decodes the
+hex with binascii (no list of pairs per row), either one field at a time
+or a whole column of a ColumnBatch into one buffer (requires numpy).
+"""
+from __future__ import print_function
+import binascii
+
+from binarycsv.batches import (
+    MISSING_INT,
+    PayloadColumn,
+    np,
+)
+
+READ_FUNCTION = b"IRP_MJ_READ"
+WRITE_FUNCTION = b"IRP_MJ_WRITE"
+
+
+def _to_ascii(value):
+    if isinstance(value, bytes):
+        return value
+    return value.encode('ascii')
+
+
+def hex_length(value):
+    """Count the bytes in a hex field without decoding it.
+
+    Args:
+        value (Union[str,bytes]): Hex pairs, optionally separated by
+            spaces.
+
+    Raises:
+        ValueError: If there is an odd number of hex digits.
+    """
+    value = _to_ascii(value)
+    digits = len(value) - value.count(b" ")
+    if digits % 2:
+        raise ValueError("The hex payload {} has an odd number of digits."
+                         "".format(repr(value)))
+    return digits // 2
+
+
+def decode_hex(value, data_length=None):
+    """Decode a hex field such as "55 9d".
+
+    Args:
+        value (Union[str,bytes]): Hex pairs, optionally separated by
+            spaces.
+        data_length (Union[int,str,bytes]): If set (and not empty),
+            the expected number of bytes (such as the "Data length"
+            field).
+
+    Returns:
+        bytes: The payload.
+
+    Raises:
+        ValueError: If the hex is invalid or has the wrong length.
+    """
+    try:
+        payload = binascii.unhexlify(_to_ascii(value).replace(b" ", b""))
+    except (TypeError, binascii.Error) as ex:
+        raise ValueError("The hex payload {} is invalid: {}"
+                         "".format(repr(value), ex))
+    if data_length not in (None, "", b""):
+        if int(data_length) != len(payload):
+            raise ValueError(
+                "The hex payload {} is {} byte(s) but Data length is {}."
+                "".format(repr(value), len(payload), int(data_length)))
+    return payload
+
+
+def decode_hex_column(column, lengths=None):
+    """Decode a whole column of hex fields at once.
+
+    Args:
+        column (Union[PayloadColumn,list[bytes]]): The hex fields (such
+            as a "bytes" column from read_batches).
+        lengths (Iterable[int]): If set, the expected byte count of each
+            field (such as an "int" column), where MISSING_INT means
+            not to check that field (the same as an empty data_length
+            for decode_hex).
+
+    Returns:
+        PayloadColumn: The decoded payloads in one buffer.
+
+    Raises:
+        ValueError: If a field is invalid or has the wrong length.
+    """
+    if np is None:
+        raise ImportError("decode_hex_column requires numpy.")
+    if not isinstance(column, PayloadColumn):
+        values = [_to_ascii(value) for value in column]
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in values], out=offsets[1:])
+        column = PayloadColumn(b"".join(values), offsets)
+    text = np.frombuffer(column.data, dtype=np.uint8)
+    spaces = np.zeros(len(text) + 1, dtype=np.int64)
+    np.cumsum(text == ord(" "), out=spaces[1:])
+    digits = np.diff(column.offsets) - np.diff(spaces[column.offsets])
+    odd = np.flatnonzero(digits % 2)
+    if len(odd):
+        raise ValueError("The hex payload {} (index {}) has an odd number"
+                         " of digits.".format(repr(column[odd[0]]), odd[0]))
+    try:
+        # (text works whether column.data is bytes or a memoryview.)
+        data = binascii.unhexlify(text[text != ord(" ")].tobytes())
+    except (TypeError, binascii.Error) as ex:
+        raise ValueError("A hex payload is invalid: {}".format(ex))
+    sizes = digits // 2
+    if lengths is not None:
+        expected = np.asarray(lengths, dtype=np.int64)
+        wrong = np.flatnonzero((expected != sizes)
+                               & (expected != MISSING_INT))
+        if len(wrong):
+            i = wrong[0]
+            raise ValueError(
+                "The hex payload {} (index {}) is {} byte(s) but Data"
+                " length is {}.".format(repr(column[i]), i, sizes[i],
+                                        expected[i]))
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    return PayloadColumn(data, offsets)
+
+
+class PayloadTotals:
+    """Decode captured payloads and keep running byte totals.
+
+    Attributes:
+        read_total (int): Bytes in IRP_MJ_READ payloads.
+        write_total (int): Bytes in IRP_MJ_WRITE payloads.
+        validate (bool): Check each payload against its Data length.
+    """
+    def __init__(self, validate=True):
+        self.read_total = 0
+        self.write_total = 0
+        self.validate = validate
+
+    def _decode(self, data, data_length):
+        if not self.validate:
+            data_length = None
+        return decode_hex(data, data_length=data_length)
+
+    def add_read(self, data, data_length=None):
+        """Decode a READ payload and add it to read_total.
+
+        Args:
+            data (Union[str,bytes]): The "Data" field.
+            data_length (Union[str,bytes]): The "Data length" field.
+
+        Returns:
+            bytes: The payload.
+        """
+        payload = self._decode(data, data_length)
+        self.read_total += len(payload)
+        return payload
+
+    def add_write(self, data, data_length=None):
+        """Decode a WRITE payload and add it to write_total (See
+        add_read).
+        """
+        payload = self._decode(data, data_length)
+        self.write_total += len(payload)
+        return payload
+
+    def add_batch(self, batch, data="Data", data_length="Data length",
+                  function="Function"):
+        """Decode the payloads of a ColumnBatch and add them to the
+        totals (other functions, such as IOCTL rows, are not counted).
+
+        Args:
+            batch (binarycsv.ColumnBatch): A batch with the data column
+                as "bytes", the data_length column as "int" (or None to
+                skip validation) and the function column (any kind).
+
+        Returns:
+            PayloadColumn: The decoded payloads.
+        """
+        lengths = None
+        if self.validate and data_length is not None:
+            lengths = batch[data_length]
+        payloads = decode_hex_column(batch[data], lengths=lengths)
+        sizes = payloads.lengths()
+        if function in batch.categories:
+            categories = batch.categories[function]
+            functions = batch[function]
+            for name in (READ_FUNCTION, WRITE_FUNCTION):
+                if name not in categories:
+                    continue
+                total = int(sizes[functions == categories.index(name)].sum())
+                if name == READ_FUNCTION:
+                    self.read_total += total
+                else:
+                    self.write_total += total
+        else:
+            names = batch[function]
+            for i in range(len(payloads)):
+                if names[i] == READ_FUNCTION:
+                    self.read_total += int(sizes[i])
+                elif names[i] == WRITE_FUNCTION:
+                    self.write_total += int(sizes[i])
+        return payloads
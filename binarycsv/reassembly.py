@@ -0,0 +1,221 @@
+"""
+Reassemble the payloads of serial captures into contiguous streams.
+
+SPM splits the traffic of a port into many small IRP_MJ_READ and
+IRP_MJ_WRITE rows. A Reassembler concatenates the decoded payloads of
+each (port, direction) into a ByteStream, which remembers which capture
+each byte came from, so the whole stream can be searched with find or a
+regular expression and each match traced back to its captures.
+"""
+from __future__ import print_function
+import mmap
+import re
+import tempfile
+from array import array
+from bisect import bisect_right
+
+from binarycsv.payloads import (
+    decode_hex,
+)
+
+DEFAULT_MAX_MEMORY = 64 * 1024 * 1024  # bytes before a stream uses a file
+
+try:
+    array('q')
+    _OFFSET_TYPE = 'q'
+except ValueError:  # Python 2
+    _OFFSET_TYPE = 'l'
+
+
+class ByteStream:
+    """A growable buffer of payloads with the capture of each offset.
+
+    The data is kept in a bytearray until it is larger than max_memory,
+    then in a temporary file mapped into memory (so a huge session can
+    be larger than RAM and still be searched the same way).
+
+    Attributes:
+        starts (array): The offset where each payload starts.
+        captures (array): The capture number of each payload.
+    """
+    def __init__(self, max_memory=DEFAULT_MAX_MEMORY):
+        self.max_memory = max_memory
+        self.starts = array(_OFFSET_TYPE)
+        self.captures = array(_OFFSET_TYPE)
+        self._data = bytearray()
+        self._file = None
+        self._map = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, payload, capture):
+        """Add a payload to the end of the stream.
+
+        Args:
+            payload (bytes): The decoded payload.
+            capture (int): The capture number (such as the "#" field).
+        """
+        if not payload:
+            return
+        self.starts.append(self._size)
+        self.captures.append(capture)
+        end = self._size + len(payload)
+        if self._map is None and end > self.max_memory:
+            self._spill(end)
+        if self._map is None:
+            self._data += payload
+        else:
+            if end > len(self._map):
+                self._grow(end)
+            self._map[self._size:end] = payload
+        self._size = end
+
+    def _spill(self, size):
+        """Move the data to a mapped temporary file."""
+        self._file = tempfile.TemporaryFile()
+        self._file.write(self._data)
+        self._data = None
+        self._grow(size)
+
+    def _grow(self, size):
+        capacity = max(size, 2 * (len(self._map) if self._map else 0))
+        if self._map is not None:
+            self._map.close()
+        self._file.truncate(capacity)
+        self._file.flush()
+        self._map = mmap.mmap(self._file.fileno(), capacity)
+
+    @property
+    def data(self):
+        """A memoryview of the stream (valid until the next append)."""
+        if self._map is None:
+            return memoryview(self._data)
+        return memoryview(self._map)[:self._size]
+
+    def find(self, sub, start=0, end=None):
+        """Get the offset of sub in the stream, or -1 (like bytes.find)."""
+        if end is None or end > self._size:
+            end = self._size
+        if self._map is None:
+            return self._data.find(sub, start, end)
+        return self._map.find(sub, start, end)
+
+    def finditer(self, pattern, flags=0):
+        """Find each match of a regular expression (str or bytes
+        pattern, or compiled) in the stream.
+        """
+        if not hasattr(pattern, 'finditer'):
+            if not isinstance(pattern, bytes):
+                pattern = pattern.encode('utf-8')
+            pattern = re.compile(pattern, flags)
+        return pattern.finditer(self.data)
+
+    def capture_at(self, offset):
+        """Get the capture number of the byte at an offset."""
+        if not 0 <= offset < self._size:
+            raise IndexError("Offset {} is not in the stream (size {})."
+                             "".format(offset, self._size))
+        return self.captures[bisect_right(self.starts, offset) - 1]
+
+    def captures_in(self, start, end):
+        """Get the capture numbers of the bytes from start to end (for
+        a match that spans several captures).
+        """
+        if end <= start:
+            return []
+        first = bisect_right(self.starts, start) - 1
+        last = bisect_right(self.starts, end - 1) - 1
+        return list(self.captures[first:last+1])
+
+    def search(self, pattern, flags=0):
+        """Find each match of a regular expression.
+
+        Returns:
+            list[tuple]: (start, end, captures) for each match, where
+                captures is the list of capture numbers it came from.
+                Empty matches (such as of "x?") aren't included, since
+                they have no bytes to come from.
+        """
+        return [(match.start(), match.end(),
+                 self.captures_in(match.start(), match.end()))
+                for match in self.finditer(pattern, flags)
+                if match.end() > match.start()]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Reassembler:
+    """Keep a ByteStream for each port and direction.
+
+    Directions are "read" (IRP_MJ_READ, from the device) and "write"
+    (IRP_MJ_WRITE, to the device).
+    """
+    def __init__(self, max_memory=DEFAULT_MAX_MEMORY):
+        self.max_memory = max_memory
+        self.streams = {}  # (port, direction) to ByteStream
+
+    def stream(self, port, direction):
+        """Get the stream for a port and direction (created if new)."""
+        key = (port, direction)
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = ByteStream(max_memory=self.max_memory)
+            self.streams[key] = stream
+        return stream
+
+    def add(self, port, direction, payload, capture):
+        """Add a decoded payload (See ByteStream.append)."""
+        self.stream(port, direction).append(payload, capture)
+
+    def add_record(self, meta, payload=None):
+        """Add an SPM capture (a Record or dict of its fields).
+
+        Args:
+            meta: The capture, with "#", "Function", "Port" and "Data".
+            payload (bytes): The decoded "Data", if already decoded.
+
+        Returns:
+            bool: False if the capture isn't a READ or WRITE.
+        """
+        function = meta['Function']
+        if function == "IRP_MJ_READ":
+            direction = "read"
+        elif function == "IRP_MJ_WRITE":
+            direction = "write"
+        else:
+            return False
+        if payload is None:
+            payload = decode_hex(meta['Data'])
+        self.add(meta['Port'], direction, payload, int(meta['#']))
+        return True
+
+    def search(self, pattern, direction=None, port=None, flags=0):
+        """Search every stream (or those of a port and/or direction).
+
+        Returns:
+            list[tuple]: (port, direction, start, end, captures) for
+                each match (See ByteStream.search).
+        """
+        results = []
+        for (stream_port, stream_direction), stream in sorted(
+                self.streams.items()):
+            if direction is not None and stream_direction != direction:
+                continue
+            if port is not None and stream_port != port:
+                continue
+            for start, end, captures in stream.search(pattern, flags):
+                results.append((stream_port, stream_direction, start, end,
+                                captures))
+        return results
+
+    def close(self):
+        for stream in self.streams.values():
+            stream.close()
@@ -0,0 +1,200 @@
+"""
+Compact header-keyed rows (an alternative to a dict per row).
+
+A Record is a list of the fields of one row, so it costs no more memory
+than the row itself. The column names are stored once in a Record
+subclass made for the header (See make_record_type), which also adds an
+attribute for each column. Each field is decoded (such as from UTF-8)
+the first time it is accessed, then the str replaces the bytes.
+"""
+from __future__ import print_function
+import re
+import sys
+
+from binarycsv import (
+    reader,
+)
+
+try:
+    _intern = sys.intern
+except AttributeError:  # Python 2
+    _intern = intern  # noqa: F821
+
+_NON_WORD_RE = re.compile(r"\W+")
+
+
+def attribute_name(name):
+    """Get an attribute name for a column name.
+
+    For example, "Data (chars)" becomes "data_chars" and "#" becomes
+    "number". An empty string is returned if there is no valid name.
+    """
+    attr = _NON_WORD_RE.sub("_", name.replace("#", " number ")).strip("_")
+    attr = attr.lower()
+    if not attr or attr[0].isdigit():
+        return ""
+    return attr
+
+
+class Record(list):
+    """The fields of one row, accessible by column name or index.
+
+    Use a subclass from make_record_type (this class has no columns).
+    Fields are bytes until accessed by name, index or attribute, then
+    they are str (except for raw fields, which stay bytes).
+    """
+    __slots__ = ()
+    fieldnames = ()
+    _index = {}
+    _raw = frozenset()
+    _encoding = 'utf-8'
+    _errors = 'strict'
+
+    def field(self, i):
+        """Get a field by index, decoding it if necessary."""
+        value = list.__getitem__(self, i)
+        if isinstance(value, bytes) and i not in self._raw:
+            value = value.decode(self._encoding, self._errors)
+            list.__setitem__(self, i, value)
+        return value
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.field(i) for i in range(*key.indices(len(self)))]
+        if not isinstance(key, int):
+            key = self._index[key]
+        return self.field(key)
+
+    def __setitem__(self, key, value):
+        if not isinstance(key, (int, slice)):
+            key = self._index[key]
+        list.__setitem__(self, key, value)
+
+    def get(self, key, default=None):
+        i = self._index.get(key)
+        if i is None:
+            return default
+        return self.field(i)
+
+    def keys(self):
+        return list(self.fieldnames)
+
+    def values(self):
+        return [self.field(i) for i in range(len(self))]
+
+    def items(self):
+        return list(zip(self.fieldnames, self.values()))
+
+    def __repr__(self):
+        return "{}({})".format(
+            type(self).__name__,
+            ", ".join("{}: {}".format(repr(k), repr(v))
+                      for k, v in self.items()),
+        )
+
+
+def make_record_type(fieldnames, raw_fields=(), encoding='utf-8',
+                     errors='strict'):
+    """Make a Record subclass for a header row.
+
+    Args:
+        fieldnames (list[str]): The column names (such as the decoded
+            header row).
+        raw_fields (Iterable[str]): Names of columns to keep as bytes
+            (such as "Data (chars)" in SPM exports).
+        encoding (str): The encoding of the other columns.
+        errors (str): How to handle fields that can't be decoded (See
+            bytes.decode).
+
+    Returns:
+        type: A subclass of Record. Call it with a row (list of bytes)
+            to make a record.
+    """
+    fieldnames = tuple(_intern(str(name)) for name in fieldnames)
+    index = {}
+    for i, name in enumerate(fieldnames):
+        index.setdefault(name, i)  # (The first of duplicate names wins)
+    attrs = {
+        '__slots__': (),
+        'fieldnames': fieldnames,
+        '_index': index,
+        '_raw': frozenset(index[name] for name in raw_fields
+                          if name in index),
+        '_encoding': encoding,
+        '_errors': errors,
+    }
+    for name, i in index.items():
+        attr = attribute_name(name)
+        if attr and attr not in attrs and not hasattr(Record, attr):
+            attrs[attr] = property(lambda self, i=i: self.field(i))
+    return type("Record", (Record,), attrs)
+
+
+class DictReader:
+    """Read rows as Record objects keyed by the header row.
+
+    This is like csv.DictReader, but the first row must be the header
+    (unless fieldnames is set), and a row with a different number of
+    fields than the header is a ValueError.
+    """
+    def __init__(self, stream, fieldnames=None, raw_fields=(),
+                 encoding='utf-8', errors='strict', filters=None,
+                 **kwargs):
+        """Open a reader on the stream.
+
+        Args:
+            stream: A file or other stream in binary mode.
+            fieldnames (list[str]): Column names, if the stream has no
+                header row.
+            filters (Union[dict,list]): Only read rows matching this
+                spec, which may use column names (See
+                binarycsv.RowFilter).
+            kwargs: Keyword arguments for binarycsv.reader.
+        """
+        self.reader = reader(stream, **kwargs)
+        self.filters = filters
+        self.raw_fields = raw_fields
+        self.encoding = encoding
+        self.errors = errors
+        self.record_type = None
+        if fieldnames is not None:
+            self._set_fieldnames(fieldnames)
+
+    def _set_fieldnames(self, fieldnames):
+        self.record_type = make_record_type(
+            fieldnames,
+            raw_fields=self.raw_fields,
+            encoding=self.encoding,
+            errors=self.errors,
+        )
+        if self.filters is not None:
+            self.reader.set_filters(self.filters,
+                                    header=self.record_type.fieldnames)
+
+    @property
+    def fieldnames(self):
+        if self.record_type is None:
+            row = next(self.reader)
+            self._set_fieldnames(
+                [name.decode(self.encoding) for name in row])
+        return self.record_type.fieldnames
+
+    @property
+    def line_number(self):
+        return self.reader.line_number
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        fieldnames = self.fieldnames
+        row = next(self.reader)
+        if len(row) != len(fieldnames):
+            raise ValueError(
+                'Line {}: {} length is {} but there are {} columns'
+                ' in header row: {}'
+                .format(self.reader.line_number, row, len(row),
+                        len(fieldnames), fieldnames))
+        return self.record_type(row)
+
+    next = __next__  # Python 2
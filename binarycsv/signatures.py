@@ -0,0 +1,204 @@
+"""
+Find many byte patterns at once (an Aho-Corasick automaton).
+
+The automaton reads each byte once no matter how many patterns there
+are, and its state can be carried from one buffer to the next, so a
+match may span several buffers (such as consecutive payloads of the
+same serial port and direction).
+"""
+from __future__ import print_function
+import re
+from collections import (
+    deque,
+    namedtuple,
+)
+
+
+class AhoCorasick:
+    """A matcher for a fixed list of byte patterns.
+
+    Attributes:
+        patterns (list[bytes]): The patterns (the index of a pattern in
+            this list is what scan reports).
+        max_length (int): The length of the longest pattern.
+    """
+    def __init__(self, patterns):
+        """Build the automaton.
+
+        Args:
+            patterns (Iterable[bytes]): The patterns (str patterns are
+                encoded as UTF-8).
+
+        Raises:
+            ValueError: If there are no patterns or a pattern is empty.
+        """
+        self.patterns = [
+            pattern if isinstance(pattern, bytes)
+            else pattern.encode('utf-8')
+            for pattern in patterns
+        ]
+        if not self.patterns:
+            raise ValueError("There must be at least one pattern.")
+        if not all(self.patterns):
+            raise ValueError("A pattern can't be empty.")
+        self.max_length = max(len(pattern) for pattern in self.patterns)
+        goto = [{}]  # the trie of the patterns
+        outputs = [[]]  # indices of the patterns ending at each state
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for byte in bytearray(pattern):
+                child = goto[state].get(byte)
+                if child is None:
+                    child = len(goto)
+                    goto[state][byte] = child
+                    goto.append({})
+                    outputs.append([])
+                state = child
+            outputs[state].append(index)
+        # Add the failure transitions to make a complete table, in
+        #   breadth-first order so the state that a state falls back to
+        #   is always finished first.
+        fail = [0] * len(goto)
+        table = [None] * len(goto)
+        table[0] = [goto[0].get(byte, 0) for byte in range(256)]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state].extend(outputs[fail[state]])
+            row = list(table[fail[state]])
+            for byte, child in goto[state].items():
+                row[byte] = child
+                fail[child] = table[fail[state]][byte]
+                queue.append(child)
+            table[state] = row
+        self._table = table
+        self._outputs = [tuple(indices) for indices in outputs]
+        # Where no match is in progress, skip to a byte that may start
+        #   one using the regex engine (much faster than the loop).
+        first_bytes = sorted(set(goto[0]))
+        self._start_re = re.compile(b"[" + b"".join(
+            re.escape(bytes(bytearray([byte]))) for byte in first_bytes
+        ) + b"]")
+
+    def scan(self, data, state=0):
+        """Find the patterns in data.
+
+        Args:
+            data (bytes): The data to search.
+            state (int): The state after the previous data, to find
+                matches that started in it (0 to start over).
+
+        Returns:
+            tuple: (hits, state) where hits is a list of (end, index)
+                for each match, where end is the index in data after
+                the match and index is the index of the pattern, and
+                state is the state to pass with the next data.
+        """
+        table = self._table
+        outputs = self._outputs
+        start_re = self._start_re
+        hits = []
+        i = 0
+        n = len(data)
+        while i < n:
+            if state == 0:
+                match = start_re.search(data, i)
+                if match is None:
+                    break
+                i = match.start()
+            state = table[state][data[i]]
+            i += 1
+            if outputs[state]:
+                for index in outputs[state]:
+                    hits.append((i, index))
+        return hits, state
+
+
+SignatureHit = namedtuple('SignatureHit', [
+    'pattern',  # the pattern (bytes)
+    'port',
+    'direction',
+    'capture',  # the capture number where the match starts
+    'offset',  # the offset of the match in that capture's payload
+    'time',  # the time of that capture (as given to feed)
+    'captures',  # every capture number the match spans
+])
+
+
+class _StreamState:
+    __slots__ = ('state', 'size', 'recent')
+
+    def __init__(self):
+        self.state = 0
+        self.size = 0  # bytes fed so far
+        # (start, capture, time) of the payloads that a match ending
+        #   in the next payload could start in:
+        self.recent = deque()
+
+
+class SignatureScanner:
+    """Search the payloads of each port and direction as they arrive.
+
+    Payloads are fed in capture order, and each (port, direction) keeps
+    its own automaton state, so a pattern split across adjacent
+    captures of the same direction is still found. Only the captures
+    that a match could still start in are remembered, so memory doesn't
+    grow with the session.
+    """
+    def __init__(self, patterns):
+        """Create a scanner.
+
+        Args:
+            patterns (Iterable[bytes]): The signatures (See
+                AhoCorasick).
+        """
+        self.automaton = AhoCorasick(patterns)
+        self.patterns = self.automaton.patterns
+        self._streams = {}  # (port, direction) to _StreamState
+
+    def feed(self, port, direction, payload, capture, time=None):
+        """Search the next payload of a port and direction.
+
+        Args:
+            port (str): The port (such as the "Port" field).
+            direction (str): "read" or "write" (or any other key).
+            payload (bytes): The decoded payload.
+            capture (int): The capture number (such as the "#" field).
+            time: The time of the capture, to put in hits.
+
+        Returns:
+            list[SignatureHit]: The matches that end in this payload.
+        """
+        if not payload:
+            return []
+        key = (port, direction)
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = _StreamState()
+            self._streams[key] = stream
+        recent = stream.recent
+        recent.append((stream.size, capture, time))
+        found, stream.state = self.automaton.scan(payload, stream.state)
+        hits = []
+        for end, index in found:
+            pattern = self.patterns[index]
+            start = stream.size + end - len(pattern)
+            first = len(recent) - 1
+            while recent[first][0] > start:
+                first -= 1
+            first_start, first_capture, first_time = recent[first]
+            hits.append(SignatureHit(
+                pattern, port, direction, first_capture,
+                start - first_start, first_time,
+                [item[1] for item in list(recent)[first:]],
+            ))
+        stream.size += len(payload)
+        # A later match starts at most max_length-1 bytes back.
+        keep = stream.size - (self.automaton.max_length - 1)
+        while len(recent) > 1 and recent[1][0] <= keep:
+            recent.popleft()
+        return hits
+
+    def reset(self):
+        """Forget partial matches (such as after a gap in the capture)."""
+        self._streams = {}
@@ -0,0 +1,126 @@
+"""
+Fast conversion of timestamps such as the "Time" column of SPM exports.
+
+SPM timestamps have one-second resolution, so many consecutive rows have
+the same value. TimeConverter parses the fixed SPM layout by slicing
+digits (instead of calling datetime.strptime) and keeps recently
+converted values in a small LRU cache.
+"""
+from __future__ import print_function
+import calendar
+from collections import OrderedDict
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SPM_TIME_FORMAT = "%d/%m/%Y %H:%M:%S"
+DEFAULT_CACHE_SIZE = 256  # distinct timestamps to remember
+MISSING_EPOCH = -(2 ** 63)  # the int64 value of NaT (for empty fields)
+
+
+def parse_spm_time(value):
+    """Parse a timestamp in the SPM layout ("22/09/2023 10:50:54").
+
+    Args:
+        value (Union[str,bytes]): The timestamp.
+
+    Returns:
+        datetime: The timestamp (naive, as in the file).
+
+    Raises:
+        ValueError: If the value isn't a valid timestamp in that layout.
+    """
+    if isinstance(value, bytes):
+        value = value.decode('ascii', 'replace')
+    if (len(value) == 19 and value[2] == '/' and value[5] == '/'
+            and value[10] == ' ' and value[13] == ':' and value[16] == ':'):
+        digits = (value[0:2] + value[3:5] + value[6:10] + value[11:13]
+                  + value[14:16] + value[17:19])
+        if digits.isdigit():
+            return datetime(int(value[6:10]), int(value[3:5]),
+                            int(value[0:2]), int(value[11:13]),
+                            int(value[14:16]), int(value[17:19]))
+    # Let strptime explain the problem:
+    return datetime.strptime(value, SPM_TIME_FORMAT)
+
+
+class TimeConverter:
+    """Convert timestamps, remembering the most recent ones.
+
+    Empty values (b"" or "") are missing: None from datetime and epoch,
+    and NaT (or MISSING_EPOCH) in arrays.
+    """
+    def __init__(self, time_format=SPM_TIME_FORMAT,
+                 cache_size=DEFAULT_CACHE_SIZE):
+        """Prepare a converter.
+
+        Args:
+            time_format (str): The strptime format. The SPM format uses
+                a faster parser.
+            cache_size (int): How many distinct values to remember.
+        """
+        self.time_format = time_format
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # value to (datetime, epoch)
+        self._last_value = None
+        self._last = (None, None)
+        if time_format == SPM_TIME_FORMAT:
+            self._parse = parse_spm_time
+        else:
+            self._parse = self._strptime
+
+    def _strptime(self, value):
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return datetime.strptime(value, self.time_format)
+
+    def _convert(self, value):
+        """Get (datetime, epoch) for a value."""
+        if value == self._last_value:
+            return self._last
+        cache = self._cache
+        result = cache.pop(value, None)
+        if result is None:
+            if value:
+                when = self._parse(value)
+                result = (when, calendar.timegm(when.timetuple()))
+            else:
+                result = (None, None)
+            if len(cache) >= self.cache_size:
+                cache.popitem(last=False)  # the least recently used
+        cache[value] = result  # (Now it is the most recently used)
+        self._last_value = value
+        self._last = result
+        return result
+
+    def datetime(self, value):
+        """Convert a timestamp (str or bytes) to a datetime."""
+        return self._convert(value)[0]
+
+    def epoch(self, value):
+        """Convert a timestamp (str or bytes) to seconds since 1970
+        (treating the timestamp as UTC, the same as datetime64).
+        """
+        return self._convert(value)[1]
+
+    def epoch_array(self, values):
+        """Convert several timestamps to an int64 array of epoch seconds
+        (MISSING_EPOCH where a value is empty).
+        """
+        if np is None:
+            raise ImportError("epoch_array requires numpy.")
+        result = np.empty(len(values), dtype=np.int64)
+        convert = self._convert
+        for i, value in enumerate(values):
+            epoch = convert(value)[1]
+            result[i] = MISSING_EPOCH if epoch is None else epoch
+        return result
+
+    def datetime64_array(self, values):
+        """Convert several timestamps to a datetime64[s] array (NaT
+        where a value is empty).
+        """
+        return self.epoch_array(values).view('datetime64[s]')
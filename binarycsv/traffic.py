@@ -0,0 +1,289 @@
+"""
+Aggregate serial traffic in one streaming pass with bounded memory.
+
+TrafficStats counts captures and bytes per (port, direction, function),
+both in total and per time bucket, measures the latency from a request
+(WRITE going DOWN) to its response (the next READ coming UP on the same
+port) with a QuantileSketch, and keeps the largest payloads. Buckets are
+merged (doubling their width) when there would be more than
+max_buckets, so memory doesn't depend on the length of the log.
+"""
+from __future__ import print_function
+import heapq
+import math
+from collections import namedtuple
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+DEFAULT_BUCKET_SECONDS = 60
+DEFAULT_MAX_BUCKETS = 1024
+DEFAULT_TOP = 10
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_MAX_BINS = 2048
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def format_epoch(seconds):
+    """Format seconds since 1970 (UTC, See TimeConverter.epoch)."""
+    return str(_EPOCH + timedelta(seconds=seconds))
+
+
+class QuantileSketch:
+    """Estimate quantiles of non-negative values in constant memory.
+
+    Values are counted in logarithmic bins (as in DDSketch), so any
+    quantile is within relative_accuracy of a value that was added.
+    """
+    def __init__(self, relative_accuracy=DEFAULT_RELATIVE_ACCURACY,
+                 max_bins=DEFAULT_MAX_BINS):
+        """Create an empty sketch.
+
+        Args:
+            relative_accuracy (float): The relative error of quantiles.
+            max_bins (int): The most bins to keep (if there would be
+                more, the lowest bins are merged, making the smallest
+                values less accurate).
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1"
+                             " but is {}".format(relative_accuracy))
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.bins = {}  # bin index to count
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """Add a value (0 or more)."""
+        if value < 0:
+            raise ValueError("The value {} is negative.".format(value))
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if value == 0:
+            self.zeros += 1
+            return
+        index = int(math.ceil(math.log(value) / self._log_gamma))
+        self.bins[index] = self.bins.get(index, 0) + 1
+        if len(self.bins) > self.max_bins:
+            lowest, second = sorted(self.bins)[:2]
+            self.bins[second] += self.bins.pop(lowest)
+
+    def quantile(self, q):
+        """Estimate a quantile.
+
+        Args:
+            q (float): From 0 (the minimum) to 1 (the maximum).
+
+        Returns:
+            float: The estimate, or None if no values were added.
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return 0.0
+        seen = self.zeros
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+Payload = namedtuple('Payload', ['size', 'capture', 'port', 'direction',
+                                 'function', 'time'])
+
+
+class TrafficStats:
+    """Running totals of captures (See the module docstring).
+
+    Attributes:
+        totals (dict): (port, direction, function) to [captures, bytes].
+        buckets (dict): The start of each time bucket (epoch seconds) to
+            a dict like totals.
+        bucket_seconds (int): The width of the buckets (it doubles
+            whenever there would be more than max_buckets).
+        latency (dict): Port to a QuantileSketch of request-to-response
+            seconds.
+        captures (int): The number of captures added.
+        first_time (float): The earliest time (epoch seconds) added.
+        last_time (float): The latest time added.
+    """
+    def __init__(self, bucket_seconds=DEFAULT_BUCKET_SECONDS,
+                 max_buckets=DEFAULT_MAX_BUCKETS, top=DEFAULT_TOP,
+                 relative_accuracy=DEFAULT_RELATIVE_ACCURACY,
+                 request=("DOWN", "IRP_MJ_WRITE"),
+                 response=("UP", "IRP_MJ_READ")):
+        """Create empty statistics.
+
+        Args:
+            bucket_seconds (int): The width of a time bucket at first.
+            max_buckets (int): The most buckets to keep.
+            top (int): How many of the largest payloads to keep.
+            relative_accuracy (float): See QuantileSketch.
+            request (tuple): The (direction, function) of a request.
+            response (tuple): The (direction, function) of a response.
+        """
+        if bucket_seconds <= 0:
+            raise ValueError("bucket_seconds must be positive but is {}"
+                             "".format(bucket_seconds))
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        self.top = top
+        self.relative_accuracy = relative_accuracy
+        self.request = tuple(request)
+        self.response = tuple(response)
+        self.totals = {}
+        self.buckets = {}
+        self.latency = {}
+        self.captures = 0
+        self.first_time = None
+        self.last_time = None
+        self._largest = []  # a min-heap of (size, order, Payload)
+        self._requests = {}  # port to the time of an unanswered request
+
+    def add(self, when, port, direction, function, size, capture=None):
+        """Count a capture.
+
+        Args:
+            when (float): The time in epoch seconds, or None if unknown
+                (then it is only counted in totals).
+            port (str): The port, such as "COM3".
+            direction (str): "UP" or "DOWN".
+            function (str): Such as "IRP_MJ_READ".
+            size (int): The payload bytes (0 for control captures).
+            capture (int): The capture number, to list largest payloads.
+        """
+        key = (port, direction, function)
+        self.captures += 1
+        counts = self.totals.get(key)
+        if counts is None:
+            counts = [0, 0]
+            self.totals[key] = counts
+        counts[0] += 1
+        counts[1] += size
+        if when is not None:
+            if self.first_time is None or when < self.first_time:
+                self.first_time = when
+            if self.last_time is None or when > self.last_time:
+                self.last_time = when
+            self._add_bucket(when, key, size)
+        if size > 0:
+            if (direction, function) == self.request:
+                self._requests[port] = when
+            elif (direction, function) == self.response:
+                requested = self._requests.pop(port, None)
+                if requested is not None and when is not None \
+                        and when >= requested:
+                    sketch = self.latency.get(port)
+                    if sketch is None:
+                        sketch = QuantileSketch(self.relative_accuracy)
+                        self.latency[port] = sketch
+                    sketch.add(when - requested)
+            if self.top:
+                item = (size, -self.captures, Payload(
+                    size, capture, port, direction, function, when))
+                if len(self._largest) < self.top:
+                    heapq.heappush(self._largest, item)
+                elif item > self._largest[0]:
+                    heapq.heapreplace(self._largest, item)
+
+    def _add_bucket(self, when, key, size):
+        start = when // self.bucket_seconds * self.bucket_seconds
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            if len(self.buckets) >= self.max_buckets:
+                self._widen_buckets()
+                self._add_bucket(when, key, size)
+                return
+            bucket = {}
+            self.buckets[start] = bucket
+        counts = bucket.get(key)
+        if counts is None:
+            counts = [0, 0]
+            bucket[key] = counts
+        counts[0] += 1
+        counts[1] += size
+
+    def _widen_buckets(self):
+        """Double the bucket width, merging pairs of buckets."""
+        self.bucket_seconds *= 2
+        buckets = {}
+        for start, bucket in self.buckets.items():
+            start = start // self.bucket_seconds * self.bucket_seconds
+            merged = buckets.setdefault(start, {})
+            for key, (captures, size) in bucket.items():
+                counts = merged.setdefault(key, [0, 0])
+                counts[0] += captures
+                counts[1] += size
+        self.buckets = buckets
+
+    def largest(self):
+        """Get the largest payloads, largest first.
+
+        Returns:
+            list[Payload]: Up to top payloads (earlier captures first
+                among those of the same size).
+        """
+        return [item[2] for item in sorted(self._largest, reverse=True)]
+
+    def report(self, percentiles=(50, 90, 99)):
+        """Describe the statistics.
+
+        Returns:
+            list[str]: The lines of the report.
+        """
+        lines = ["Captures: {}".format(self.captures)]
+        if self.first_time is not None:
+            lines[0] += " from {} to {}".format(
+                format_epoch(self.first_time), format_epoch(self.last_time))
+        lines.append("Totals by port, direction and function:")
+        for key, (captures, size) in sorted(self.totals.items()):
+            lines.append("  {} {} {}: {} capture(s), {} byte(s)".format(
+                *(key + (captures, size))))
+        if self.buckets:
+            lines.append("Per {} s:".format(self.bucket_seconds))
+            for start in sorted(self.buckets):
+                for key, (captures, size) in sorted(
+                        self.buckets[start].items()):
+                    lines.append("  {} {} {} {}: {} capture(s), {} byte(s)"
+                                 "".format(format_epoch(start),
+                                           *(key + (captures, size))))
+        if self.latency:
+            lines.append("Latency from {} {} to {} {} (seconds):".format(
+                *(self.request + self.response)))
+            for port, sketch in sorted(self.latency.items()):
+                lines.append("  {}: n={} mean={:.3f} {} max={:.3f}".format(
+                    port, sketch.count, sketch.mean(),
+                    " ".join("p{}={:.3f}".format(
+                        percentile, sketch.quantile(percentile / 100.0))
+                        for percentile in percentiles),
+                    sketch.max,
+                ))
+        largest = self.largest()
+        if largest:
+            lines.append("Largest payloads:")
+            for payload in largest:
+                lines.append("  {} byte(s): #{} {} {} {}{}".format(
+                    payload.size, payload.capture, payload.port,
+                    payload.direction, payload.function,
+                    "" if payload.time is None
+                    else " at {}".format(format_epoch(payload.time)),
+                ))
+        return lines
@@ -0,0 +1,190 @@
+"""
+Write CSV files containing binary data with no encoding.
+
+Output is the format that reader reads: a field is only quoted if it
+contains the delimiter, the quote character or a newline byte, and a
+quote character inside of a quoted field is doubled. Fields are bytes,
+so anything reader reads (such as 0x9d) is written back byte for byte.
+"""
+from __future__ import print_function
+import re
+
+from binarycsv import (
+    DEFAULT_BLOCK_SIZE,
+)
+from binarycsv.batches import (
+    DEFAULT_TIME_FORMAT,
+    MISSING_INT,
+    ColumnBatch,
+    np,
+)
+
+
+class writer:
+    """Write rows of bytes fields to a stream.
+
+    Rows are formatted into a buffer, which is written to the stream in
+    one call whenever it reaches buffer_size bytes (and by flush). Call
+    flush (or use the writer as a context manager) when done, or the
+    end of the data will not be written.
+    """
+    def __init__(self, stream, delimiter=b";", quotechar=b'"',
+                 lineterminator=b"\r\n", buffer_size=DEFAULT_BLOCK_SIZE,
+                 encoding='utf-8', errors='strict'):
+        """Prepare to write rows to a stream.
+
+        Args:
+            stream: A file or other stream in binary mode.
+            lineterminator (bytes): The newline to write after each row.
+            buffer_size (int): Bytes to collect before each
+                stream.write call.
+            encoding (str): The encoding of str fields (bytes fields are
+                written as they are).
+            errors (str): How to handle str fields that can't be
+                encoded (See str.encode).
+        """
+        self.stream = stream
+        self.delimiter = delimiter
+        self.quotechar = quotechar
+        self.lineterminator = lineterminator
+        self.buffer_size = buffer_size
+        self.encoding = encoding
+        self.errors = errors
+        self._escaped_quote = quotechar + quotechar
+        # Any byte other than the delimiter that requires quoting:
+        self._special_re = re.compile(b"[" + re.escape(quotechar)
+                                      + b"\r\n]")
+        self._parts = []
+        self._size = 0
+        self.rows_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def _to_bytes(self, value):
+        if isinstance(value, bytes):
+            return value
+        if isinstance(value, (bytearray, memoryview)):
+            return bytes(value)
+        if value is None:
+            return b""
+        if hasattr(value, 'encode'):
+            return value.encode(self.encoding, self.errors)
+        return str(value).encode('ascii')
+
+    def _quote(self, field):
+        if (self.delimiter in field or self._special_re.search(field)
+                is not None):
+            return (self.quotechar
+                    + field.replace(self.quotechar, self._escaped_quote)
+                    + self.quotechar)
+        return field
+
+    def format_row(self, row):
+        """Get a row as bytes (including lineterminator).
+
+        Args:
+            row (Iterable): The fields, usually bytes. A str field is
+                encoded, None is written as an empty field, and other
+                values (such as int) are written as str(value).
+
+        Raises:
+            ValueError: If the row has no fields (reader never reads an
+                empty row, so it can't be written).
+        """
+        fields = [self._to_bytes(value) for value in row]
+        if not fields:
+            raise ValueError("A row must have at least one field.")
+        line = self.delimiter.join(fields)
+        if (line.count(self.delimiter) != len(fields) - 1
+                or self._special_re.search(line) is not None):
+            # Some field contains the delimiter, a quote or a newline.
+            line = self.delimiter.join(self._quote(field)
+                                       for field in fields)
+        elif not line:
+            # A row with one empty field would be read as a blank line,
+            #   which reader skips after a CR+LF, so quote it.
+            line = self.quotechar + self.quotechar
+        return line + self.lineterminator
+
+    def writerow(self, row):
+        """Add a row to the buffer (See format_row)."""
+        line = self.format_row(row)
+        self._parts.append(line)
+        self._size += len(line)
+        self.rows_written += 1
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def writerows(self, rows):
+        """Add several rows to the buffer.
+
+        Args:
+            rows (Iterable): Rows (See format_row), or a
+                binarycsv.ColumnBatch (See batch_rows).
+        """
+        if isinstance(rows, ColumnBatch):
+            rows = batch_rows(rows)
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        """Write the buffer to the stream."""
+        if self._parts:
+            self.stream.write(b"".join(self._parts))
+            self._parts = []
+            self._size = 0
+        if hasattr(self.stream, 'flush'):
+            self.stream.flush()
+
+
+def _column_fields(batch, name, time_format, time_cache):
+    """Get the values of a column of a ColumnBatch as bytes."""
+    values = batch[name]
+    if name in batch.categories:
+        categories = batch.categories[name]
+        return [categories[code] for code in values.tolist()]
+    if not hasattr(values, 'dtype'):  # a PayloadColumn
+        return [values[i] for i in range(len(values))]
+    if values.dtype.kind == 'M':  # "time"
+        fields = []
+        for value in values.astype('datetime64[s]'):
+            field = time_cache.get(value)
+            if field is None:
+                if np.isnat(value):
+                    field = b""
+                else:
+                    field = value.astype(object).strftime(
+                        time_format).encode('ascii')
+                time_cache[value] = field
+            fields.append(field)
+        return fields
+    fields = values.astype(bytes).tolist()
+    if values.dtype.kind in 'iu':
+        # Missing "int" values were empty fields.
+        missing = str(MISSING_INT).encode('ascii')
+        fields = [b"" if field == missing else field for field in fields]
+    return fields
+
+
+def batch_rows(batch, time_format=DEFAULT_TIME_FORMAT):
+    """Get rows of bytes fields from a ColumnBatch.
+
+    This reverses the conversions of binarycsv.read_batches, so rows
+    written from batches read with the same columns (and time_format)
+    are the same as the projected rows that were read.
+
+    Args:
+        batch (binarycsv.ColumnBatch): The batch.
+        time_format (str): The strftime format for "time" columns.
+
+    Returns:
+        list[tuple]: The rows (each a tuple of bytes).
+    """
+    time_cache = {}
+    columns = [_column_fields(batch, name, time_format, time_cache)
+               for name in batch.keys()]
+    return list(zip(*columns))
@@ -7,17 +7,49 @@ Analyze CSV files exported from Electronic Team's
 Author: Jake Gustafson
 
 Usage:
-py -3 spmanalyzer.py <path>
+py -3 spmanalyzer.py [options] <path>
+py -3 spmanalyzer.py --batch [--workers N] [--output PATH] <path>...
+
+Options:
+--follow          Keep analyzing rows as they are appended to the file
+                  (stop with Ctrl+C).
+--find TEXT       Instead of listing rows, list each READ or WRITE
+                  payload containing TEXT (may be repeated, and all of
+                  them are searched in one pass).
+--find-hex HEX    The same, for bytes written as hex (such as "55 9d").
+--batch           Summarize many files (each path can be a file, a
+                  directory of *.csv files (or *.csv.gz, *.csv.bz2 or
+                  *.csv.xz) or a glob) in parallel, as a
+                  table of captures and bytes per file, port and
+                  direction, with the time each file took.
+--workers N       The number of processes for --batch (default: one per
+                  CPU). Without --batch, parse the file (when listing
+                  its rows) using N processes.
+--output PATH     Also save the --batch table as a CSV file.
+--summary         Instead of listing rows, count captures and bytes per
+                  port, direction and function (in total and per time
+                  bucket), request-to-response latency percentiles and
+                  the largest payloads in one pass, then print only
+                  that (--quiet is the same).
+--bucket SECONDS  The width of the --summary time buckets (default
+                  60). Buckets widen if there would be too many.
+--top N           The number of largest payloads to list (default 10).
+--frames MOD:NAME Instead of listing rows, decode the frames of a
+                  framed protocol as the payloads are read, where NAME
+                  is a binarycsv.FrameSpec (or list of them) in the
+                  module MOD (such as myframes:SPECS for myframes.py).
 """
 from __future__ import print_function
 # import csv
 import os
 import platform
+import re
 import sys
-
-from datetime import datetime
+import threading
+import time
 
 if sys.version_info.major >= 3:  # try:
+    import queue
     from tkinter import messagebox
     from tkinter import filedialog
     # from tkinter import simpledialog
@@ -27,6 +59,7 @@ if sys.version_info.major >= 3:  # try:
     # from tkinter import tix
 else:  # except ImportError:
     # Python 2
+    import Queue as queue
     import tkMessageBox as messagebox
     import tkFileDialog as filedialog
     # import tkSimpleDialog as simpledialog
@@ -36,8 +69,20 @@ else:  # except ImportError:
     # import Tix as tix
 
 
+import binascii
+import glob
+
 from collections import OrderedDict
 
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:  # Python 2 without the futures backport
+    ProcessPoolExecutor = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 import binarycsv
 
@@ -63,58 +108,951 @@ PROPRIETARY_TEST_PATHS = [
     os.path.join("F:\\", try_name),
 ]
 
-SPM_TIME_FMT = "%d/%m/%Y %H:%M:%S"
+SPM_TIME_FMT = binarycsv.SPM_TIME_FORMAT
+
+VIRTUAL_MARGIN = 2  # Treeview items past the bottom of a VirtualList
+UI_POLL_MS = 50  # milliseconds between checks for captures from a worker
+UI_BATCH_LIMIT = 2000  # captures to add to the lists per check
+WORKER_BATCH_SIZE = 500  # captures per message from AnalysisWorker
+WORKER_BATCH_SECONDS = 0.1  # send a smaller batch if it takes this long
+WORKER_QUEUE_SIZE = 20  # messages to buffer before the worker waits
+WORKER_CACHE_ROWS = 8192  # rows per batch while saving a cache
+
+SPM_RAW_FIELDS = ("Data (chars)",)  # columns to leave as bytes
+
+# Columns with few distinct values (stored as codes by CaptureStore):
+SPM_CATEGORY_FIELDS = ("Function", "Direction", "Status", "Data length",
+                       "Req. length", "Port", "Comments", "")
+
+# The kind of each column in a cache of an SPM export (See
+#   binarycsv.build_cache). Other columns are cached as "bytes".
+SPM_CACHE_KINDS = {
+    "#": "int",
+    "Time": "time",
+    "Function": "category",
+    "Direction": "category",
+    "Status": "category",
+    "Data length": "int",
+    "Req. length": "int",
+    "Port": "category",
+}
+
+# Useful captures (See next_useful_meta). Other rows are UART control
+#   data, and the reader skips them without splitting the whole row.
+SPM_USEFUL_FILTERS = [
+    {"Function": [b"IRP_MJ_READ"], "Direction": [b"UP"],
+     "Data length": binarycsv.NON_EMPTY},
+    {"Function": [b"IRP_MJ_WRITE"], "Direction": [b"DOWN"],
+     "Data length": binarycsv.NON_EMPTY},
+]
+
+# Framed protocols to decode from the READ and WRITE streams in the GUI
+#   (binarycsv.FrameSpec objects). Add specs here or pass frame_specs to
+#   MainApplication (the command line uses --frames instead).
+FRAME_SPECS = []
+
+
+
+def numbered_rows(src, workers=None, follow=False):
+    """Read each row of a CSV file.
+
+    Args:
+        src (str): The CSV file.
+        workers (int): If set, parse the file using this many processes
+            (See binarycsv.parallel_read).
+        follow (bool): Keep reading rows as they are appended to the
+            file (See the follow option of binarycsv.reader).
 
+    Yields:
+        tuple: (line_number, row) where row is a list of bytes.
+    """
+    if workers and follow:
+        raise ValueError("A file can't be followed using workers.")
+    if workers:
+        for item in binarycsv.parallel_read(src, workers=workers):
+            yield item
+        return
+    with open(src, mode='rb') as stream:
+        # _reader = csv._reader(stream)
+        # ^ Can't read binary
+        # _reader = csv.DictReader(stream)
+        # ^ Can't read binary
+        _reader = binarycsv.reader(stream, follow=follow)
+        for row in _reader:
+            yield _reader.line_number, row
 
 
-def analyze_spm_log(src):
+def analyze_spm_log(src, workers=None, follow=False):
     """
     Analyze a CSV exported from Serial Port Monitor using Right-click,
     Export while selecting row(s) of data that was captured.
 
     This function uses csv.DictReader which requires that the first row
     is titles.
+
+    Args:
+        src (str): The CSV file.
+        workers (int): If set, parse the file using this many processes.
+        follow (bool): Keep analyzing rows as they are appended to the
+            file, instead of stopping at the end.
     """
     header_row = None
+    number = 0
+    time_converter = binarycsv.TimeConverter()
+    payloads = binarycsv.PayloadTotals()
+    for line_number, row in numbered_rows(src, workers=workers,
+                                          follow=follow):
+        number += 1
+        if header_row is None:
+            header_row = []
+            for name in row:
+                header_row.append(name.decode('utf-8'))
+            record_type = binarycsv.make_record_type(
+                header_row,
+                raw_fields=SPM_RAW_FIELDS,
+            )
+            print("header row[{}]={}".format(number, pformat(row)))
+            continue
+        if len(header_row) != len(row):
+            echo0('"{}", Line {}: incorrect column count'
+                  ''.format(src, line_number))
+            raise ValueError(
+                ' {} length is {} but there are {} columns'
+                ' in header row: {}'
+                ''.format(row, len(row),
+                          len(header_row), header_row)
+            )
+        meta = record_type(row)
+        if len(meta['Time']) > 0:
+            meta['Time'] = time_converter.datetime(meta['Time'])
+        print("row[{}]={}".format(number, pformat(meta)))
+        data = meta['Data']
+        data_chars = meta['Data (chars)']
+        print("  data={}".format(data))
+        print("  data_chars={}".format(data_chars))
+        if data:
+            try:
+                if meta['Function'] == "IRP_MJ_READ":
+                    payloads.add_read(data,
+                                      data_length=meta['Data length'])
+                elif meta['Function'] == "IRP_MJ_WRITE":
+                    payloads.add_write(data,
+                                       data_length=meta['Data length'])
+            except ValueError as ex:
+                # Report it but keep the totals of the other captures.
+                echo0('"{}", Line {}: {}'.format(src, line_number, ex))
+    print("READ total: {} byte(s)".format(payloads.read_total))
+    print("WRITE total: {} byte(s)".format(payloads.write_total))
+
+
+def useful_payloads(src, follow=False):
+    """Read the decoded payloads of the useful captures of an SPM export.
+
+    Args:
+        src (str): The CSV file.
+        follow (bool): Keep reading rows as they are appended to the
+            file.
+
+    Yields:
+        tuple: (number, time, port, direction, payload) for each capture
+            where number is the "#" field as an int, time is the "Time"
+            field (bytes, or None if there is no such column), port is a
+            str, direction is "read" or "write"
+            and payload is bytes.
+    """
     with open(src, mode='rb') as stream:
-        # _reader = csv._reader(stream)
-        # ^ Can't read binary
-        # _reader = csv.DictReader(stream)
-        # ^ Can't read binary
-        _reader = binarycsv.reader(stream)
-        number = 0
-        for row in _reader:
-            number += 1
+        _reader = binarycsv.reader(stream, follow=follow)
+        row = next(_reader, None)
+        if row is None:
+            return  # The file is empty.
+        header_row = [name.decode('utf-8') for name in row]
+        names = ["#", "Time", "Function", "Port", "Data"]
+        if "Time" not in header_row:
+            names[1] = "#"  # (then time is None below)
+        _reader.set_filters(SPM_USEFUL_FILTERS, header=header_row)
+        _reader.set_columns(names, header=header_row)
+        for number, when, function, port, data in _reader:
+            if names[1] != "Time":
+                when = None
+            if function == b"IRP_MJ_READ":
+                direction = "read"
+            else:
+                direction = "write"
+            yield (int(number), when, port.decode('utf-8'), direction,
+                   binarycsv.decode_hex(data))
+
+
+def search_spm_log(src, patterns, follow=False):
+    """Find byte signatures in the READ and WRITE payloads of an SPM
+    export, in one pass however many signatures there are.
+
+    Matches that span adjacent captures of the same port and direction
+    are found too (See binarycsv.SignatureScanner).
+
+    Args:
+        src (str): The CSV file.
+        patterns (Iterable[bytes]): The signatures.
+        follow (bool): Keep searching rows as they are appended to the
+            file.
+
+    Yields:
+        SignatureHit: Each match, where time is a datetime.
+    """
+    scanner = binarycsv.SignatureScanner(patterns)
+    time_converter = binarycsv.TimeConverter()
+    for number, when, port, direction, payload in useful_payloads(
+            src, follow=follow):
+        for hit in scanner.feed(port, direction, payload, number,
+                                time=when):
+            if hit.time:
+                hit = hit._replace(time=time_converter.datetime(hit.time))
+            yield hit
+
+
+def load_frame_specs(name):
+    """Import FrameSpec objects to decode (See FRAME_SPECS).
+
+    Args:
+        name (str): "module:attribute" where the attribute is a
+            binarycsv.FrameSpec or a list of them (the module must be
+            importable, such as a .py file in the current directory).
+
+    Returns:
+        list[FrameSpec]: The specs.
+
+    Raises:
+        ValueError: If name isn't in that form or the attribute isn't
+            FrameSpec objects.
+    """
+    import importlib
+    module_name, _, attribute = name.partition(":")
+    if not module_name or not attribute:
+        raise ValueError('Frame specs should be given as "module:attribute"'
+                         ' but got {}'.format(repr(name)))
+    if "" not in sys.path and os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    specs = getattr(importlib.import_module(module_name), attribute)
+    if isinstance(specs, binarycsv.FrameSpec):
+        specs = [specs]
+    specs = list(specs)
+    if not all(isinstance(spec, binarycsv.FrameSpec) for spec in specs):
+        raise ValueError("{} should be a FrameSpec or a list of them."
+                         "".format(name))
+    return specs
+
+
+def decode_spm_log(src, specs, follow=False):
+    """Decode the frames of framed protocols in the READ and WRITE
+    payloads of an SPM export as it is read.
+
+    Args:
+        src (str): The CSV file.
+        specs (Iterable[FrameSpec]): The layouts of the frames (each is
+            decoded separately).
+        follow (bool): Keep decoding rows as they are appended to the
+            file.
+
+    Yields:
+        Frame: Each frame, as soon as its last capture is read.
+    """
+    decoders = [binarycsv.FrameDecoder(spec) for spec in specs]
+    for number, _, port, direction, payload in useful_payloads(
+            src, follow=follow):
+        for decoder in decoders:
+            for frame in decoder.feed(port, direction, payload, number):
+                yield frame
+
+
+def format_frame(frame):
+    """Describe a Frame in one line."""
+    return "{} {} {} captures {}: {} {}".format(
+        frame.name, frame.port, frame.direction.upper(),
+        ",".join(str(capture) for capture in frame.captures),
+        ", ".join("{}={}".format(name, value)
+                  for name, value in frame.fields.items()),
+        binascii.hexlify(frame.payload).decode('ascii'),
+    )
+
+
+def summarize_spm_log(src):
+    """Count the useful captures and payload bytes of an SPM export by
+    port and direction (without printing anything, so it can run in a
+    worker process).
+
+    Args:
+        src (str): The CSV file.
+
+    Returns:
+        dict: The summary (only built-in types, so it can be pickled):
+            "path", "size", "rows", "seconds", "error" (None or a str),
+            and "ports" where ports[port][direction] (direction is
+            "read" or "write") is a dict of "captures" and "bytes".
+    """
+    start = time.time()
+    result = {
+        'path': src,
+        'size': None,
+        'rows': 0,
+        'seconds': None,
+        'error': None,
+        'ports': {},
+    }
+    totals = {}  # port to PayloadTotals
+    counts = {}  # (port, direction) to captures
+    names = ["Function", "Port", "Data", "Data length"]
+    try:
+        result['size'] = os.path.getsize(src)
+        with open(src, mode='rb') as stream:
+            _reader = binarycsv.reader(stream)
+            row = next(_reader, None)
+            if row is not None:
+                header_row = [name.decode('utf-8') for name in row]
+                _reader.set_filters(SPM_USEFUL_FILTERS, header=header_row)
+                _reader.set_columns(names, header=header_row)
+                for function, port, data, data_length in _reader:
+                    payloads = totals.get(port)
+                    if payloads is None:
+                        payloads = binarycsv.PayloadTotals()
+                        totals[port] = payloads
+                    if function == b"IRP_MJ_READ":
+                        payloads.add_read(data, data_length=data_length)
+                        key = (port, "read")
+                    else:
+                        payloads.add_write(data, data_length=data_length)
+                        key = (port, "write")
+                    counts[key] = counts.get(key, 0) + 1
+            result['rows'] = _reader.line_number
+    except (ValueError, EnvironmentError) as ex:
+        result['error'] = "{}: {}".format(type(ex).__name__, ex)
+    for (port, direction), captures in counts.items():
+        payloads = totals[port]
+        name = port.decode('utf-8', 'replace')
+        result['ports'].setdefault(name, {})[direction] = {
+            'captures': captures,
+            'bytes': (payloads.read_total if direction == "read"
+                      else payloads.write_total),
+        }
+    result['seconds'] = time.time() - start
+    return result
+
+
+# Files to analyze in a directory given to --batch (exports may be
+#   compressed, See binarycsv.reader):
+BATCH_PATTERNS = ("*.csv", "*.csv.gz", "*.csv.bz2", "*.csv.xz")
+
+
+def expand_paths(sources):
+    """Get the CSV files named by paths, directories and globs.
+
+    Args:
+        sources (Iterable[str]): Files, directories (each file in them
+            matching BATCH_PATTERNS is used) or glob patterns such as
+            "exports/*/*.csv".
+
+    Returns:
+        list[str]: The files, sorted within each source, without
+            duplicates.
+    """
+    paths = []
+    seen = set()
+    for source in sources:
+        if os.path.isdir(source):
+            matches = sorted(
+                path for pattern in BATCH_PATTERNS
+                for path in glob.glob(os.path.join(source, pattern)))
+        elif os.path.isfile(source):
+            matches = [source]
+        else:
+            matches = sorted(path for path in glob.glob(source)
+                             if os.path.isfile(path))
+        for path in matches:
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def batch_analyze(paths, workers=None):
+    """Summarize many SPM exports, each file in a worker process.
+
+    Args:
+        paths (list[str]): The CSV files.
+        workers (int): The number of processes (None for one per CPU).
+            If 1, or if ProcessPoolExecutor isn't available, the files
+            are summarized in this process.
+
+    Yields:
+        dict: The summary of each file (See summarize_spm_log), in the
+            order of paths.
+    """
+    if workers == 1 or ProcessPoolExecutor is None or len(paths) < 2:
+        for path in paths:
+            yield summarize_spm_log(path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(summarize_spm_log, paths):
+            yield result
+
+
+BATCH_FIELDS = ["File", "Port", "Direction", "Captures", "Bytes",
+                "Seconds", "MB/s", "Error"]
+
+
+def summary_rows(results):
+    """Flatten summaries into one table.
+
+    There is a row per file, port and direction (or one row for a file
+    with an error or no captures), then a "TOTAL" row per port and
+    direction. Seconds and MB/s are for the whole file, so slow files
+    stand out.
+
+    Args:
+        results (Iterable[dict]): Summaries from summarize_spm_log.
+
+    Returns:
+        list[list[str]]: The rows, in the order of BATCH_FIELDS.
+    """
+    rows = []
+    totals = {}
+    for result in results:
+        seconds = result['seconds'] or 0.0
+        rate = ""
+        if result['size'] and seconds > 0:
+            rate = "{:.1f}".format(result['size'] / 1048576.0 / seconds)
+        timing = ["{:.3f}".format(seconds), rate, result['error'] or ""]
+        items = [(port, direction, counts)
+                 for port, directions in sorted(result['ports'].items())
+                 for direction, counts in sorted(directions.items())]
+        if not items:
+            rows.append([result['path'], "", "", "0", "0"] + timing)
+        for port, direction, counts in items:
+            rows.append([result['path'], port, direction,
+                         str(counts['captures']), str(counts['bytes'])]
+                        + timing)
+            total = totals.setdefault((port, direction), [0, 0])
+            total[0] += counts['captures']
+            total[1] += counts['bytes']
+    for (port, direction), (captures, size) in sorted(totals.items()):
+        rows.append(["TOTAL", port, direction, str(captures), str(size),
+                     "", "", ""])
+    return rows
+
+
+def format_table(rows, fields=BATCH_FIELDS):
+    """Align the columns of a table for the console."""
+    widths = [max([len(field)] + [len(row[i]) for row in rows])
+              for i, field in enumerate(fields)]
+    lines = []
+    for row in [fields] + rows:
+        lines.append("  ".join(value.ljust(width)
+                               for value, width in zip(row, widths))
+                     .rstrip())
+    return lines
+
+
+def traffic_spm_log(src, stats, follow=False):
+    """Add every capture of an SPM export to a TrafficStats, without
+    printing anything (the --summary mode).
+
+    Args:
+        src (str): The CSV file.
+        stats (binarycsv.TrafficStats): Where to count the captures (it
+            can be reported even if this is interrupted).
+        follow (bool): Keep reading rows as they are appended to the
+            file.
+    """
+    time_converter = binarycsv.TimeConverter()
+    names = ["#", "Time", "Function", "Direction", "Port", "Data length"]
+    with open(src, mode='rb') as stream:
+        _reader = binarycsv.reader(stream, follow=follow)
+        row = next(_reader, None)
+        if row is None:
+            return  # The file is empty.
+        header_row = [name.decode('utf-8') for name in row]
+        _reader.set_columns(names, header=header_row)
+        decoded = {}  # bytes to str, for the few distinct values
+        for number, when, function, direction, port, length in _reader:
+            for value in (function, direction, port):
+                if value not in decoded:
+                    decoded[value] = value.decode('utf-8', 'replace')
+            stats.add(
+                time_converter.epoch(when) if when else None,
+                decoded[port], decoded[direction], decoded[function],
+                int(length) if length else 0,
+                capture=int(number) if number else None,
+            )
+
+
+def capture_list(meta):
+    """Get the list ("read" or "write") for a useful capture.
+
+    Returns:
+        str: "read" for IRP_MJ_READ going UP, "write" for IRP_MJ_WRITE
+            going DOWN, otherwise None (See next_useful_meta).
+    """
+    if meta['Function'] == "IRP_MJ_READ":
+        if meta['Direction'] == "UP":
+            return "read"
+    elif meta['Function'] == "IRP_MJ_WRITE":
+        if meta['Direction'] == "DOWN":
+            return "write"
+    return None
+
+
+def spm_cache_columns(header_row):
+    """Get the columns to cache for an SPM export: every column (so
+    whole records can be rebuilt), with the kinds in SPM_CACHE_KINDS.
+    """
+    return OrderedDict((name, SPM_CACHE_KINDS.get(name, "bytes"))
+                       for name in header_row)
+
+
+def useful_indices(batch):
+    """Get the rows of a ColumnBatch (with the columns from
+    spm_cache_columns) that SPM_USEFUL_FILTERS would keep.
+
+    Returns:
+        numpy.ndarray: The indices of the useful captures.
+    """
+    def code(name, value):
+        categories = batch.categories[name]
+        return categories.index(value) if value in categories else -1
+
+    function = batch['Function']
+    direction = batch['Direction']
+    mask = (
+        ((function == code("Function", b"IRP_MJ_READ"))
+         & (direction == code("Direction", b"UP")))
+        | ((function == code("Function", b"IRP_MJ_WRITE"))
+           & (direction == code("Direction", b"DOWN")))
+    )
+    mask &= batch['Data length'] != binarycsv.batches.MISSING_INT
+    return np.flatnonzero(mask)
+
+
+class AnalysisWorker(threading.Thread):
+    """Find the useful captures in a file in a background thread.
+
+    The records are put into the messages queue in lists, as
+    ("captures", records, cur, line_number) where cur is the number of
+    bytes of the file read so far. The last message is ("done", error)
+    where error is None, or a str if the file couldn't be parsed. While
+    a cache is being saved, ("status", text) is sent. Nothing here uses
+    Tk, which may only be used by the main thread (See
+    MainApplication.drain_messages).
+
+    While the whole file is read, a cache of it is saved next to it in
+    the same pass (See binarycsv.CacheWriter), and later analyses of the
+    unchanged file read the cache instead of parsing the CSV.
+    """
+    def __init__(self, path, messages, header_row=None, start=None,
+                 batch_size=WORKER_BATCH_SIZE, use_cache=True):
+        """Prepare to read a file.
+
+        Args:
+            path (str): The CSV file exported from SPM.
+            messages (queue.Queue): Where to put the results.
+            header_row (list[str]): The column names, if start is after
+                the header row.
+            start (tuple): (cur, prev_newline, line_number) from a
+                reader that already read part of the file, to continue
+                from there (See binarycsv.reader.seek_offset).
+            batch_size (int): The most captures to put in one message.
+            use_cache (bool): Use (or save) a cache, if numpy is
+                installed and start is None.
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True  # Don't keep the program open if the window
+        #   is closed.
+        self.path = path
+        self.messages = messages
+        self.header_row = header_row
+        self.start_state = start
+        self.batch_size = batch_size
+        self.use_cache = use_cache and np is not None and start is None
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _put(self, message):
+        """Put a message in the queue, waiting while it is full.
+
+        Returns:
+            bool: False if cancelled while waiting.
+        """
+        while not self.cancelled.is_set():
+            try:
+                self.messages.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def run(self):
+        error = None
+        try:
+            self._analyze()
+        except Exception as ex:
+            error = "{}: {}".format(type(ex).__name__, ex)
+        self.messages.put(("done", error))
+
+    def _analyze(self):
+        if self.use_cache:
+            cache = self._load_cache()
+            if cache is not None:
+                try:
+                    self._analyze_cache(cache)
+                finally:
+                    cache.close()
+                return
+            columns = self._cache_columns()
+            if columns is not None:
+                self._analyze_and_cache(columns)
+                return
+        self._analyze_csv()
+
+    def _cache_columns(self):
+        with open(self.path, mode='rb') as stream:
+            row = next(binarycsv.reader(stream), None)
+        if row is None:
+            return None
+        header_row = [name.decode('utf-8') for name in row]
+        if len(set(header_row)) != len(header_row):
+            return None  # A ColumnBatch can't have duplicate names.
+        return spm_cache_columns(header_row)
+
+    def _load_cache(self):
+        columns = self._cache_columns()
+        if columns is None:
+            return None
+        return binarycsv.load_cache(self.path, columns=columns,
+                                    time_format=SPM_TIME_FMT)
+
+    def _analyze_and_cache(self, columns):
+        """Read the whole file as batches, sending the useful captures
+        and saving every row as the cache in the same pass.
+
+        If a value doesn't fit the kind of its column, the rest of the
+        file is read by _analyze_csv instead (without a cache).
+        """
+        with open(self.path, mode='rb') as stream:
+            _reader = binarycsv.reader(stream)
+            row = next(_reader, None)
+            if row is None:
+                return  # The file is empty.
+            header_row = [name.decode('utf-8') for name in row]
+            _reader.header = header_row
+            record_type = binarycsv.make_record_type(
+                header_row,
+                raw_fields=SPM_RAW_FIELDS,
+            )
+            try:
+                writer = binarycsv.CacheWriter(self.path, header_row,
+                                               columns=columns,
+                                               time_format=SPM_TIME_FMT)
+            except EnvironmentError as ex:
+                echo0('"{}": not cached ({})'.format(self.path, ex))
+                writer = None
+            done = (_reader.cur, _reader.prev_newline, _reader.line_number)
+            time_cache = {}
+            try:
+                for batch in _reader.read_batches(
+                        batch_rows=WORKER_CACHE_ROWS, columns=columns,
+                        time_format=SPM_TIME_FMT):
+                    if self.cancelled.is_set():
+                        return
+                    if writer is not None:
+                        try:
+                            writer.add(batch)
+                        except EnvironmentError as ex:
+                            echo0('"{}": not cached ({})'
+                                  ''.format(self.path, ex))
+                            writer.discard()
+                            writer = None
+                    indices = useful_indices(batch).tolist()
+                    done = (_reader.cur, _reader.prev_newline,
+                            _reader.line_number)
+                    # Progress is compared to the size of the file, which
+                    #   is smaller than the data if it is compressed.
+                    position = (stream.tell() if _reader.compression
+                                else _reader.cur)
+                    for start in range(0, max(len(indices), 1),
+                                       self.batch_size):
+                        records = [
+                            record_type(row) for row in binarycsv.cached_rows(
+                                batch, indices[start:start+self.batch_size],
+                                columns, SPM_TIME_FMT, time_cache)
+                        ]
+                        if not self._put(("captures", records, position,
+                                          _reader.line_number)):
+                            return
+                if writer is not None:
+                    self._put(("status",
+                               "Saving a cache of {}...".format(self.path)))
+                    try:
+                        writer.finish()
+                    except EnvironmentError as ex:
+                        # Such as if the folder is read-only.
+                        echo0('"{}": not cached ({})'.format(self.path, ex))
+                    writer = None
+                return
+            except ValueError as ex:
+                echo0('"{}": not cached ({})'.format(self.path, ex))
+            finally:
+                if writer is not None:
+                    writer.discard()
+        # Continue after the last batch that was sent.
+        self.header_row = header_row
+        self.start_state = done
+        self._analyze_csv()
+
+    def _analyze_cache(self, cache):
+        record_type = binarycsv.make_record_type(
+            cache.header,
+            raw_fields=SPM_RAW_FIELDS,
+        )
+        size = os.path.getsize(self.path)
+        total = len(cache)
+        indices = useful_indices(cache.batch).tolist()
+        for start in range(0, len(indices), self.batch_size):
+            if self.cancelled.is_set():
+                return
+            chunk = indices[start:start+self.batch_size]
+            records = [record_type(row) for row in cache.rows(chunk)]
+            # Rows are about the same size, so estimate the offset.
+            done = chunk[-1] + 1
+            if not self._put(("captures", records, size * done // total,
+                              done + 1)):
+                return
+        self._put(("captures", [], size, total + 1))
+
+    def _analyze_csv(self):
+        with open(self.path, mode='rb') as stream:
+            _reader = binarycsv.reader(stream)
+            header_row = self.header_row
+            if self.start_state is not None:
+                _reader.seek_offset(*self.start_state)
             if header_row is None:
-                header_row = []
-                for name in row:
-                    header_row.append(name.decode('utf-8'))
-                print("header row[{}]={}".format(number, pformat(row)))
-                continue
-            if len(header_row) != len(row):
-                echo0('"{}", Line {}: incorrect column count'
-                      ''.format(src, _reader.line_number))
-                raise ValueError(
-                    ' {} length is {} but there are {} columns'
-                    ' in header row: {}'
-                    ''.format(row, len(row),
-                              len(header_row), header_row)
-                )
-            meta = OrderedDict()
-            for i in range(len(header_row)):
-                key = header_row[i]
-                meta[key] = row[i]  # store current field in this row
-            if len(meta['Time']) > 0:
-                meta['Time'] = datetime.strptime(meta['Time'], SPM_TIME_FMT)
-            print("row[{}]={}".format(number, pformat(meta)))
-            data = meta['Data']
-            data_chars = meta['Data (chars)']
-            print("  data={}".format(data))
-            print("  data_chars={}".format(data_chars))
+                row = next(_reader, None)
+                if row is None:
+                    return  # The file is empty.
+                header_row = [name.decode('utf-8') for name in row]
+            record_type = binarycsv.make_record_type(
+                header_row,
+                raw_fields=SPM_RAW_FIELDS,
+            )
+            _reader.set_filters(SPM_USEFUL_FILTERS, header=header_row)
+
+            def position():
+                # Progress is compared to the size of the file, which is
+                #   smaller than the data if it is compressed.
+                if _reader.compression is not None:
+                    return stream.tell()
+                return _reader.cur
+
+            records = []
+            sent = time.time()
+            for row in _reader:
+                if self.cancelled.is_set():
+                    return
+                if len(row) != len(header_row):
+                    raise ValueError(
+                        '"{}", Line {}: {} length is {} but there are {}'
+                        ' columns in header row: {}'
+                        ''.format(self.path, _reader.line_number, row,
+                                  len(row), len(header_row), header_row))
+                records.append(record_type(row))
+                if (len(records) >= self.batch_size
+                        or time.time() - sent >= WORKER_BATCH_SECONDS):
+                    if not self._put(("captures", records, position(),
+                                      _reader.line_number)):
+                        return
+                    records = []
+                    sent = time.time()
+            self._put(("captures", records, position(),
+                       _reader.line_number))
+
+
+class VirtualList:
+    """Show a long list in a ttk.Treeview without an item per row.
+
+    The rows are kept in a Python list, and the Treeview only has items
+    for the rows that fit in it (plus a margin for a partly visible
+    last row), which are refilled with other rows when the view
+    scrolls. The scrollbar, mouse wheel and arrow keys scroll the list
+    instead of the Treeview.
+
+    Attributes:
+        rows (list[tuple]): (text, values) for each row.
+        top (int): The index of the first visible row.
+        selected (int): The index of the selected row, or None.
+    """
+    def __init__(self, tree, scrollbar, margin=VIRTUAL_MARGIN):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.margin = margin
+        self.rows = []
+        self.top = 0
+        self.visible = int(tree.cget('height'))  # until <Configure>
+        self.selected = None
+        self._iids = []  # the Treeview items, from the top of the view
+        self._selected_iid = None
+        style = ttk.Style()
+        self.rowheight = int(style.lookup("Treeview", "rowheight") or 0)
+        if self.rowheight < 1:
+            font = tkFont.nametofont("TkDefaultFont")
+            self.rowheight = font.metrics("linespace") + 2
+        scrollbar.configure(command=self.yview)
+        tree.configure(yscrollcommand="")  # (The tree never scrolls)
+        tree.bind("<Configure>", self._on_configure)
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        tree.bind("<MouseWheel>", self._on_mousewheel)
+        tree.bind("<Button-4>", lambda event: self.scroll_to(self.top - 3))
+        tree.bind("<Button-5>", lambda event: self.scroll_to(self.top + 3))
+        tree.bind("<Up>", lambda event: self._move_selection(-1))
+        tree.bind("<Down>", lambda event: self._move_selection(1))
+        tree.bind("<Prior>",
+                  lambda event: self._move_selection(1 - self.visible))
+        tree.bind("<Next>",
+                  lambda event: self._move_selection(self.visible - 1))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def append(self, text, values=()):
+        """Add a row to the end of the list."""
+        self.rows.append((text, values))
+        if len(self.rows) - 1 < self.top + self.visible + self.margin:
+            self.render()  # The new row has an item.
+        else:
+            self._update_scrollbar()
+
+    def clear(self):
+        self.rows = []
+        self.top = 0
+        self.selected = None
+        self.render()
+
+    def scroll_to(self, top):
+        """Show the rows starting at index top (if there are enough)."""
+        top = max(0, min(top, len(self.rows) - self.visible))
+        if top != self.top:
+            self.top = top
+            self.render()
+        return "break"
+
+    def yview(self, *args):
+        """Handle a scrollbar command (like Treeview.yview)."""
+        if args[0] == "moveto":
+            self.scroll_to(int(round(float(args[1]) * len(self.rows))))
+        elif args[0] == "scroll":
+            count = int(args[1])
+            if args[2] == "pages":
+                count *= max(1, self.visible - 1)
+            self.scroll_to(self.top + count)
+
+    def render(self):
+        """Fill the Treeview items with the rows from top down."""
+        tree = self.tree
+        count = max(0, min(self.visible + self.margin,
+                           len(self.rows) - self.top))
+        while len(self._iids) < count:
+            self._iids.append(tree.insert("", tk.END))
+        while len(self._iids) > count:
+            tree.delete(self._iids.pop())
+        for i, iid in enumerate(self._iids):
+            text, values = self.rows[self.top + i]
+            tree.item(iid, text=text, values=values)
+        iid = None
+        if self.selected is not None:
+            i = self.selected - self.top
+            if 0 <= i < count:
+                iid = self._iids[i]
+        if iid != self._selected_iid:
+            self._selected_iid = iid
+            if iid is None:
+                tree.selection_remove(tree.selection())
+            else:
+                tree.selection_set(iid)
+                tree.focus(iid)
+        tree.yview_moveto(0)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self.rows)
+        if total <= self.visible:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(float(self.top) / total,
+                               float(self.top + self.visible) / total)
+
+    def _on_configure(self, event):
+        visible = max(1, event.height // self.rowheight)
+        if visible != self.visible:
+            self.visible = visible
+            self.scroll_to(self.top)  # (in case the end is now too high)
+            self.render()
+
+    def _on_select(self, event):
+        selection = self.tree.selection()
+        if not selection:
+            if self._selected_iid is not None:  # (not cleared by render)
+                self.selected = None
+                self._selected_iid = None
+        elif selection[0] != self._selected_iid:
+            self._selected_iid = selection[0]
+            self.selected = self.top + self.tree.index(selection[0])
+
+    def _on_mousewheel(self, event):
+        if abs(event.delta) >= 120:  # Windows
+            notches = event.delta // 120
+        else:  # macOS
+            notches = event.delta
+        return self.scroll_to(self.top - 3 * notches)
+
+    def _move_selection(self, count):
+        if not self.rows:
+            return "break"
+        index = self.top if self.selected is None else self.selected + count
+        self.select(index)
+        return "break"
+
+    def select(self, index):
+        """Select a row, scrolling it into view if necessary."""
+        index = max(0, min(index, len(self.rows) - 1))
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.visible:
+            self.top = index - self.visible + 1
+        self.selected = index
+        self.render()
+
+    def index(self, value):
+        """Get the index of the row whose first value is value.
+
+        The rows must be in ascending order of their first values (such
+        as capture ids). Returns None if there is no such row.
+        """
+        low = 0
+        high = len(self.rows)
+        while low < high:
+            middle = (low + high) // 2
+            values = self.rows[middle][1]
+            if values and values[0] < value:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.rows) and self.rows[low][1][:1] == (value,):
+            return low
+        return None
 
 
 class MainApplication(ttk.Frame):
     def __init__(self, parent, *args, **kwargs):
+        self.frame_specs = kwargs.pop('frame_specs', None)
+        if self.frame_specs is None:
+            self.frame_specs = FRAME_SPECS
         self.style = ttk.Style()
         if platform.system() == "Windows":
             if 'winnative' in self.style.theme_names():
@@ -124,7 +1062,6 @@ class MainApplication(ttk.Frame):
                 self.style.theme_use('aqua')
         ttk.Frame.__init__(self, parent, *args, **kwargs)
 
-        self.meta_lookup = {}  # Lookup a dict using its str representation
         self.row = 0
         self.columnspan = 3
         self.container = self
@@ -187,6 +1124,39 @@ class MainApplication(ttk.Frame):
         self.analyzeAllBtn.grid(row=self.row, column=2)
         self.row += 1
 
+        self.cancelBtn = ttk.Button(
+            container,
+            text="Cancel",
+            command=self.cancel,
+            state=tk.DISABLED,
+        )
+        self.cancelBtn.grid(row=self.row, column=2)
+        self.row += 1
+
+        self.findLabel = ttk.Label(
+            container,
+            text="Find in data (regex)",
+        )
+        self.findLabel.grid(row=self.row, column=0)
+        self.findVar = tk.StringVar(container)
+        self.findEntry = ttk.Entry(
+            container,
+            textvariable=self.findVar,
+        )
+        self.findEntry.grid(
+            row=self.row,
+            column=1,
+            sticky="we",
+        )
+        self.findEntry.bind("<Return>", lambda event: self.find_next())
+        self.findBtn = ttk.Button(
+            container,
+            text="Find Next",
+            command=self.find_next,
+        )
+        self.findBtn.grid(row=self.row, column=2)
+        self.row += 1
+
         self.logLabel = ttk.Label(
             container,
             text="Log   -->",
@@ -254,9 +1224,20 @@ class MainApplication(ttk.Frame):
         self.number = None
         self._reader = None
         self.header_row = None
+        self.record_type = None  # made from header_row
         self.source = None
-        self.read_total = 0
-        self.write_total = 0
+        self.payloads = binarycsv.PayloadTotals()  # READ/WRITE totals
+        self.captures = None  # a CaptureStore, made from the header row
+        self.streams = binarycsv.Reassembler()  # payloads per port+direction
+        self.frame_decoders = [binarycsv.FrameDecoder(spec)
+                               for spec in self.frame_specs]
+        self.find_state = None  # (pattern, capture count, matches, index)
+        self._last_capture = (None, None)  # (meta, id) (See capture_id)
+        self.worker = None  # an AnalysisWorker during "Analyze All"
+        self.messages = None  # the worker's queue
+        self.skipped = 0  # captures from the worker that couldn't be added
+        self.file_size = None
+        self.started = None  # (time, line_number) when the worker started
 
     def pack_list(self, list_name, container=None):
         if container is None:
@@ -271,18 +1252,19 @@ class MainApplication(ttk.Frame):
         scrollbar = ttk.Scrollbar(listContainer)
         # ttk.Treeview can be displayed similarly to tk.Listbox
         #   (See <https://stackoverflow.com/a/75609905>):
-        listbox = ttk.Treeview(
+        tree = ttk.Treeview(
             listContainer,
-            yscrollcommand=scrollbar.set,
             show="tree",
+            selectmode="browse",
         )
-        scrollbar.configure(command=listbox.yview)
         scrollbar.pack(side="right", fill="y")
-        listbox.pack(side="left", fill="both", expand=True)
+        tree.pack(side="left", fill="both", expand=True)
         # if list_name == "log":
-        listbox.bind("<<TreeviewSelect>>", self.item_selected)
+        tree.bind("<<TreeviewSelect>>", self.item_selected)
 
-        self.listboxes[list_name] = listbox
+        # Only the visible rows have Treeview items, so a list of
+        #   hundreds of thousands of captures stays responsive:
+        self.listboxes[list_name] = VirtualList(tree, scrollbar)
 
         listContainer.grid(
             row=self.row,
@@ -299,8 +1281,8 @@ class MainApplication(ttk.Frame):
             item_dict = tree.item(item)
             if len(item_dict['values']) > 0:
                 key = item_dict['values'][0]
-                if key:
-                    meta = self.meta_lookup[key]
+                if key != "":
+                    meta = self.captures[int(key)]
                     print("got {} meta={}".format(type(meta).__name__, meta))
                     chars = meta['Data (chars)']
                     data = meta['Data']
@@ -308,11 +1290,11 @@ class MainApplication(ttk.Frame):
                     # ^ Use {} not %s to avoid ASCII out of range
                     #   error in Python 2
                 else:
-                    print("`values` arg was not str (str key was expected)"
-                          " in the self.listbox.insert call.")
+                    print("`values` arg was not a capture id (int) in the"
+                          " VirtualList append call.")
             else:
                 print("`values` arg was not set"
-                      " in the self.listbox.insert call.")
+                      " in the VirtualList append call.")
 
     def validate_settings(self):
         if not self.sourceVar.get().strip():
@@ -320,53 +1302,136 @@ class MainApplication(ttk.Frame):
                 if os.path.isfile(try_path):
                     self.sourceVar.set(try_path)
 
+    def capture_id(self, meta):
+        """Get the id of a capture in self.captures, adding it if new.
+
+        The lists refer to captures by id instead of keeping the meta
+        objects (the same meta is usually added to two lists in a row,
+        so only the last one is remembered to avoid storing it twice).
+        """
+        last_meta, last_id = self._last_capture
+        if meta is last_meta:
+            return last_id
+        if (self.captures is None
+                or self.captures.fieldnames != meta.fieldnames):
+            self.captures = binarycsv.CaptureStore(
+                meta.fieldnames,
+                raw_fields=SPM_RAW_FIELDS,
+                categories=SPM_CATEGORY_FIELDS,
+            )
+        capture_id = self.captures.append(meta)
+        self._last_capture = (meta, capture_id)
+        return capture_id
+
+    def reset_captures(self):
+        """Clear the lists and totals (before analyzing a new file)."""
+        for listbox in self.listboxes.values():
+            listbox.clear()
+        self.captures = None
+        self._last_capture = (None, None)
+        self.payloads = binarycsv.PayloadTotals()
+        self.streams.close()
+        self.streams = binarycsv.Reassembler()
+        self.frame_decoders = [binarycsv.FrameDecoder(spec)
+                               for spec in self.frame_specs]
+        self.find_state = None
+        self.listLabels['read'].configure(text="READ")
+        self.listLabels['write'].configure(text="WRITE")
+
     def add_message(self, text, meta=None):
-        # Assumes listbox is ttk.Treeview
+        # Assumes listbox is a VirtualList
         listbox = self.listboxes["log"]
-        key = None
+        values = ()
         if meta:
-            key = str(meta)
-            self.meta_lookup[key] = meta
-        listbox.insert("", tk.END, text=text, values=(key,))
+            values = (self.capture_id(meta),)
+        listbox.append(text, values=values)
 
     def add_read(self, text, meta=None):
-        # Assumes listbox is ttk.Treeview
-        bytes_count = len(text)
-        hex_str = None
-        hex_pairs = None
-        key = None
+        # Assumes listbox is a VirtualList
+        values = ()
         if meta:
-            hex_str = meta['Data']
-            hex_pairs = hex_str.split()
-            bytes_count = len(hex_pairs)
-            key = str(meta)
-            self.meta_lookup[key] = meta
+            # Decode the hex to count (and validate) the bytes:
+            payload = self.payloads.add_read(
+                meta['Data'],
+                data_length=meta['Data length'],
+            )
+            self.streams.add_record(meta, payload=payload)
+            self.decode_frames(meta, "read", payload)
+            values = (self.capture_id(meta),)
+        else:
+            self.payloads.read_total += len(text)
 
-        self.read_total += bytes_count
         label = self.listLabels['read']
-        label.configure(text="READ ({} byte(s))".format(self.read_total))
+        label.configure(text="READ ({} byte(s))"
+                        "".format(self.payloads.read_total))
 
         listbox = self.listboxes["read"]
-        listbox.insert("", tk.END, text=text, values=(key,))
+        listbox.append(text, values=values)
 
     def add_write(self, text, meta=None):
-        # Assumes listbox is ttk.Treeview
-        bytes_count = len(text)
-        hex_str = None
-        hex_pairs = None
+        # Assumes listbox is a VirtualList
+        values = ()
         if meta:
-            hex_str = meta['Data']
-            hex_pairs = hex_str.split()
-            bytes_count = len(hex_pairs)
-            key = str(meta)
-            self.meta_lookup[key] = meta
+            # Decode the hex to count (and validate) the bytes:
+            payload = self.payloads.add_write(
+                meta['Data'],
+                data_length=meta['Data length'],
+            )
+            self.streams.add_record(meta, payload=payload)
+            self.decode_frames(meta, "write", payload)
+            values = (self.capture_id(meta),)
+        else:
+            self.payloads.write_total += len(text)
 
-        self.write_total += bytes_count
         label = self.listLabels['write']
-        label.configure(text="WRITE ({} byte(s))".format(self.write_total))
+        label.configure(text="WRITE ({} byte(s))"
+                        "".format(self.payloads.write_total))
 
         listbox = self.listboxes["write"]
-        listbox.insert("", tk.END, text=text, values=(key,))
+        listbox.append(text, values=values)
+
+    def decode_frames(self, meta, direction, payload):
+        """Feed a payload to the frame decoders (See FRAME_SPECS) and
+        log each frame that it completes.
+        """
+        for decoder in self.frame_decoders:
+            for frame in decoder.feed(meta['Port'], direction, payload,
+                                      int(meta['#'])):
+                self.add_message(format_frame(frame), meta=meta)
+
+    def find_next(self):
+        """Find the next match of the pattern in the reassembled READ
+        and WRITE streams, and select the capture where it starts.
+        """
+        pattern = self.findVar.get()
+        if not pattern:
+            return
+        count = len(self.captures) if self.captures is not None else 0
+        state = self.find_state
+        if state is None or state[0] != pattern or state[1] != count:
+            try:
+                matches = self.streams.search(pattern)
+            except re.error as ex:
+                self.set_status("Invalid pattern: {}".format(ex))
+                return
+            state = [pattern, count, matches, -1]
+            self.find_state = state
+        matches = state[2]
+        if not matches:
+            self.set_status("{} was not found.".format(repr(pattern)))
+            return
+        state[3] = (state[3] + 1) % len(matches)
+        port, direction, start, end, numbers = matches[state[3]]
+        message = (
+            "Match {} of {}: {} {} bytes {}-{} (capture(s) {})".format(
+                state[3] + 1, len(matches), port, direction.upper(), start,
+                end, ", ".join(str(number) for number in numbers)))
+        listbox = self.listboxes["log"]
+        index = listbox.index(self.captures.find(numbers[0]))
+        if index is not None:
+            listbox.select(index)
+        # Show the message after item_selected shows the capture:
+        self.after_idle(lambda: self.set_status(message))
 
     def set_status(self, message):
         self.statusVar.set(message)
@@ -399,6 +1464,7 @@ class MainApplication(ttk.Frame):
         -<https://help.electronic.us/support/solutions/articles
         /44002214665-introduction-to-serial-port-monitor>
         """
+        meta = None
         while True:
             try:
                 row = self._reader.__next__()  # emulate "for row in _reader"
@@ -407,13 +1473,18 @@ class MainApplication(ttk.Frame):
                 self.enable_next_buttons(False)
                 self.close_file()
                 break
-            meta = OrderedDict()
 
             self.number += 1
             if self.header_row is None:
                 self.header_row = []
                 for name in row:
                     self.header_row.append(name.decode('utf-8'))
+                self.record_type = binarycsv.make_record_type(
+                    self.header_row,
+                    raw_fields=SPM_RAW_FIELDS,
+                )
+                self._reader.set_filters(SPM_USEFUL_FILTERS,
+                                         header=self.header_row)
                 self.set_status("header row[{}]={}"
                                 "".format(self.number, pformat(row)))
                 continue
@@ -428,14 +1499,9 @@ class MainApplication(ttk.Frame):
                             len(self.header_row), self.header_row)
                 )
 
-            for i in range(len(self.header_row)):
-                key = self.header_row[i]
-                text = row[i]
-                if key != "Data (chars)":
-                    if isinstance(text, bytes):
-                        text = text.decode('utf-8')
-                # else leave Data (chars) as bytes
-                meta[key] = text  # store current field in this row
+            meta = self.record_type(row)
+            # ^ Fields are decoded on access, except Data (chars) which
+            #   stays bytes (See SPM_RAW_FIELDS).
             if meta['Function'] == "IRP_MJ_READ":
                 if meta['Direction'] == "UP":
                     self.add_read(meta['Data'], meta=meta)
@@ -454,17 +1520,25 @@ class MainApplication(ttk.Frame):
         return meta
 
     def analyze(self):
+        if self.worker is not None:
+            return  # "Analyze All" is already reading the file.
         self.source = self.sourceVar.get()
         # try:
         if self.stream is None:
             self.stream = open(self.source, mode='rb')
+            self.reset_captures()
             self.number = 0
             self._reader = binarycsv.reader(self.stream)
+            self.header_row = None  # Read it again (new file)
             self.enable_next_buttons(True)
         # except
 
         meta = self.next_useful_meta()
         self.set_status("row[{}]={}".format(self.number, pformat(meta)))
+        self.log_capture(meta)
+
+    def log_capture(self, meta):
+        """Add a useful capture to the log list."""
         data = meta['Data']  # Hex chars (therefore in ASCII range)
         data_chars = meta['Data (chars)']
         # self.add_message("  data={}".format(data))
@@ -501,12 +1575,129 @@ class MainApplication(ttk.Frame):
 
 
     def analyzeAll(self):
-        self.analyze()  # call once manually to initialize self.stream
+        """Analyze the rest of the file in a background thread.
+
+        Captures are added to the lists in batches by drain_messages,
+        so the window stays responsive (and Cancel can stop it).
+        """
+        if self.worker is not None:
+            return
+        self.source = self.sourceVar.get()
+        header_row = None
+        start = None
+        line_number = 0
+        if self.stream is not None and self.header_row is not None:
+            # Continue after the captures shown by "Analyze 1".
+            header_row = self.header_row
+            line_number = self._reader.line_number
+            start = (self._reader.cur, self._reader.prev_newline,
+                     line_number)
+        else:
+            self.reset_captures()
+        self.close_file()
+        self.file_size = os.path.getsize(self.source)
+        self.messages = queue.Queue(maxsize=WORKER_QUEUE_SIZE)
+        self.skipped = 0
+        self.worker = AnalysisWorker(self.source, self.messages,
+                                     header_row=header_row, start=start)
+        self.started = (time.time(), line_number)
         self.enable_next_buttons(False)
-        while self.stream is not None:
-            # ^ Must be set to None via close_file on StopIteration
-            #   or this loop will be infinite (see next_useful_meta)!
-            self.analyze()
+        self.cancelBtn.configure(state=tk.NORMAL)
+        self.set_status("Analyzing {}...".format(self.source))
+        self.worker.start()
+        self.after(UI_POLL_MS, self.drain_messages)
+
+    def add_capture(self, meta):
+        """Add a useful capture from the worker to the lists."""
+        list_name = capture_list(meta)
+        if list_name == "read":
+            self.add_read(meta['Data'], meta=meta)
+        elif list_name == "write":
+            self.add_write(meta['Data'], meta=meta)
+        self.log_capture(meta)
+
+    def drain_messages(self):
+        """Add the captures that the worker found since the last call
+        (up to UI_BATCH_LIMIT of them), then check again later.
+
+        If a capture can't be added (such as if its Data isn't valid
+        hex), it is skipped and listed in the log, and the rest are
+        still added.
+        """
+        worker = self.worker
+        added = 0
+        progress = None
+        while added < UI_BATCH_LIMIT:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "done":
+                self.worker_done(message[1])
+                return
+            if message[0] == "status":
+                self.set_status(message[1])
+                continue
+            _, records, cur, line_number = message
+            if worker.cancelled.is_set():
+                continue  # Wait for "done" without adding more.
+            for meta in records:
+                try:
+                    self.add_capture(meta)
+                except ValueError as ex:
+                    self.skip_capture(meta, ex)
+            added += len(records)
+            progress = (cur, line_number)
+        if progress is not None:
+            self.show_progress(*progress)
+        self.after(UI_POLL_MS, self.drain_messages)
+
+    def skip_capture(self, meta, error):
+        """List a capture that couldn't be added in the log."""
+        self.skipped += 1
+        self.add_message("Skipped capture {}: {}".format(meta['#'], error),
+                         meta=meta)
+
+    def show_progress(self, cur, line_number):
+        started_time, started_line = self.started
+        seconds = time.time() - started_time
+        rate = ""
+        if seconds > 0:
+            rate = ", {:.0f} rows/s".format(
+                (line_number - started_line) / seconds)
+        percent = 100.0
+        if self.file_size:
+            percent = 100.0 * cur / self.file_size
+        skipped = ""
+        if self.skipped:
+            skipped = ", {} capture(s) skipped".format(self.skipped)
+        self.set_status("Read {:.1f} of {:.1f} MB ({:.0f}%){}{}".format(
+            cur / 1048576.0, self.file_size / 1048576.0, percent, rate,
+            skipped))
+
+    def worker_done(self, error):
+        cancelled = self.worker.cancelled.is_set()
+        self.worker = None
+        self.messages = None
+        self.cancelBtn.configure(state=tk.DISABLED)
+        if error is not None:
+            self.set_status("Error: {}".format(error))
+            self.enable_next_buttons(True)
+        elif cancelled:
+            self.set_status("Cancelled.")
+            self.enable_next_buttons(True)
+        else:
+            self.set_status("Done reading data.")
+            self.enable_next_buttons(False)
+        if self.skipped:
+            self.set_status("{} ({} capture(s) skipped, see the log)"
+                            "".format(self.statusVar.get(), self.skipped))
+
+    def cancel(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.cancelBtn.configure(state=tk.DISABLED)
+            self.set_status("Cancelling...")
 
     def close_file(self):
         if self.stream is not None:
@@ -515,26 +1706,161 @@ class MainApplication(ttk.Frame):
 
 
 
+def batch_main(sources, workers=None, output=None):
+    """Run the --batch mode (See usage).
+
+    Returns:
+        int: The exit code (1 if no files were found or any failed).
+    """
+    paths = expand_paths(sources)
+    if not paths:
+        usage()
+        echo0("Error: No CSV files were found in {}".format(sources))
+        return 1
+    results = []
+    for result in batch_analyze(paths, workers=workers):
+        echo0("{:.3f}s {}{}".format(
+            result['seconds'], result['path'],
+            " ({})".format(result['error']) if result['error'] else ""))
+        results.append(result)
+    rows = summary_rows(results)
+    for line in format_table(rows):
+        print(line)
+    if output:
+        with open(output, 'wb') as stream:
+            with binarycsv.writer(stream) as _writer:
+                _writer.writerow([name.encode('utf-8')
+                                  for name in BATCH_FIELDS])
+                _writer.writerows([[value.encode('utf-8') for value in row]
+                                   for row in rows])
+    return 1 if any(result['error'] for result in results) else 0
+
+
 def usage():
     print(__doc__, file=sys.stderr)
 
 
 def main():
-    if os.path.isfile(try_path):
-        path = try_path
-    if path is None:
-        if len(sys.argv) < 2:
+    paths = []
+    follow = False
+    batch = False
+    workers = None
+    output = None
+    frame_specs = []
+    patterns = []
+    summary = False
+    stats_options = {}
+    args = sys.argv[1:]
+    while args:
+        arg = args.pop(0)
+        if arg == "--follow":
+            follow = True
+        elif arg == "--batch":
+            batch = True
+        elif arg in ("--summary", "--quiet"):
+            summary = True
+        elif arg in ("--workers", "--output", "--frames", "--bucket",
+                     "--top"):
+            if not args:
+                usage()
+                echo0("Error: {} requires a value.".format(arg))
+                return 1
+            value = args.pop(0)
+            if arg == "--output":
+                output = value
+            elif arg == "--frames":
+                try:
+                    frame_specs.extend(load_frame_specs(value))
+                except (ImportError, AttributeError, ValueError) as ex:
+                    echo0("Error: {}".format(ex))
+                    return 1
+            else:
+                try:
+                    number = int(value)
+                except ValueError:
+                    echo0("Error: {} must be a number.".format(arg))
+                    return 1
+                if number < 1:
+                    echo0("Error: {} must be at least 1.".format(arg))
+                    return 1
+                if arg == "--workers":
+                    workers = number
+                elif arg == "--bucket":
+                    stats_options['bucket_seconds'] = number
+                else:
+                    stats_options['top'] = number
+        elif arg in ("--find", "--find-hex"):
+            if not args:
+                usage()
+                echo0("Error: {} requires a value.".format(arg))
+                return 1
+            value = args.pop(0)
+            if not value:
+                echo0("Error: {} can't be empty.".format(arg))
+                return 1
+            if arg == "--find":
+                patterns.append(value.encode('utf-8'))
+            else:
+                try:
+                    patterns.append(binarycsv.decode_hex(value))
+                except ValueError as ex:
+                    echo0("Error: {}".format(ex))
+                    return 1
+        elif arg.startswith("--"):
             usage()
-            echo0("Error: No path was specified. Specify a CSV file.")
+            echo0("Error: Unknown option: {}".format(arg))
             return 1
-        path = sys.argv[1]
-    analyze_spm_log(path)
-
+        else:
+            paths.append(arg)
+    if batch:
+        return batch_main(paths, workers=workers, output=output)
+    if len(paths) > 1:
+        usage()
+        echo0("Error: Unexpected argument: {} (use --batch for several"
+              " files)".format(paths[1]))
+        return 1
+    path = paths[0] if paths else None
+    if path is None:
+        for try_path in PROPRIETARY_TEST_PATHS:
+            if os.path.isfile(try_path):
+                path = try_path
+    if path is None:
+        usage()
+        echo0("Error: No path was specified. Specify a CSV file.")
+        return 1
+    if workers and follow:
+        echo0("Error: --workers can't be used with --follow.")
+        return 1
+    stats = None
+    try:
+        if summary:
+            stats = binarycsv.TrafficStats(**stats_options)
+            traffic_spm_log(path, stats, follow=follow)
+        elif frame_specs:
+            for frame in decode_spm_log(path, frame_specs, follow=follow):
+                print(format_frame(frame))
+        elif patterns:
+            for hit in search_spm_log(path, patterns, follow=follow):
+                print("#{} {} {} +{} {}: {}{}".format(
+                    hit.capture, hit.port, hit.direction.upper(),
+                    hit.offset, hit.time, repr(hit.pattern),
+                    " (spans {})".format(hit.captures)
+                    if len(hit.captures) > 1 else "",
+                ))
+        else:
+            analyze_spm_log(path, workers=workers, follow=follow)
+    except KeyboardInterrupt:
+        if not follow:
+            raise
+        echo0("Stopped following {}".format(path))
+    if stats is not None:
+        for line in stats.report():
+            print(line)
     return 0
 
 
 if __name__ == "__main__":
-    if not enable_gui:
+    if not enable_gui or len(sys.argv) > 1:
         sys.exit(main())
 
     root = tk.Tk()
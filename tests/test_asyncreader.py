@@ -0,0 +1,71 @@
+import asyncio
+import io
+import os
+import sys
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    AsyncReader,
+    reader,
+)
+
+DATA = (
+    b'#;Function;Data (chars)\r\n'
+    b'1;IRP_MJ_READ;"a\r\n""b"\r\n'
+    b'2;IRP_MJ_WRITE;c\r\n'
+)
+
+
+class TestAsyncReader(unittest.TestCase):
+    def test_pieces(self):
+        _reader = reader(io.BytesIO(DATA))
+        expected = []
+        ends = []  # where each row (through its first newline byte) ends
+        for row in _reader:
+            expected.append(row)
+            ends.append(_reader.cur)
+
+        async def read_pieces():
+            stream = asyncio.StreamReader()
+            _reader = AsyncReader(stream, block_size=4)
+            rows = []
+            for i in range(0, len(DATA), 3):
+                stream.feed_data(DATA[i:i+3])
+                # Rows are available as soon as they are complete:
+                while len(rows) < len([end for end in ends if end <= i+3]):
+                    rows.append(await _reader.__anext__())
+            stream.feed_eof()
+            async for row in _reader:
+                rows.append(row)
+            return rows, _reader.line_number
+
+        rows, line_number = asyncio.run(read_pieces())
+        self.assertEqual(rows, expected)
+        self.assertEqual(line_number, 3)
+
+    def test_columns(self):
+        async def read_all():
+            stream = asyncio.StreamReader()
+            stream.feed_data(DATA + b'3;;d')  # no newline at EOF
+            stream.feed_eof()
+            return [row async for row in AsyncReader(stream,
+                                                     columns=['#'])]
+
+        self.assertEqual(asyncio.run(read_all()),
+                         [[b'#'], [b'1'], [b'2'], [b'3']])
+
+    def test_sync_iteration(self):
+        async def iterate():
+            iter(AsyncReader(asyncio.StreamReader()))
+
+        with self.assertRaises(TypeError):
+            asyncio.run(iterate())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import io
+import os
+import sys
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    reader,
+)
+from binarycsv.batches import (
+    MISSING_INT,
+    np,
+)
+
+SPM_SAMPLE = (
+    b'#;Time;Function;Direction;Data;Data (chars);Data length\r\n'
+    b'17;22/09/2023 10:50:54;IRP_MJ_READ;DOWN;;;\r\n'
+    b'18;22/09/2023 10:50:54;IRP_MJ_READ;UP;55 9d;"U\x9d";2\r\n'
+    b'19;22/09/2023 10:50:55;IRP_MJ_WRITE;DOWN;0d;"\r";1\r\n'
+)
+
+SPM_KINDS = {
+    '#': "int",
+    'Time': "time",
+    'Function': "category",
+    'Direction': "category",
+    'Data (chars)': "bytes",
+    'Data length': "int",
+}
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestReadBatches(unittest.TestCase):
+    def test_kinds(self):
+        _reader = reader(io.BytesIO(SPM_SAMPLE))
+        batches = list(_reader.read_batches(batch_rows=2, columns=SPM_KINDS))
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+        self.assertEqual([batch.line_number for batch in batches], [2, 4])
+        first, second = batches
+        self.assertEqual(first['#'].tolist(), [17, 18])
+        self.assertEqual(first['Data length'].tolist(), [MISSING_INT, 2])
+        self.assertEqual(str(second['Time'][0]), '2023-09-22T10:50:55')
+        self.assertEqual(first.decode('Function'),
+                         [b'IRP_MJ_READ', b'IRP_MJ_READ'])
+        # Codes stay the same across batches:
+        self.assertEqual(second.decode('Direction'), [b'DOWN'])
+        self.assertEqual(second['Direction'][0], first['Direction'][0])
+        payload = first['Data (chars)']
+        self.assertEqual(payload.data, b'U\x9d')
+        self.assertEqual(payload.offsets.tolist(), [0, 0, 2])
+        self.assertEqual(payload[1], b'U\x9d')
+        self.assertEqual(second['Data (chars)'][0], b'\r')
+
+    def test_column_list(self):
+        _reader = reader(io.BytesIO(SPM_SAMPLE))
+        batches = list(_reader.read_batches(columns=['Data']))
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(list(batches[0].keys()), ['Data'])
+        self.assertEqual([batches[0]['Data'][i] for i in range(3)],
+                         [b'', b'55 9d', b'0d'])
+
+    def test_projected_reader(self):
+        _reader = reader(io.BytesIO(SPM_SAMPLE))
+        _reader.header = [name.decode('utf-8') for name in next(_reader)]
+        _reader.set_columns(['Data length', '#'], header=_reader.header)
+        batch = next(_reader.read_batches())
+        self.assertEqual(list(batch.keys()), ['Data length', '#'])
+        self.assertEqual(batch['#'][2], b'19')
+        # The header can also be read from the projected reader:
+        _reader = reader(io.BytesIO(SPM_SAMPLE), columns=['#', 'Data'])
+        batch = next(_reader.read_batches(columns={'#': "int"}))
+        self.assertEqual(batch['#'].tolist(), [17, 18, 19])
+        _reader = reader(io.BytesIO(SPM_SAMPLE), columns=[9])
+        _reader.header = ['#', 'Time']
+        with self.assertRaises(ValueError):
+            next(_reader.read_batches())
+
+    def test_filtered_line_numbers(self):
+        _reader = reader(io.BytesIO(SPM_SAMPLE))
+        next(_reader)
+        _reader.header = ['#', 'Time', 'Function', 'Direction', 'Data',
+                          'Data (chars)', 'Data length']
+        _reader.set_filters({4: [b'55 9d', b'0d']})
+        batches = list(_reader.read_batches(batch_rows=1, columns=['#']))
+        self.assertEqual([batch.line_number for batch in batches], [3, 4])
+
+    def test_column_count(self):
+        _reader = reader(io.BytesIO(SPM_SAMPLE + b'20;x\r\n'))
+        with self.assertRaises(ValueError):
+            list(_reader.read_batches(columns=['#']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import io
+import os
+import sys
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    reader,
+)
+from benchmarks.generate import (
+    generate_spm_log,
+)
+from benchmarks.run import (
+    compare,
+    run_benchmarks,
+)
+
+
+def generate(**kwargs):
+    stream = io.BytesIO()
+    counts = generate_spm_log(stream, **kwargs)
+    return stream.getvalue(), counts
+
+
+class TestGenerate(unittest.TestCase):
+    def test_deterministic(self):
+        self.assertEqual(generate(rows=500), generate(rows=500))
+        self.assertNotEqual(generate(rows=500)[0],
+                            generate(rows=500, seed=1)[0])
+
+    def test_parse(self):
+        for newline in (b'\r\n', b'\n'):
+            data, counts = generate(rows=2000, newline=newline,
+                                    quote_share=0.5, non_utf8_share=0.5)
+            self.assertEqual(counts['size'], len(data))
+            self.assertIn(b'\x9d', data)
+            rows = list(reader(io.BytesIO(data)))
+            self.assertEqual(len(rows), counts['rows'] + 1)
+            header = [name.decode('utf-8') for name in rows[0]]
+            self.assertEqual(header[-1], '')
+            data_i = header.index('Data')
+            chars_i = header.index('Data (chars)')
+            totals = {b'IRP_MJ_READ': 0, b'IRP_MJ_WRITE': 0}
+            useful = 0
+            for row in rows[1:]:
+                self.assertEqual(len(row), len(header))
+                if row[data_i]:
+                    # The payload survives quoting and escaping:
+                    self.assertEqual(bytes.fromhex(row[data_i].decode()),
+                                     row[chars_i])
+                    totals[row[2]] += len(row[chars_i])
+                    useful += 1
+            self.assertEqual(useful, counts['useful'])
+            self.assertEqual(totals[b'IRP_MJ_READ'], counts['read_bytes'])
+            self.assertEqual(totals[b'IRP_MJ_WRITE'], counts['write_bytes'])
+
+
+class TestRun(unittest.TestCase):
+    def test_run_benchmarks(self):
+        results = run_benchmarks(rows=300, repeat=1)
+        benchmarks = results['benchmarks']
+        self.assertEqual(benchmarks['reader']['rows'], 301)
+        self.assertGreater(benchmarks['reader_memory']['peak_bytes'], 0)
+        if 'error' not in benchmarks['next_useful_meta']:
+            self.assertEqual(benchmarks['next_useful_meta']['captures'],
+                             results['input']['useful'])
+        lines = compare(results, results)
+        self.assertIn("(1.00x)", lines[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from collections import OrderedDict
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    CacheWriter,
+    PayloadTotals,
+    build_cache,
+    cache_path,
+    get_cache,
+    load_cache,
+    reader,
+)
+from binarycsv.batches import (
+    np,
+)
+
+SPM_SAMPLE = (
+    b'#;Time;Function;Direction;Data;Data (chars);Data length\r\n'
+    b'17;22/09/2023 10:50:54;IRP_MJ_READ;DOWN;;;\r\n'
+    b'18;22/09/2023 10:50:54;IRP_MJ_READ;UP;55 9d;"U\x9d";2\r\n'
+    b'19;;IRP_MJ_WRITE;DOWN;0d;"\r";1\r\n'
+)
+
+SPM_KINDS = OrderedDict([
+    ('#', "int"),
+    ('Time', "time"),
+    ('Function', "category"),
+    ('Direction', "category"),
+    ('Data', "bytes"),
+    ('Data (chars)', "bytes"),
+    ('Data length', "int"),
+])
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "spm.csv")
+        with open(self.path, 'wb') as stream:
+            stream.write(SPM_SAMPLE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_round_trip(self):
+        self.assertIsNone(load_cache(self.path))
+        # Small batches check that the offsets of blobs are joined.
+        self.assertEqual(build_cache(self.path, columns=SPM_KINDS,
+                                     batch_rows=2),
+                         cache_path(self.path))
+        cache = load_cache(self.path, columns=SPM_KINDS)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.batch['#'].tolist(), [17, 18, 19])
+        self.assertTrue(np.isnat(cache.batch['Time'][2]))
+        self.assertEqual(cache.batch.decode('Function'),
+                         [b'IRP_MJ_READ', b'IRP_MJ_READ', b'IRP_MJ_WRITE'])
+        self.assertEqual(cache.batch['Data (chars)'][1], b'U\x9d')
+        with open(self.path, 'rb') as stream:
+            _reader = reader(stream)
+            next(_reader)
+            self.assertEqual([cache.row(i) for i in range(3)],
+                             list(_reader))
+        cache.close()
+
+    def test_writer(self):
+        with open(self.path, 'rb') as stream:
+            _reader = reader(stream)
+            header = [name.decode('utf-8') for name in next(_reader)]
+            _reader.header = header
+            writer = CacheWriter(self.path, header, columns=SPM_KINDS)
+            for batch in _reader.read_batches(batch_rows=1,
+                                              columns=SPM_KINDS):
+                writer.add(batch)
+        self.assertEqual(writer.finish(), cache_path(self.path))
+        cache = load_cache(self.path, columns=SPM_KINDS)
+        self.assertEqual(cache.batch['Data'][1], b'55 9d')
+        self.assertEqual(cache.row(2)[:3], [b'19', b'', b'IRP_MJ_WRITE'])
+        cache.close()
+        # A file that changes while it is cached isn't saved:
+        os.remove(cache_path(self.path))
+        writer = CacheWriter(self.path, header, columns=SPM_KINDS)
+        with open(self.path, 'ab') as stream:
+            stream.write(b'20;;IRP_MJ_READ;UP;4f;O;1\r\n')
+        self.assertIsNone(writer.finish())
+        self.assertFalse(os.path.exists(cache_path(self.path)))
+
+    def test_payloads(self):
+        cache = get_cache(self.path, columns=SPM_KINDS)
+        totals = PayloadTotals()
+        payloads = totals.add_batch(cache.batch)
+        self.assertEqual([payloads[i] for i in range(3)],
+                         [b'', b'U\x9d', b'\r'])
+        self.assertEqual((totals.read_total, totals.write_total), (2, 1))
+        cache.close()
+
+    def test_stale(self):
+        build_cache(self.path, columns=SPM_KINDS)
+        self.assertIsNone(load_cache(self.path, columns=['#']))
+        self.assertIsNone(load_cache(self.path, time_format="%Y"))
+        cache = load_cache(self.path)
+        self.assertEqual(list(cache.kinds.values()),
+                         list(SPM_KINDS.values()))
+        cache.close()
+        with open(self.path, 'ab') as stream:
+            stream.write(b'20;;IRP_MJ_READ;UP;4f;O;1\r\n')
+        self.assertIsNone(load_cache(self.path))
+        cache = get_cache(self.path, columns=SPM_KINDS)
+        self.assertEqual(len(cache), 4)
+        cache.close()
+
+    def test_same_size(self):
+        build_cache(self.path, columns=SPM_KINDS)
+        stat = os.stat(self.path)
+        with open(self.path, 'wb') as stream:
+            stream.write(SPM_SAMPLE.replace(b'17;', b'16;'))
+        os.utime(self.path, (stat.st_atime, stat.st_mtime))
+        self.assertIsNone(load_cache(self.path))
+
+    def test_bad_file(self):
+        with open(cache_path(self.path), 'wb') as stream:
+            stream.write(b'not a cache')
+        self.assertIsNone(load_cache(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
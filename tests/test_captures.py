@@ -0,0 +1,65 @@
+import io
+import os
+import sys
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    CaptureStore,
+    DictReader,
+)
+
+SPM_SAMPLE = (
+    b'#;Function;Direction;Data;Data (chars);Data length\r\n'
+    b'18;IRP_MJ_READ;UP;55 9d;"U\x9d";2\r\n'
+    b'19;IRP_MJ_WRITE;DOWN;0d;"\r";1\r\n'
+    b'21;IRP_MJ_READ;UP;;;\r\n'
+)
+
+
+class TestCaptureStore(unittest.TestCase):
+    def setUp(self):
+        self.records = list(DictReader(io.BytesIO(SPM_SAMPLE),
+                                       raw_fields=["Data (chars)"]))
+        self.store = CaptureStore(
+            self.records[0].fieldnames,
+            raw_fields=["Data (chars)"],
+            categories=["Function", "Direction"],
+        )
+
+    def test_append(self):
+        self.assertEqual(self.records[0]['Function'], "IRP_MJ_READ")
+        # ^ (decoded to str in place, then encoded again by append)
+        ids = [self.store.append(record) for record in self.records]
+        self.assertEqual(ids, [0, 1, 2])
+        self.assertEqual(len(self.store), 3)
+        meta = self.store[1]
+        self.assertEqual(meta['Function'], "IRP_MJ_WRITE")
+        self.assertEqual(meta['Data (chars)'], b'\r')
+        self.assertEqual(self.store[-3]['Data (chars)'], b'U\x9d')
+        self.assertEqual(self.store.row(2), [b'21', b'IRP_MJ_READ', b'UP',
+                                             b'', b'', b''])
+        self.assertEqual(self.store.field(0, 'Data'), b'55 9d')
+        with self.assertRaises(IndexError):
+            self.store[3]
+        with self.assertRaises(ValueError):
+            self.store.append([b'1'])
+
+    def test_find(self):
+        for record in self.records:
+            self.store.append(record)
+        self.assertEqual(self.store.find(19), 1)
+        self.assertEqual(self.store.find(21), 2)
+        with self.assertRaises(KeyError):
+            self.store.find(20)
+        self.store.append([b'5', b'', b'', b'', b'', b''])  # out of order
+        self.assertEqual(self.store.find(5), 3)
+        self.assertEqual(self.store.find(19), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
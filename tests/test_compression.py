@@ -0,0 +1,94 @@
+import bz2
+import gzip
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    detect_compression,
+    mmap_reader,
+    reader,
+)
+
+try:
+    import lzma
+except ImportError:  # Python 2
+    lzma = None
+
+SPM_SAMPLE = (
+    b'#;Time;Function;Direction;Status;Data;Data (chars);Data length;'
+    b'Req. length;Port;Comments;\r\n'
+    b'17;22/09/2023 10:50:54;IRP_MJ_READ;DOWN;;;;;1;COM3;;\r\n'
+    b'18;22/09/2023 10:50:54;IRP_MJ_READ;UP;STATUS_SUCCESS;55 9d 22;'
+    b'"U\x9d""";3;1;COM3;;\r\n'
+    b'19;22/09/2023 10:50:55;IRP_MJ_WRITE;DOWN;STATUS_SUCCESS;0d 0a 3b;'
+    b'"\r\n;";3;3;COM3;;\r\n'
+)
+
+COMPRESSORS = [("gzip", gzip.compress), ("bz2", bz2.compress)]
+if lzma is not None:
+    COMPRESSORS.append(("xz", lzma.compress))
+
+
+def read_all(stream, **kwargs):
+    return list(reader(stream, **kwargs))
+
+
+class TestCompression(unittest.TestCase):
+    def test_detect(self):
+        for name, compress in COMPRESSORS:
+            self.assertEqual(detect_compression(compress(SPM_SAMPLE)), name)
+        self.assertIsNone(detect_compression(SPM_SAMPLE))
+        self.assertIsNone(detect_compression(b'BZh9;not bzip2\r\n'))
+        self.assertIsNone(detect_compression(b''))
+
+    def test_reader(self):
+        expected = read_all(io.BytesIO(SPM_SAMPLE))
+        for name, compress in COMPRESSORS:
+            data = compress(SPM_SAMPLE * 50)
+            _reader = reader(io.BytesIO(data), block_size=7)
+            self.assertEqual(_reader.compression, name)
+            self.assertEqual(list(_reader), expected * 50)
+            self.assertEqual(_reader.cur, len(SPM_SAMPLE) * 50)
+        _reader = reader(io.BytesIO(gzip.compress(SPM_SAMPLE)),
+                         decompress=False)
+        self.assertIsNone(_reader.compression)
+        self.assertNotEqual(list(_reader), expected)
+
+    def test_file(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, "spm.csv.gz")
+            with open(path, 'wb') as stream:
+                stream.write(gzip.compress(SPM_SAMPLE))
+            with open(path, 'rb') as stream:
+                _reader = reader(stream)
+                next(_reader)
+                start = (_reader.cur, _reader.prev_newline,
+                         _reader.line_number)
+                rest = list(_reader)
+            with open(path, 'rb') as stream:
+                _reader = reader(stream)
+                _reader.seek_offset(*start)
+                self.assertEqual(list(_reader), rest)
+            if sys.version_info.major >= 3:
+                from binarycsv import parallel_read
+                self.assertEqual(
+                    [row for _, row in parallel_read(path, chunk_size=64)],
+                    read_all(io.BytesIO(SPM_SAMPLE)))
+            with self.assertRaises(ValueError):
+                mmap_reader(path)
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    unittest.main()
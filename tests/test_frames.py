@@ -0,0 +1,99 @@
+import os
+import struct
+import sys
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    FrameDecoder,
+    FrameSpec,
+    crc16_ccitt,
+    crc32,
+    sum8,
+    xor8,
+)
+
+SPEC = FrameSpec(b'\xaa\x55', "<BH", ["type", "length"],
+                 checksum=sum8, checksum_format="<B", name="test")
+
+
+def make_frame(kind, payload):
+    body = struct.pack("<BH", kind, len(payload)) + payload
+    return b'\xaa\x55' + body + struct.pack("<B", sum8(body))
+
+
+class TestChecksums(unittest.TestCase):
+    def test_values(self):
+        self.assertEqual(sum8(b'\xff\x02'), 1)
+        self.assertEqual(xor8(b'\x0f\xf0\x01'), 0xfe)
+        self.assertEqual(crc16_ccitt(b'123456789'), 0x29b1)
+        self.assertEqual(crc32(b'123456789'), 0xcbf43926)
+
+
+class TestFrameDecoder(unittest.TestCase):
+    def test_split(self):
+        data = (b'junk\xaa' + make_frame(1, b'hello') + make_frame(2, b'')
+                + make_frame(3, b'x' * 300))
+        decoder = FrameDecoder(SPEC)
+        frames = []
+        for i in range(0, len(data), 7):
+            frames.extend(decoder.feed("COM1", "read", data[i:i+7], i // 7))
+        self.assertEqual([frame.payload for frame in frames],
+                         [b'hello', b'', b'x' * 300])
+        self.assertEqual(frames[0].fields, {'type': 1, 'length': 5})
+        self.assertEqual(frames[0].name, "test")
+        self.assertEqual(frames[0].offset, 5)
+        self.assertEqual(frames[0].captures, [0, 1, 2])
+        self.assertEqual(frames[1].captures, [2, 3])
+        self.assertEqual(frames[2].captures[-1], (len(data) - 1) // 7)
+        self.assertEqual(decoder.skipped, 5)
+
+    def test_bad_frames(self):
+        bad = bytearray(make_frame(1, b'abc'))
+        bad[-1] ^= 0xff
+        long_length = b'\xaa\x55\x01\xff\xff'
+        decoder = FrameDecoder(FrameSpec(
+            b'\xaa\x55', "<BH", ["type", "length"], checksum=sum8,
+            checksum_format="<B", max_length=1000))
+        frames = decoder.feed("COM1", "read", bytes(bad) + long_length
+                              + make_frame(2, b'ok'), 1)
+        self.assertEqual([frame.payload for frame in frames], [b'ok'])
+        self.assertEqual(decoder.bad_checksums, 1)
+
+    def test_streams(self):
+        decoder = FrameDecoder(SPEC)
+        frame = make_frame(1, b'abc')
+        self.assertEqual(decoder.feed("COM1", "read", frame[:4], 1), [])
+        self.assertEqual(decoder.feed("COM1", "write", frame[:6], 2), [])
+        self.assertEqual(decoder.feed("COM2", "read", frame[4:], 3), [])
+        frames = decoder.feed("COM1", "read", frame[4:], 4)
+        self.assertEqual([(f.port, f.direction, f.captures)
+                          for f in frames], [("COM1", "read", [1, 4])])
+        frames = decoder.feed("COM1", "write", frame[6:], 5)
+        self.assertEqual(frames[0].captures, [2, 5])
+
+    def test_length_adjust(self):
+        # The length counts the 2-byte checksum (CRC of the whole frame).
+        spec = FrameSpec(b'\x7e', ">H", ["length"], length_adjust=-2,
+                         checksum=crc16_ccitt, checksum_format=">H",
+                         checksum_start=0)
+        frame = b'\x7e' + struct.pack(">H", 5) + b'abc'
+        frame += struct.pack(">H", crc16_ccitt(frame))
+        frames = FrameDecoder(spec).feed("COM1", "read", frame, 1)
+        self.assertEqual(frames[0].payload, b'abc')
+
+    def test_invalid_spec(self):
+        with self.assertRaises(ValueError):
+            FrameSpec(b'\xaa', "<BH", ["length"])
+        with self.assertRaises(ValueError):
+            FrameSpec(b'\xaa', "<H", ["size"])
+        with self.assertRaises(ValueError):
+            FrameSpec(b'\xaa', "<H", ["length"], checksum=sum8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    build_index,
+    get_index,
+    load_index,
+    reader,
+)
+from binarycsv.index import index_path
+
+
+def make_rows(count):
+    data = b'#;Data;Data (chars)\r\n'
+    for number in range(1, count):
+        data += b'%d;0d 0a;"\r\n""%d"\r\n' % (number, number)
+    return data
+
+
+class TestIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "capture.csv")
+        self.data = make_rows(250)
+        with open(self.path, 'wb') as stream:
+            stream.write(self.data)
+        self.rows = list(reader(io.BytesIO(self.data)))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_seek_row(self):
+        index = build_index(self.path, every=16)
+        self.assertEqual(index.rows, 250)
+        self.assertEqual(len(index.offsets), 16)
+        with open(self.path, 'rb') as stream:
+            _reader = reader(stream, block_size=7)
+            _reader.index = index
+            for number in (200, 0, 249, 16, 15, 31):
+                _reader.seek_row(number)
+                self.assertEqual(_reader.line_number, number)
+                self.assertEqual(next(_reader), self.rows[number])
+            _reader.seek_row(248)
+            self.assertEqual(list(_reader), self.rows[248:])
+            with self.assertRaises(IndexError):
+                _reader.seek_row(251)
+
+    def test_seek_row_without_index(self):
+        with open(self.path, 'rb') as stream:
+            _reader = reader(stream)
+            _reader.seek_row(100)
+            self.assertEqual(next(_reader), self.rows[100])
+
+    def test_seek_offset(self):
+        with open(self.path, 'rb') as stream:
+            _reader = reader(stream)
+            for _ in range(10):
+                next(_reader)
+            pos, prev_newline = _reader.cur, _reader.prev_newline
+            expected = next(_reader)
+            next(_reader)
+            _reader.seek_offset(pos, prev_newline=prev_newline)
+            self.assertEqual(next(_reader), expected)
+
+    def test_sidecar(self):
+        self.assertIsNone(load_index(self.path))
+        index = get_index(self.path, every=50)
+        self.assertTrue(os.path.isfile(index_path(self.path)))
+        loaded = load_index(self.path)
+        self.assertEqual(loaded.offsets, index.offsets)
+        self.assertEqual(loaded.newlines, index.newlines)
+        self.assertIsNone(load_index(self.path, every=10))
+        with open(self.path, 'ab') as stream:
+            stream.write(b'250;;\r\n')
+        self.assertIsNone(load_index(self.path))  # stale
+        self.assertEqual(get_index(self.path).rows, 251)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    parallel_read,
+    reader,
+)
+
+
+class TestParallelRead(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "capture.csv")
+        data = b'#;Data;Data (chars)\r\n'
+        for number in range(1, 300):
+            # Quoted newlines and quotes make most split points invalid.
+            data += b'%d;0d 0a;"\r\n""\n%d\r"\r\n' % (number, number)
+        data += b'\r\n\n300;;'  # skipped newlines, no newline at EOF
+        self.data = data
+        with open(self.path, 'wb') as stream:
+            stream.write(data)
+        _reader = reader(io.BytesIO(data))
+        self.expected = [(_reader.line_number, row) for row in _reader]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_same_as_reader(self):
+        for chunk_size in (1, 5, 1000, len(self.data)):
+            got = list(parallel_read(self.path, workers=2,
+                                     chunk_size=chunk_size))
+            self.assertEqual(got, self.expected,
+                             "chunk_size={}".format(chunk_size))
+
+    def test_batches(self):
+        rows = []
+        for line_number, batch in parallel_read(self.path, workers=2,
+                                                chunk_size=500,
+                                                batches=True):
+            self.assertEqual(line_number, len(rows) + 1)
+            rows.extend(batch)
+        self.assertEqual(rows, [row for _, row in self.expected])
+
+
+if __name__ == '__main__':
+    unittest.main()
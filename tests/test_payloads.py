@@ -0,0 +1,109 @@
+import io
+import os
+import sys
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    PayloadTotals,
+    decode_hex,
+    decode_hex_column,
+    hex_length,
+    reader,
+)
+from binarycsv.batches import (
+    MISSING_INT,
+    np,
+)
+
+SPM_SAMPLE = (
+    b'#;Function;Direction;Data;Data (chars);Data length\r\n'
+    b'17;IRP_MJ_READ;DOWN;;;\r\n'
+    b'18;IRP_MJ_READ;UP;55 9d;"U\x9d";2\r\n'
+    b'19;IRP_MJ_WRITE;DOWN;0d;"\r";1\r\n'
+    b'20;IRP_MJ_READ;UP;41 42 43;ABC;3\r\n'
+)
+
+
+class TestPayloads(unittest.TestCase):
+    def test_decode_hex(self):
+        self.assertEqual(decode_hex('55 9d'), b'U\x9d')
+        self.assertEqual(decode_hex(b'55 9d', data_length=b'2'), b'U\x9d')
+        self.assertEqual(decode_hex(b'', data_length=b''), b'')
+        self.assertEqual(hex_length('55 9d 0a'), 3)
+        for value in ('5 9d', 'zz'):
+            with self.assertRaises(ValueError):
+                decode_hex(value)
+        with self.assertRaises(ValueError):
+            decode_hex('55 9d', data_length='3')
+        with self.assertRaises(ValueError):
+            hex_length(b'55 9')
+
+    def test_totals(self):
+        totals = PayloadTotals()
+        self.assertEqual(totals.add_read('55 9d', data_length='2'),
+                         b'U\x9d')
+        totals.add_write(b'0d', data_length=b'1')
+        totals.add_read('41', data_length='')
+        self.assertEqual((totals.read_total, totals.write_total), (3, 1))
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_decode_hex_column(self):
+        column = decode_hex_column([b'55 9d', b'', b'0d', '41 42 43'],
+                                   lengths=[2, MISSING_INT, 1, 3])
+        self.assertEqual(column.data, b'U\x9d\rABC')
+        self.assertEqual(column.offsets.tolist(), [0, 2, 2, 3, 6])
+        with self.assertRaises(ValueError):
+            decode_hex_column([b'55 9d', b'0d 0'])
+        with self.assertRaises(ValueError):
+            decode_hex_column([b'55 9d', b'0d'], lengths=[2, 2])
+        # An empty Data length isn't checked (like decode_hex):
+        column = decode_hex_column([b'41'], lengths=[MISSING_INT])
+        self.assertEqual(column.data, b'A')
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_add_batch(self):
+        kinds = {
+            'Function': "category",
+            'Data': "bytes",
+            'Data (chars)': "bytes",
+            'Data length': "int",
+        }
+        totals = PayloadTotals()
+        _reader = reader(io.BytesIO(SPM_SAMPLE))
+        for batch in _reader.read_batches(batch_rows=3, columns=kinds):
+            payloads = totals.add_batch(batch)
+            chars = batch['Data (chars)']
+            self.assertEqual([payloads[i] for i in range(len(batch))],
+                             [chars[i] for i in range(len(batch))])
+        self.assertEqual((totals.read_total, totals.write_total), (5, 1))
+        # The same with Function as bytes:
+        kinds['Function'] = "bytes"
+        totals = PayloadTotals()
+        _reader = reader(io.BytesIO(SPM_SAMPLE))
+        for batch in _reader.read_batches(columns=kinds):
+            totals.add_batch(batch)
+        self.assertEqual((totals.read_total, totals.write_total), (5, 1))
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_add_batch_empty_length(self):
+        kinds = {'Function': "category", 'Data': "bytes",
+                 'Data length': "int"}
+        data = SPM_SAMPLE + b'21;IRP_MJ_READ;UP;44 45;DE;\r\n'
+        totals = PayloadTotals()
+        _reader = reader(io.BytesIO(data))
+        for batch in _reader.read_batches(columns=kinds):
+            payloads = totals.add_batch(batch)
+        self.assertEqual(payloads[len(batch) - 1], b'DE')
+        self.assertEqual((totals.read_total, totals.write_total), (7, 1))
+        # The same row passes add_read:
+        self.assertEqual(PayloadTotals().add_read('44 45', data_length=''),
+                         b'DE')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    NON_EMPTY,
+    RowFilter,
+    bytewise_reader,
+    mmap_reader,
+    reader,
+)
+
+SPM_SAMPLE = (
+    b'#;Time;Function;Direction;Status;Data;Data (chars);Data length;'
+    b'Req. length;Port;Comments;\r\n'
+    b'17;22/09/2023 10:50:54;IRP_MJ_READ;DOWN;;;;;1;COM3;;\r\n'
+    b'18;22/09/2023 10:50:54;IRP_MJ_READ;UP;STATUS_SUCCESS;55 9d 22;'
+    b'"U\x9d""";3;1;COM3;;\r\n'
+    b'19;22/09/2023 10:50:55;IRP_MJ_WRITE;DOWN;STATUS_SUCCESS;0d 0a 3b;'
+    b'"\r\n;";3;3;COM3;;\r\n'
+)
+
+BLOCK_SIZES = (1, 2, 3, 7, 64, 4096)
+
+
+def read_all(_reader):
+    """Get each row along with the line_number after reading it."""
+    return [(row, _reader.line_number) for row in _reader]
+
+
+class TestReader(unittest.TestCase):
+    def assertSameAsBytewise(self, data):
+        expected = read_all(bytewise_reader(io.BytesIO(data)))
+        for block_size in BLOCK_SIZES:
+            got = read_all(reader(io.BytesIO(data), block_size=block_size))
+            self.assertEqual(
+                got, expected,
+                "block_size={} data={!r}".format(block_size, data)
+            )
+
+    def test_spm_sample(self):
+        rows = list(reader(io.BytesIO(SPM_SAMPLE), block_size=5))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(len(rows[0]), 12)
+        self.assertEqual(rows[2][6], b'U\x9d"')
+        self.assertEqual(rows[3][6], b'\r\n;')
+        self.assertEqual(rows[3][-1], b'')
+        self.assertSameAsBytewise(SPM_SAMPLE)
+
+    def test_quotes(self):
+        rows = list(reader(io.BytesIO(b'"a""b";"";""""\n')))
+        self.assertEqual(rows, [[b'a"b', b'', b'"']])
+        self.assertSameAsBytewise(b'"a""b";"";""""\n')
+
+    def test_newlines(self):
+        data = b'a\r\nb\rc\nd\n\ne\r\n\r\nf'
+        rows = list(reader(io.BytesIO(data), block_size=1))
+        self.assertEqual(rows, [[b'a'], [b'b'], [b'c'], [b'd'], [b''],
+                                [b'e'], [b'f']])
+        self.assertSameAsBytewise(data)
+
+    def test_last_line_without_newline(self):
+        _reader = reader(io.BytesIO(b'a;b\nc;'))
+        self.assertEqual(list(_reader), [[b'a', b'b'], [b'c', b'']])
+        self.assertEqual(_reader.line_number, 2)
+        self.assertEqual(_reader.cur, 6)
+
+    def test_random_compatibility(self):
+        rng = random.Random(1)
+        alphabet = [b'a', b';', b'"', b'\r', b'\n', b'\x9d']
+        for _ in range(2000):
+            data = b"".join(rng.choice(alphabet)
+                            for _ in range(rng.randint(0, 30)))
+            self.assertSameAsBytewise(data)
+
+    def test_filters(self):
+        stream = io.BytesIO(SPM_SAMPLE)
+        _reader = reader(stream, block_size=16)
+        header = [name.decode('utf-8') for name in next(_reader)]
+        _reader.set_filters([
+            {"Function": [b"IRP_MJ_READ"], "Direction": [b"UP"]},
+            {"Function": [b"IRP_MJ_WRITE"], "Data length": NON_EMPTY},
+        ], header=header)
+        numbers = [(row[0], _reader.line_number) for row in _reader]
+        self.assertEqual(numbers, [(b'18', 3), (b'19', 4)])
+        self.assertEqual(_reader.rows_filtered, 1)
+
+    def test_filter_skips_quoted_rest(self):
+        data = b'x;"a\n;";b\ny;"c"\nx;"\n";d\n'
+        for block_size in BLOCK_SIZES:
+            _reader = reader(io.BytesIO(data), block_size=block_size,
+                             filters={0: [u'x']})
+            self.assertEqual(list(_reader), [[b'x', b'a\n;', b'b'],
+                                             [b'x', b'\n', b'd']])
+            self.assertEqual(_reader.line_number, 3)
+
+    def test_columns(self):
+        columns = ['#', 'Function', 'Direction', 'Data']
+        for block_size in BLOCK_SIZES:
+            _reader = reader(io.BytesIO(SPM_SAMPLE), block_size=block_size,
+                             columns=columns)
+            rows = list(_reader)
+            self.assertEqual(rows[0], [b'#', b'Function', b'Direction',
+                                       b'Data'])
+            self.assertEqual(rows[2], [b'18', b'IRP_MJ_READ', b'UP',
+                                       b'55 9d 22'])
+            self.assertEqual(_reader.columns, [0, 2, 3, 5])
+            self.assertEqual(_reader.line_number, 4)
+
+    def test_columns_by_name_with_filters(self):
+        for block_size in BLOCK_SIZES:
+            _reader = reader(io.BytesIO(SPM_SAMPLE), block_size=block_size,
+                             columns=['#', 'Data'],
+                             filters={3: [b'UP', b'DOWN']})
+            self.assertEqual(list(_reader), [[b'#', b'Data'],
+                                             [b'17', b''],
+                                             [b'18', b'55 9d 22'],
+                                             [b'19', b'0d 0a 3b']])
+            _reader = reader(io.BytesIO(SPM_SAMPLE), block_size=block_size,
+                             columns=['#'], filters={3: [b'UP']})
+            self.assertEqual(list(_reader), [[b'#'], [b'18']])
+            self.assertEqual(_reader.rows_filtered, 2)
+
+    def test_columns_by_index(self):
+        data = b'a;"b\n";c;"d"\n1;2\n'
+        _reader = reader(io.BytesIO(data), columns=[1, 0])
+        self.assertEqual(next(_reader), [b'b\n', b'a'])
+        self.assertEqual(next(_reader), [b'2', b'1'])
+        _reader = reader(io.BytesIO(data), columns=[2])
+        next(_reader)
+        with self.assertRaises(ValueError):
+            next(_reader)  # too few columns
+
+    def test_row_filter(self):
+        row_filter = RowFilter({1: NON_EMPTY, 2: [b'a', b'b']})
+        self.assertEqual(row_filter.fields, 3)
+        self.assertTrue(row_filter.accepts([b'', b'x', b'b']))
+        self.assertFalse(row_filter.accepts([b'', b'', b'b']))
+        self.assertFalse(row_filter.accepts([b'', b'x']))
+        with self.assertRaises(ValueError):
+            RowFilter({"Port": NON_EMPTY})  # no header
+
+    def test_text_mode(self):
+        with self.assertRaises(ValueError):
+            next(reader(io.StringIO(u'a;b\n')))
+
+    def test_follow(self):
+        class GrowingStream:
+            """Return one piece per read, like a file being written."""
+            def __init__(self, pieces):
+                self.pieces = list(pieces)
+
+            def read(self, size=-1):
+                if self.pieces:
+                    return self.pieces.pop(0)
+                return b''
+
+        stream = GrowingStream([b'1;a\r\n2;', b'', b'', b'b\r\n', b'', b'3'])
+        _reader = reader(stream, follow=True, poll_interval=0,
+                         idle_timeout=0.05)
+        self.assertEqual(next(_reader), [b'1', b'a'])
+        # The partial row waits for the rest instead of ending the file:
+        self.assertEqual(next(_reader), [b'2', b'b'])
+        self.assertEqual(_reader.line_number, 2)
+        # After idle_timeout the last row is complete even without a
+        # newline:
+        self.assertEqual(list(_reader), [[b'3']])
+
+    def test_stats(self):
+        self.assertIsNone(reader(io.BytesIO(SPM_SAMPLE)).stats)
+        snapshots = []
+        _reader = reader(io.BytesIO(SPM_SAMPLE), block_size=16,
+                         filters={3: [b'UP', b'DOWN']},
+                         stats_callback=snapshots.append, stats_every=2)
+        rows = list(_reader)
+        self.assertEqual(len(rows), 3)  # the header row is filtered out
+        stats = _reader.stats
+        self.assertEqual(stats.rows, 3)
+        self.assertEqual(stats.rows_filtered, 1)
+        self.assertEqual(stats.bytes_consumed, len(SPM_SAMPLE))
+        self.assertEqual(stats.bytes_read, len(SPM_SAMPLE))
+        self.assertGreater(stats.reads, len(SPM_SAMPLE) // 64)
+        self.assertEqual(stats.quotes, 6)
+        self.assertEqual(stats.escapes, 1)
+        self.assertEqual(stats.longest_field, len(b'22/09/2023 10:50:54'))
+        self.assertEqual(stats.longest_field_line, 2)
+        self.assertGreater(stats.parse_seconds, 0)
+        # The callback got a snapshot after the 2nd row:
+        self.assertEqual([s.rows for s in snapshots], [2])
+        self.assertEqual(snapshots[0].bytes_consumed,
+                         SPM_SAMPLE.index(b'\r\n19;') + 1)
+        self.assertEqual(stats.to_dict()['rows'], 3)
+
+
+class TestMmapReader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, data):
+        path = os.path.join(self.tmp, "capture.csv")
+        with open(path, 'wb') as stream:
+            stream.write(data)
+        return path
+
+    def test_same_as_reader(self):
+        expected = read_all(reader(io.BytesIO(SPM_SAMPLE)))
+        with mmap_reader(self.write(SPM_SAMPLE)) as _reader:
+            got = [([bytes(field) for field in row], line_number)
+                   for row, line_number in read_all(_reader)]
+        self.assertEqual(got, expected)
+
+    def test_zero_copy(self):
+        path = self.write(b'abc;"d""e";"f"\n')
+        with mmap_reader(path) as _reader:
+            row = next(_reader)
+            self.assertIsInstance(row[0], memoryview)
+            self.assertIsInstance(row[1], bytes)  # rebuilt for ""
+            self.assertIsInstance(row[2], memoryview)
+            self.assertEqual([bytes(field) for field in row],
+                             [b'abc', b'd"e', b'f'])
+            del row
+
+    def test_empty_file(self):
+        with mmap_reader(self.write(b'')) as _reader:
+            self.assertEqual(list(_reader), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import io
+import os
+import sys
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    ByteStream,
+    DictReader,
+    Reassembler,
+)
+
+SPM_SAMPLE = (
+    b'#;Function;Direction;Data;Data (chars);Data length;Port\r\n'
+    b'17;IRP_MJ_WRITE;DOWN;41 54;AT;2;COM3\r\n'
+    b'18;IRP_MJ_READ;UP;4f;O;1;COM3\r\n'
+    b'19;IRP_MJ_WRITE;DOWN;0d;"\r";1;COM3\r\n'
+    b'20;IRP_MJ_READ;UP;4b 0d;"K\r";2;COM3\r\n'
+    b'21;IRP_MJ_READ;UP;4f 4b;OK;2;COM4\r\n'
+    b'22;IOCTL_SERIAL_SET_BAUD_RATE;DOWN;;;;COM3\r\n'
+)
+
+
+class TestByteStream(unittest.TestCase):
+    def check(self, stream):
+        for i, payload in enumerate([b'ab', b'', b'c\x9d', b'de']):
+            stream.append(payload, 10 + i)
+        self.assertEqual(len(stream), 6)
+        self.assertEqual(bytes(stream.data), b'abc\x9dde')
+        self.assertEqual(stream.find(b'\x9dd'), 3)
+        self.assertEqual(stream.find(b'x'), -1)
+        self.assertEqual(stream.capture_at(2), 12)
+        self.assertEqual(stream.capture_at(5), 13)
+        with self.assertRaises(IndexError):
+            stream.capture_at(6)
+        self.assertEqual(stream.search(b'b.'), [(1, 3, [10, 12])])
+        self.assertEqual(stream.search(u'[a-e]', ),
+                         [(0, 1, [10]), (1, 2, [10]), (2, 3, [12]),
+                          (4, 5, [13]), (5, 6, [13])])
+        # Empty matches are skipped:
+        self.assertEqual(stream.search(b'x?'), [])
+        self.assertEqual(stream.search(b'^'), [])
+        self.assertEqual(stream.search(b'c*'), [(2, 3, [12])])
+        stream.close()
+
+    def test_memory(self):
+        self.check(ByteStream())
+
+    def test_mapped(self):
+        stream = ByteStream(max_memory=3)
+        stream.append(b'x', 1)
+        self.assertIsNone(stream._map)
+        stream.close()
+        self.check(ByteStream(max_memory=3))
+
+
+class TestReassembler(unittest.TestCase):
+    def test_records(self):
+        streams = Reassembler()
+        for meta in DictReader(io.BytesIO(SPM_SAMPLE)):
+            streams.add_record(meta)
+        self.assertEqual(sorted(streams.streams),
+                         [('COM3', 'read'), ('COM3', 'write'),
+                          ('COM4', 'read')])
+        self.assertEqual(bytes(streams.stream('COM3', 'write').data),
+                         b'AT\r')
+        # "OK\r" spans captures 18 and 20 of the COM3 READ stream:
+        self.assertEqual(streams.search(b'OK\r'),
+                         [('COM3', 'read', 0, 3, [18, 20])])
+        self.assertEqual(streams.search(b'OK', port='COM4'),
+                         [('COM4', 'read', 0, 2, [21])])
+        self.assertEqual(streams.search(b'OK', direction='write'), [])
+        streams.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
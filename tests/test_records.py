@@ -0,0 +1,72 @@
+import io
+import os
+import sys
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    DictReader,
+    make_record_type,
+    pformat,
+)
+from binarycsv.records import attribute_name
+
+SPM_SAMPLE = (
+    b'#;Time;Function;Direction;Data;Data (chars);Data length;\r\n'
+    b'18;22/09/2023 10:50:54;IRP_MJ_READ;UP;55 9d;"U\x9d";2;\r\n'
+)
+
+
+class TestRecords(unittest.TestCase):
+    def test_dict_reader(self):
+        _reader = DictReader(io.BytesIO(SPM_SAMPLE),
+                             raw_fields=("Data (chars)",))
+        records = list(_reader)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(_reader.line_number, 2)
+        meta = records[0]
+        self.assertEqual(meta.fieldnames[0], '#')
+        self.assertEqual(meta['#'], '18')
+        self.assertEqual(meta.number, '18')
+        self.assertEqual(meta.data_length, '2')
+        self.assertEqual(meta['Data (chars)'], b'U\x9d')
+        self.assertEqual(meta.data_chars, b'U\x9d')
+        self.assertEqual(meta[''], '')
+        self.assertEqual(meta.get('Port', 'none'), 'none')
+        self.assertEqual(meta.keys()[:3], ['#', 'Time', 'Function'])
+        self.assertIn('\'Function\': "IRP_MJ_READ"', pformat(meta))
+
+    def test_filters(self):
+        _reader = DictReader(io.BytesIO(SPM_SAMPLE + b'19;;;DOWN;;;;\r\n'),
+                             filters={"Direction": [b"DOWN"]})
+        self.assertEqual([meta.number for meta in _reader], ['19'])
+
+    def test_lazy_decode(self):
+        record_type = make_record_type(['a', 'b'])
+        record = record_type([b'x', b'\x9d'])
+        self.assertEqual(record.a, 'x')
+        self.assertEqual(list.__getitem__(record, 0), 'x')  # cached
+        self.assertEqual(list.__getitem__(record, 1), b'\x9d')  # not yet
+        with self.assertRaises(UnicodeDecodeError):
+            record['b']
+        record['b'] = 1
+        self.assertEqual(record[1], 1)
+
+    def test_column_count(self):
+        _reader = DictReader(io.BytesIO(b'a;b\n1\n'))
+        with self.assertRaises(ValueError):
+            next(_reader)
+
+    def test_attribute_name(self):
+        self.assertEqual(attribute_name("Req. length"), "req_length")
+        self.assertEqual(attribute_name("#"), "number")
+        self.assertEqual(attribute_name(""), "")
+        self.assertEqual(attribute_name("2nd"), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
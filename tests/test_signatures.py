@@ -0,0 +1,128 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    AhoCorasick,
+    Reassembler,
+    SignatureScanner,
+)
+
+from benchmarks.generate import (
+    write_spm_log,
+)
+
+try:
+    import spmanalyzer
+except ImportError:  # no tkinter
+    spmanalyzer = None
+
+
+def find_all(data, patterns):
+    """Get (end, index) for each match, the slow way."""
+    hits = []
+    for end in range(1, len(data) + 1):
+        for index, pattern in enumerate(patterns):
+            if data[:end].endswith(pattern):
+                hits.append((end, index))
+    return hits
+
+
+class TestAhoCorasick(unittest.TestCase):
+    def test_overlapping(self):
+        patterns = [b'he', b'she', b'his', b'hers', b'e']
+        automaton = AhoCorasick(patterns)
+        data = b'ushershis'
+        hits, _ = automaton.scan(data)
+        self.assertEqual(sorted(hits), sorted(find_all(data, patterns)))
+        self.assertIn((4, 1), hits)  # "she"
+        self.assertIn((6, 3), hits)  # "hers"
+
+    def test_random(self):
+        rand = random.Random(0)
+        for _ in range(20):
+            patterns = [bytes(bytearray(rand.choice(b'ab\x00\xff')
+                                        for _ in range(rand.randint(1, 4))))
+                        for _ in range(5)]
+            data = bytes(bytearray(rand.choice(b'ab\x00\xffc')
+                                   for _ in range(200)))
+            hits, _ = AhoCorasick(patterns).scan(data)
+            self.assertEqual(sorted(hits), sorted(find_all(data, patterns)))
+
+    def test_state(self):
+        automaton = AhoCorasick([b'\x0d\x0aOK'])
+        hits, state = automaton.scan(b'AT\x0d')
+        self.assertEqual(hits, [])
+        hits, state = automaton.scan(b'\x0aO', state)
+        self.assertEqual(hits, [])
+        hits, state = automaton.scan(b'K', state)
+        self.assertEqual(hits, [(1, 0)])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            AhoCorasick([])
+        with self.assertRaises(ValueError):
+            AhoCorasick([b'a', b''])
+
+
+class TestSignatureScanner(unittest.TestCase):
+    def test_span(self):
+        scanner = SignatureScanner([b'ATZ', b'OK'])
+        self.assertEqual(scanner.feed("COM3", "write", b'xA', 1), [])
+        # Other directions and ports don't interrupt the match:
+        self.assertEqual(scanner.feed("COM3", "read", b'TZ', 2), [])
+        self.assertEqual(scanner.feed("COM4", "write", b'TZ', 3), [])
+        self.assertEqual(scanner.feed("COM3", "write", b'T', 4), [])
+        hits = scanner.feed("COM3", "write", b'ZOK', 5, time="t5")
+        self.assertEqual(len(hits), 2)
+        self.assertEqual(hits[0].pattern, b'ATZ')
+        self.assertEqual(hits[0].capture, 1)
+        self.assertEqual(hits[0].offset, 1)
+        self.assertEqual(hits[0].captures, [1, 4, 5])
+        self.assertEqual(hits[1].pattern, b'OK')
+        self.assertEqual((hits[1].capture, hits[1].offset, hits[1].time),
+                         (5, 1, "t5"))
+
+
+@unittest.skipIf(spmanalyzer is None, "tkinter is not installed")
+class TestSearchSpmLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "spm.csv")
+        write_spm_log(self.path, rows=2000)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_same_as_reassembler(self):
+        patterns = [b'\x00\x01', b'\xff', b'AB', b'\x10\x20\x30']
+        hits = list(spmanalyzer.search_spm_log(self.path, patterns))
+        streams = Reassembler()
+        with open(self.path, 'rb') as stream:
+            _reader = spmanalyzer.binarycsv.DictReader(stream)
+            for meta in _reader:
+                if spmanalyzer.capture_list(meta) and meta['Data']:
+                    streams.add_record(meta)
+        expected = []
+        for (port, direction), stream in streams.streams.items():
+            for pattern in patterns:
+                for match in stream.finditer(
+                        b'(?=' + spmanalyzer.re.escape(pattern) + b')'):
+                    expected.append((port, direction,
+                                     stream.capture_at(match.start())))
+        streams.close()
+        self.assertTrue(hits)
+        self.assertEqual(sorted((hit.port, hit.direction, hit.capture)
+                                for hit in hits), sorted(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,376 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+from contextlib import (
+    redirect_stderr,
+    redirect_stdout,
+)
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from benchmarks.generate import (
+    write_spm_log,
+)
+
+try:
+    import spmanalyzer
+except ImportError:  # no tkinter
+    spmanalyzer = None
+
+
+def drain(messages):
+    """Get the records and error from an AnalysisWorker's messages."""
+    records = []
+    while True:
+        message = messages.get(timeout=10)
+        if message[0] == "done":
+            return records, message[1]
+        if message[0] == "captures":
+            records.extend(message[1])
+
+
+@unittest.skipIf(spmanalyzer is None, "tkinter is not installed")
+class TestAnalysisWorker(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "spm.csv")
+        self.counts = write_spm_log(self.path, rows=3000)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_all(self):
+        messages = spmanalyzer.queue.Queue(maxsize=2)
+        worker = spmanalyzer.AnalysisWorker(self.path, messages,
+                                            batch_size=100)
+        worker.start()
+        records, error = drain(messages)
+        worker.join()
+        self.assertIsNone(error)
+        self.assertEqual(len(records), self.counts['useful'])
+        self.assertTrue(all(spmanalyzer.capture_list(meta)
+                            for meta in records))
+
+    @unittest.skipIf(spmanalyzer is None or spmanalyzer.np is None,
+                     "numpy is not installed")
+    def test_cache(self):
+        runs = []
+        for _ in range(2):
+            messages = spmanalyzer.queue.Queue()
+            worker = spmanalyzer.AnalysisWorker(self.path, messages)
+            worker.start()
+            records, error = drain(messages)
+            worker.join()
+            self.assertIsNone(error)
+            runs.append([list(meta) for meta in records])
+            self.assertTrue(os.path.isfile(
+                spmanalyzer.binarycsv.cache_path(self.path)))
+        self.assertEqual(len(runs[0]), self.counts['useful'])
+        self.assertEqual(runs[1], runs[0])
+
+    @unittest.skipIf(spmanalyzer is None or spmanalyzer.np is None,
+                     "numpy is not installed")
+    def test_not_cached(self):
+        messages = spmanalyzer.queue.Queue()
+        worker = spmanalyzer.AnalysisWorker(self.path, messages,
+                                            use_cache=False)
+        worker.start()
+        expected, _ = drain(messages)
+        with open(self.path, 'rb') as stream:
+            data = stream.read()
+        with open(self.path, 'wb') as stream:
+            # "#" is cached as "int", so it can't be cached after this:
+            stream.write(data.replace(b'\r\n2000;', b'\r\nx;'))
+        messages = spmanalyzer.queue.Queue(maxsize=2)
+        worker = spmanalyzer.AnalysisWorker(self.path, messages,
+                                            batch_size=100)
+        worker.start()
+        records, error = drain(messages)
+        worker.join()
+        self.assertIsNone(error)
+        self.assertFalse(os.path.exists(
+            spmanalyzer.binarycsv.cache_path(self.path)))
+        self.assertEqual(len(records), len(expected))
+        self.assertEqual([meta['Data'] for meta in records],
+                         [meta['Data'] for meta in expected])
+
+    def test_continue(self):
+        with open(self.path, 'rb') as stream:
+            _reader = spmanalyzer.binarycsv.reader(stream)
+            header_row = [name.decode('utf-8') for name in next(_reader)]
+            for _ in range(1000):
+                next(_reader)
+            start = (_reader.cur, _reader.prev_newline, _reader.line_number)
+            rest = [row for row in _reader if row[5]]
+        messages = spmanalyzer.queue.Queue()
+        worker = spmanalyzer.AnalysisWorker(self.path, messages,
+                                            header_row=header_row,
+                                            start=start)
+        worker.start()
+        records, error = drain(messages)
+        self.assertIsNone(error)
+        self.assertEqual([list(meta) for meta in records], rest)
+
+    def test_cancel(self):
+        messages = spmanalyzer.queue.Queue(maxsize=1)
+        worker = spmanalyzer.AnalysisWorker(self.path, messages,
+                                            batch_size=10)
+        worker.start()
+        messages.get(timeout=10)
+        worker.cancel()
+        records, error = drain(messages)
+        worker.join(10)
+        self.assertFalse(worker.is_alive())
+        self.assertLess(len(records), self.counts['useful'])
+
+
+@unittest.skipIf(spmanalyzer is None, "tkinter is not installed")
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.counts = []
+        for i in range(3):
+            path = os.path.join(self.tmp, "spm{}.csv".format(i))
+            self.counts.append(write_spm_log(path, rows=1000, seed=i))
+        with open(os.path.join(self.tmp, "notes.txt"), 'w') as stream:
+            stream.write("not a CSV file")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_expand_paths(self):
+        paths = spmanalyzer.expand_paths([
+            os.path.join(self.tmp, "spm1.csv"),
+            self.tmp,
+            os.path.join(self.tmp, "*.csv"),
+        ])
+        self.assertEqual([os.path.basename(path) for path in paths],
+                         ["spm1.csv", "spm0.csv", "spm2.csv"])
+
+    def test_batch_analyze(self):
+        paths = spmanalyzer.expand_paths([self.tmp])
+        results = list(spmanalyzer.batch_analyze(paths, workers=2))
+        self.assertEqual([result['path'] for result in results], paths)
+        serial = spmanalyzer.batch_analyze(paths, workers=1)
+        self.assertEqual([dict(result, seconds=None) for result in results],
+                         [dict(result, seconds=None) for result in serial])
+        for result, counts in zip(results, self.counts):
+            self.assertIsNone(result['error'])
+            self.assertEqual(result['rows'], counts['rows'] + 1)
+            directions = result['ports']['COM3']
+            self.assertEqual(directions['read']['bytes'],
+                             counts['read_bytes'])
+            self.assertEqual(directions['write']['bytes'],
+                             counts['write_bytes'])
+            self.assertEqual(directions['read']['captures']
+                             + directions['write']['captures'],
+                             counts['useful'])
+        rows = spmanalyzer.summary_rows(results)
+        self.assertEqual(len(rows), 2 * len(paths) + 2)
+        self.assertEqual(rows[-1][:4], [
+            "TOTAL", "COM3", "write",
+            str(sum(result['ports']['COM3']['write']['captures']
+                    for result in results)),
+        ])
+
+    def test_traffic(self):
+        path = os.path.join(self.tmp, "spm0.csv")
+        stats = spmanalyzer.binarycsv.TrafficStats(bucket_seconds=3600)
+        spmanalyzer.traffic_spm_log(path, stats)
+        counts = self.counts[0]
+        self.assertEqual(stats.captures, counts['rows'])
+        self.assertEqual(
+            stats.totals[("COM3", "UP", "IRP_MJ_READ")][1],
+            counts['read_bytes'])
+        self.assertEqual(
+            stats.totals[("COM3", "DOWN", "IRP_MJ_WRITE")][1],
+            counts['write_bytes'])
+        self.assertTrue(stats.latency)
+        self.assertEqual(sum(bucket[key][0]
+                             for bucket in stats.buckets.values()
+                             for key in bucket), counts['rows'])
+
+    def test_error(self):
+        path = os.path.join(self.tmp, "bad.csv")
+        with open(path, 'wb') as stream:
+            stream.write(b'#;Function;Direction;Data;Data length;Port\r\n'
+                         b'1;IRP_MJ_READ;UP;zz;1;COM1\r\n')
+        result = spmanalyzer.summarize_spm_log(path)
+        self.assertIn("ValueError", result['error'])
+        rows = spmanalyzer.summary_rows([result])
+        self.assertEqual(len(rows), 1)
+
+
+@unittest.skipIf(spmanalyzer is None, "tkinter is not installed")
+class TestAnalyzeSpmLog(unittest.TestCase):
+    def test_bad_length(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, "spm.csv")
+            with open(path, 'wb') as stream:
+                stream.write(
+                    b'#;Time;Function;Direction;Data;Data (chars);'
+                    b'Data length;Port\r\n'
+                    b'1;;IRP_MJ_READ;UP;41 42;AB;3;COM3\r\n'
+                    b'2;;IRP_MJ_READ;UP;43;C;1;COM3\r\n')
+            out = io.StringIO()
+            err = io.StringIO()
+            with redirect_stdout(out), redirect_stderr(err):
+                spmanalyzer.analyze_spm_log(path)
+        finally:
+            shutil.rmtree(tmp)
+        self.assertIn("Line 2: The hex payload", err.getvalue())
+        self.assertIn("READ total: 1 byte(s)", out.getvalue())
+
+    def run_main(self, args):
+        out = io.StringIO()
+        argv = sys.argv
+        sys.argv = ["spmanalyzer.py"] + args
+        try:
+            with redirect_stdout(out), redirect_stderr(io.StringIO()):
+                code = spmanalyzer.main()
+        finally:
+            sys.argv = argv
+        return code, out.getvalue()
+
+    def test_workers(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, "spm.csv")
+            write_spm_log(path, rows=500)
+            code, expected = self.run_main([path])
+            self.assertEqual(code, 0)
+            code, output = self.run_main(["--workers", "2", path])
+            self.assertEqual(code, 0)
+            self.assertEqual(output, expected)
+            code, _ = self.run_main(["--workers", "2", "--follow", path])
+            self.assertEqual(code, 1)
+        finally:
+            shutil.rmtree(tmp)
+
+
+@unittest.skipIf(spmanalyzer is None, "tkinter is not installed")
+class TestDecodeSpmLog(unittest.TestCase):
+    def test_frames(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, "spm.csv")
+            with open(path, 'wb') as stream:
+                stream.write(
+                    b'#;Function;Direction;Data;Data length;Port\r\n'
+                    b'1;IRP_MJ_WRITE;DOWN;aa 55 01;3;COM3\r\n'
+                    b'2;IRP_MJ_READ;UP;aa;1;COM3\r\n'
+                    b'3;IOCTL_SERIAL_SET_BAUD_RATE;DOWN;;;COM3\r\n'
+                    b'4;IRP_MJ_WRITE;DOWN;02 00 68;3;COM3\r\n'
+                    b'5;IRP_MJ_WRITE;DOWN;69 d4 aa 55;4;COM3\r\n'
+                )
+            spec = spmanalyzer.binarycsv.FrameSpec(
+                b'\xaa\x55', "<BH", ["type", "length"],
+                checksum=spmanalyzer.binarycsv.sum8, checksum_format="<B")
+            frames = list(spmanalyzer.decode_spm_log(path, [spec]))
+        finally:
+            shutil.rmtree(tmp)
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0].payload, b'hi')
+        self.assertEqual(frames[0].direction, "write")
+        self.assertEqual(frames[0].captures, [1, 4, 5])
+        self.assertEqual(spmanalyzer.format_frame(frames[0]),
+                         "frame COM3 WRITE captures 1,4,5:"
+                         " type=1, length=2 6869")
+
+    def test_load_frame_specs(self):
+        with self.assertRaises(ValueError):
+            spmanalyzer.load_frame_specs("no_attribute")
+        with self.assertRaises(ValueError):
+            spmanalyzer.load_frame_specs("os:sep")
+
+
+@unittest.skipIf(spmanalyzer is None, "tkinter is not installed")
+class TestMainApplication(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.root = spmanalyzer.tk.Tk()
+        except spmanalyzer.tk.TclError as ex:
+            self.skipTest("There is no display ({})".format(ex))
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "spm.csv")
+
+    def tearDown(self):
+        self.root.destroy()
+        shutil.rmtree(self.tmp)
+
+    def test_bad_capture(self):
+        counts = write_spm_log(self.path, rows=3000)
+        with open(self.path, 'rb') as stream:
+            header, rest = stream.read().split(b'\r\n', 1)
+        with open(self.path, 'wb') as stream:
+            # Data isn't hex, so add_read can't decode it:
+            stream.write(header + b'\r\n0;22/09/2023 10:50:54;IRP_MJ_READ;UP;'
+                         b'STATUS_SUCCESS;zz;x;1;1;COM3;;\r\n' + rest)
+        app = spmanalyzer.MainApplication(self.root)
+        app.sourceVar.set(self.path)
+        app.analyzeAll()
+        worker = app.worker
+        deadline = time.time() + 10
+        while app.worker is not None and time.time() < deadline:
+            app.drain_messages()
+            time.sleep(0.01)
+        self.assertIsNone(app.worker)
+        worker.join(10)
+        self.assertFalse(worker.is_alive())
+        # Only the bad capture is skipped:
+        self.assertEqual(app.statusVar.get(), "Done reading data. (1"
+                         " capture(s) skipped, see the log)")
+        self.assertEqual(app.skipped, 1)
+        log = app.listboxes["log"].rows
+        self.assertTrue(log[0][0].startswith("Skipped capture 0:"))
+        self.assertEqual(len(app.listboxes["read"].rows)
+                         + len(app.listboxes["write"].rows),
+                         counts['useful'])
+
+
+@unittest.skipIf(spmanalyzer is None, "tkinter is not installed")
+class TestVirtualList(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.root = spmanalyzer.tk.Tk()
+        except spmanalyzer.tk.TclError as ex:
+            self.skipTest("There is no display ({})".format(ex))
+        self.tree = spmanalyzer.ttk.Treeview(self.root, show="tree",
+                                             height=10)
+        self.scrollbar = spmanalyzer.ttk.Scrollbar(self.root)
+
+    def tearDown(self):
+        self.root.destroy()
+
+    def test_window(self):
+        rows = spmanalyzer.VirtualList(self.tree, self.scrollbar)
+        for i in range(100000):
+            rows.append("capture {}".format(i), values=(i,))
+        items = self.tree.get_children()
+        self.assertEqual(len(items), rows.visible + rows.margin)
+        rows.yview("moveto", "0.5")
+        self.assertEqual(rows.top, 50000)
+        self.assertEqual(self.tree.item(self.tree.get_children()[0], 'text'),
+                         "capture 50000")
+        rows.yview("moveto", "1.0")
+        items = self.tree.get_children()
+        self.assertEqual(self.tree.item(items[-1], 'text'), "capture 99999")
+        self.assertEqual(rows.index(70000), 70000)
+        rows.select(123)
+        self.assertEqual(rows.top, 123 - rows.visible + 1)
+        rows.clear()
+        self.assertEqual(len(self.tree.get_children()), 0)
+        self.assertIsNone(rows.index(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+from datetime import datetime
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    SPM_TIME_FORMAT,
+    TimeConverter,
+    parse_spm_time,
+)
+from binarycsv.timestamps import (
+    MISSING_EPOCH,
+    np,
+)
+
+
+class TestTimestamps(unittest.TestCase):
+    def test_parse_spm_time(self):
+        for value in ('22/09/2023 10:50:54', '01/01/1970 00:00:00',
+                      '29/02/2024 23:59:59'):
+            self.assertEqual(parse_spm_time(value),
+                             datetime.strptime(value, SPM_TIME_FORMAT))
+        self.assertEqual(parse_spm_time(b'22/09/2023 10:50:54'),
+                         datetime(2023, 9, 22, 10, 50, 54))
+        for value in ('31/02/2023 10:50:54', '22/09/2023 10:50:5x',
+                      '22-09-2023 10:50:54', '+2/09/2023 10:50:54', ''):
+            with self.assertRaises(ValueError):
+                parse_spm_time(value)
+
+    def test_converter(self):
+        converter = TimeConverter(cache_size=2)
+        self.assertEqual(converter.epoch(b'01/01/1970 00:01:00'), 60)
+        self.assertEqual(converter.datetime('22/09/2023 10:50:54'),
+                         datetime(2023, 9, 22, 10, 50, 54))
+        self.assertIsNone(converter.datetime(b''))
+        self.assertEqual(len(converter._cache), 2)  # the oldest was dropped
+        self.assertEqual(converter.epoch(b'01/01/1970 00:01:00'), 60)
+        other = TimeConverter(time_format="%Y-%m-%d %H:%M:%S")
+        self.assertEqual(other.epoch(b'1970-01-02 00:00:00'), 86400)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_arrays(self):
+        converter = TimeConverter()
+        values = [b'22/09/2023 10:50:54', b'', b'22/09/2023 10:50:54']
+        epochs = converter.epoch_array(values)
+        self.assertEqual(epochs[1], MISSING_EPOCH)
+        times = converter.datetime64_array(values)
+        self.assertEqual(str(times[0]), '2023-09-22T10:50:54')
+        self.assertTrue(np.isnat(times[1]))
+        self.assertEqual(times[2].astype(np.int64), epochs[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import random
+import sys
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+from binarycsv import (
+    QuantileSketch,
+    TrafficStats,
+)
+
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_accuracy(self):
+        rand = random.Random(0)
+        values = [rand.expovariate(10) for _ in range(10000)] + [0] * 100
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+        values.sort()
+        for q in (0.5, 0.9, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q) / exact, 1, delta=0.011)
+        self.assertEqual(sketch.quantile(0), 0)
+        self.assertEqual(sketch.quantile(1), values[-1])
+        self.assertEqual(sketch.count, len(values))
+        self.assertLess(len(sketch.bins), 1000)
+
+    def test_empty(self):
+        sketch = QuantileSketch()
+        self.assertIsNone(sketch.quantile(0.5))
+        with self.assertRaises(ValueError):
+            sketch.add(-1)
+
+
+class TestTrafficStats(unittest.TestCase):
+    def test_totals_and_latency(self):
+        stats = TrafficStats(bucket_seconds=10, top=2)
+        stats.add(100, "COM3", "DOWN", "IRP_MJ_WRITE", 4, capture=1)
+        stats.add(101, "COM3", "DOWN", "IRP_MJ_READ", 0, capture=2)
+        stats.add(103, "COM3", "UP", "IRP_MJ_READ", 9, capture=3)
+        stats.add(104, "COM3", "UP", "IRP_MJ_READ", 2, capture=4)
+        stats.add(115, "COM4", "DOWN", "IRP_MJ_WRITE", 9, capture=5)
+        self.assertEqual(stats.totals[("COM3", "UP", "IRP_MJ_READ")],
+                         [2, 11])
+        self.assertEqual(sorted(stats.buckets), [100, 110])
+        self.assertEqual(stats.buckets[110],
+                         {("COM4", "DOWN", "IRP_MJ_WRITE"): [1, 9]})
+        # Only the first response after a request is timed:
+        self.assertEqual(stats.latency["COM3"].count, 1)
+        self.assertAlmostEqual(stats.latency["COM3"].quantile(0.5), 3,
+                               delta=0.03)
+        self.assertEqual([payload.capture for payload in stats.largest()],
+                         [3, 5])
+        report = stats.report()
+        self.assertEqual(report[0], "Captures: 5 from 1970-01-01 00:01:40"
+                                    " to 1970-01-01 00:01:55")
+        self.assertIn("  COM3 UP IRP_MJ_READ: 2 capture(s), 11 byte(s)",
+                      report)
+
+    def test_widen_buckets(self):
+        stats = TrafficStats(bucket_seconds=1, max_buckets=8)
+        for second in range(100):
+            stats.add(second, "COM3", "UP", "IRP_MJ_READ", 1)
+        self.assertLessEqual(len(stats.buckets), 8)
+        self.assertEqual(stats.bucket_seconds, 16)
+        self.assertEqual(sum(bucket[("COM3", "UP", "IRP_MJ_READ")][1]
+                             for bucket in stats.buckets.values()), 100)
+
+    def test_no_time(self):
+        stats = TrafficStats()
+        stats.add(None, "COM3", "UP", "IRP_MJ_READ", 3)
+        self.assertEqual(stats.buckets, {})
+        self.assertEqual(stats.report()[0], "Captures: 1")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import io
+import os
+import random
+import sys
+import unittest
+
+if __name__ == '__main__':
+    TESTS_DIR = os.path.dirname(os.path.realpath(__file__))
+    REPO_DIR = os.path.dirname(TESTS_DIR)
+    sys.path.insert(0, REPO_DIR)
+
+import binarycsv
+from binarycsv import (
+    reader,
+    writer,
+)
+from binarycsv.batches import (
+    np,
+)
+
+SPM_SAMPLE = (
+    b'#;Time;Function;Direction;Data;Data (chars);Data length\r\n'
+    b'17;22/09/2023 10:50:54;IRP_MJ_READ;DOWN;;;\r\n'
+    b'18;22/09/2023 10:50:54;IRP_MJ_READ;UP;55 9d;U\x9d;2\r\n'
+    b'19;22/09/2023 10:50:55;IRP_MJ_WRITE;DOWN;0d;"\r";1\r\n'
+)
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self):
+        io.BytesIO.__init__(self)
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return io.BytesIO.write(self, data)
+
+
+def write_all(rows, **kwargs):
+    stream = io.BytesIO()
+    with writer(stream, **kwargs) as _writer:
+        _writer.writerows(rows)
+    return stream.getvalue()
+
+
+class TestWriter(unittest.TestCase):
+    def test_minimal_quoting(self):
+        data = write_all([[b'a', b'', b'b;c', b'd"e', b'\r\n', b'\x9d']])
+        self.assertEqual(data, b'a;;"b;c";"d""e";"\r\n";\x9d\r\n')
+        self.assertEqual(write_all([[b'']], lineterminator=b'\n'),
+                         b'""\n')
+
+    def test_round_trip(self):
+        rng = random.Random(2)
+        alphabet = [b'a', b';', b'"', b'\r', b'\n', b'\x9d', b'\x00']
+        for lineterminator in (b'\r\n', b'\n', b'\r'):
+            rows = []
+            for _ in range(500):
+                rows.append([
+                    b"".join(rng.choice(alphabet)
+                             for _ in range(rng.randint(0, 5)))
+                    for _ in range(rng.randint(1, 4))
+                ])
+            data = write_all(rows, lineterminator=lineterminator,
+                             buffer_size=100)
+            for block_size in (1, 7, 4096):
+                self.assertEqual(
+                    list(reader(io.BytesIO(data), block_size=block_size)),
+                    rows)
+
+    def test_same_as_read(self):
+        rows = list(reader(io.BytesIO(SPM_SAMPLE)))
+        self.assertEqual(write_all(rows), SPM_SAMPLE)
+
+    def test_buffer(self):
+        stream = CountingStream()
+        _writer = writer(stream, buffer_size=1000)
+        for _ in range(100):
+            _writer.writerow([b'0123456789', b'0123456789'])
+        self.assertEqual(stream.writes, 2)  # each 1000+ bytes
+        self.assertEqual(_writer.rows_written, 100)
+        _writer.flush()
+        self.assertEqual(stream.writes, 3)
+        self.assertEqual(len(stream.getvalue()), 2300)
+
+    def test_values(self):
+        self.assertEqual(write_all([[u'é', 1, None]]),
+                         b'\xc3\xa9;1;\r\n')
+        with self.assertRaises(ValueError):
+            write_all([[]])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_batches(self):
+        kinds = {
+            '#': "int",
+            'Time': "time",
+            'Function': "category",
+            'Data (chars)': "bytes",
+            'Data length': "int",
+        }
+        names = list(kinds.keys())
+        _reader = reader(io.BytesIO(SPM_SAMPLE), columns=names)
+        expected = list(_reader)
+        _reader = reader(io.BytesIO(SPM_SAMPLE))
+        stream = io.BytesIO()
+        with writer(stream) as _writer:
+            _writer.writerow([name.encode('utf-8') for name in names])
+            for batch in _reader.read_batches(batch_rows=2, columns=kinds):
+                _writer.writerows(batch)
+        self.assertEqual(list(reader(io.BytesIO(stream.getvalue()))),
+                         expected)
+
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_batch_rows_export(self):
+        # binarycsv.batch_rows is this helper, not one of another module:
+        self.assertIs(binarycsv.batch_rows, binarycsv.writers.batch_rows)
+        kinds = {'#': "int", 'Data': "bytes"}
+        _reader = reader(io.BytesIO(SPM_SAMPLE))
+        batch = next(_reader.read_batches(columns=kinds))
+        self.assertEqual(binarycsv.batch_rows(batch),
+                         [(b'17', b''), (b'18', b'55 9d'), (b'19', b'0d')])
+
+
+if __name__ == '__main__':
+    unittest.main()